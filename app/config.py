@@ -35,6 +35,71 @@ class Settings(BaseSettings):
     
     # Logging
     log_level: str = Field("INFO", alias="LOG_LEVEL")
+    # text - цветной вывод для разработки, json - одна JSON-строка на запись
+    log_format: str = Field("text", alias="LOG_FORMAT")
+    # Доля обычных обновлений, попадающих в лог (ошибки логируются всегда)
+    log_sample_rate: float = Field(1.0, alias="LOG_SAMPLE_RATE")
+
+    # Локальный кэш FSM: количество ключей и максимальное время жизни записи (сек)
+    fsm_cache_size: int = Field(10000, alias="FSM_CACHE_SIZE")
+    fsm_cache_ttl: int = Field(300, alias="FSM_CACHE_TTL")
+    # Время жизни ключей FSM в Redis (сек): по умолчанию и для отдельных групп
+    # состояний в формате {"AdminStates": 3600} или AdminStates=3600,OtherStates=600
+    fsm_state_ttl: int = Field(7 * 24 * 3600, alias="FSM_STATE_TTL")
+    fsm_data_ttl: int = Field(7 * 24 * 3600, alias="FSM_DATA_TTL")
+    fsm_group_ttls: str = Field('{"AdminStates": 3600}', alias="FSM_GROUP_TTLS")
+    # Интервал проверки ключей FSM без TTL (сек), 0 - отключить
+    fsm_sweep_interval: int = Field(3600, alias="FSM_SWEEP_INTERVAL")
+    # Сколько живёт черновик рассылки в данных FSM (сек)
+    broadcast_draft_ttl: int = Field(3600, alias="BROADCAST_DRAFT_TTL")
+
+    # Защита от флуда: лимиты "запросов/секунд" для команд, callback и остальных сообщений
+    throttle_enabled: bool = Field(True, alias="THROTTLE_ENABLED")
+    throttle_limits: str = Field(
+        '{"default": "20/10", "start": "3/10", "status": "5/10", "callback": "10/5"}',
+        alias="THROTTLE_LIMITS"
+    )
+    # Предупредить пользователя один раз за окно (false - молча отбрасывать)
+    throttle_warn: bool = Field(True, alias="THROTTLE_WARN")
+
+    # Трассировка обновлений: экспорт (none, file, otlp), порог медленного обновления (мс)
+    # и доля сохраняемых быстрых обновлений
+    tracing_exporter: str = Field("none", alias="TRACING_EXPORTER")
+    tracing_slow_ms: float = Field(500.0, alias="TRACING_SLOW_MS")
+    tracing_sample_rate: float = Field(0.0, alias="TRACING_SAMPLE_RATE")
+    tracing_file: str = Field("data/traces.jsonl", alias="TRACING_FILE")
+    tracing_otlp_endpoint: str = Field("http://localhost:4318/v1/traces", alias="TRACING_OTLP_ENDPOINT")
+    tracing_service_name: str = Field("aiogram-bot", alias="TRACING_SERVICE_NAME")
+
+    # Профилирование из админки: длительность замера CPU по умолчанию и максимум (сек),
+    # интервал сэмплирования стека (мс), глубина стека tracemalloc
+    profiler_duration: int = Field(30, alias="PROFILER_DURATION")
+    profiler_max_duration: int = Field(300, alias="PROFILER_MAX_DURATION")
+    profiler_sample_interval_ms: int = Field(5, alias="PROFILER_SAMPLE_INTERVAL_MS")
+    profiler_tracemalloc_frames: int = Field(10, alias="PROFILER_TRACEMALLOC_FRAMES")
+
+    # Запись обезличенных обновлений для воспроизведения: каталог, размер файла (MB),
+    # соль псевдонимов (одинаковая соль - одинаковые псевдонимы во всех процессах), очередь
+    record_updates: bool = Field(False, alias="RECORD_UPDATES")
+    record_dir: str = Field("data/recordings", alias="RECORD_DIR")
+    record_rotate_mb: int = Field(100, alias="RECORD_ROTATE_MB")
+    record_salt: str = Field("", alias="RECORD_SALT")
+    record_queue_size: int = Field(10000, alias="RECORD_QUEUE_SIZE")
+
+    # Время жизни общего кэша статистики админской панели в Redis (сек)
+    dashboard_cache_ttl: int = Field(30, alias="DASHBOARD_CACHE_TTL")
+
+    # Внутренний сервер мониторинга (/metrics, /healthz, /readyz)
+    metrics_enabled: bool = Field(True, alias="METRICS_ENABLED")
+    monitoring_host: str = Field("0.0.0.0", alias="MONITORING_HOST")
+    monitoring_port: int = Field(9090, alias="MONITORING_PORT")
+    # Фоновая проверка зависимостей: интервал и таймаут (сек), порог задержки (мс)
+    health_check_interval: int = Field(10, alias="HEALTH_CHECK_INTERVAL")
+    health_probe_timeout: float = Field(5.0, alias="HEALTH_PROBE_TIMEOUT")
+    health_max_latency_ms: int = Field(1000, alias="HEALTH_MAX_LATENCY_MS")
+
+    # Сколько помнить обработанные update_id (сек), 0 - не проверять повторы
+    dedup_ttl: int = Field(300, alias="DEDUP_TTL")
 
     # Local Bot API settings
     use_local_api: bool = Field(False, alias="USE_LOCAL_API")
@@ -42,6 +107,47 @@ class Settings(BaseSettings):
     telegram_api_hash: str = Field("", alias="TELEGRAM_API_HASH")
     local_api_host: str = Field("telegram-bot-api", alias="LOCAL_API_HOST")
     local_api_port: int = Field(8081, alias="LOCAL_API_PORT")
+    # Мониторинг Local API: интервал проверок (сек) и пороги переключения
+    api_health_interval: int = Field(30, alias="API_HEALTH_INTERVAL")
+    api_failover_threshold: int = Field(3, alias="API_FAILOVER_THRESHOLD")
+    api_recovery_threshold: int = Field(3, alias="API_RECOVERY_THRESHOLD")
+
+    # Файлы: каталог скачиваний, общий с Local API volume и лимиты потоковой передачи
+    files_dir: str = Field("data/files", alias="FILES_DIR")
+    local_api_files_dir: str = Field("/var/lib/telegram-bot-api", alias="LOCAL_API_FILES_DIR")
+    file_chunk_size_kb: int = Field(1024, alias="FILE_CHUNK_SIZE_KB")
+    file_download_concurrency: int = Field(4, alias="FILE_DOWNLOAD_CONCURRENCY")
+    file_max_in_flight_mb: int = Field(64, alias="FILE_MAX_IN_FLIGHT_MB")
+    # Время жизни file_id в Redis (сек); постоянная копия хранится в media_cache
+    media_cache_ttl: int = Field(30 * 24 * 3600, alias="MEDIA_CACHE_TTL")
+    # Картинка к приветствию /start (путь к файлу); отправляется через кэш file_id
+    welcome_image: str = Field("", alias="WELCOME_IMAGE")
+
+    # HTTP connection pool for Bot API and other outbound requests
+    http_pool_limit: int = Field(100, alias="HTTP_POOL_LIMIT")
+    http_pool_limit_per_host: int = Field(100, alias="HTTP_POOL_LIMIT_PER_HOST")
+    http_keepalive_timeout: float = Field(60.0, alias="HTTP_KEEPALIVE_TIMEOUT")
+    http_dns_cache_ttl: int = Field(300, alias="HTTP_DNS_CACHE_TTL")
+    http_request_timeout: float = Field(60.0, alias="HTTP_REQUEST_TIMEOUT")
+    http_connect_timeout: float = Field(10.0, alias="HTTP_CONNECT_TIMEOUT")
+
+    # Update delivery settings: polling или webhook
+    bot_mode: str = Field("polling", alias="BOT_MODE")
+    webhook_base_url: str = Field("", alias="WEBHOOK_BASE_URL")
+    webhook_path: str = Field("/webhook", alias="WEBHOOK_PATH")
+    webhook_secret: str = Field("", alias="WEBHOOK_SECRET")
+    webhook_max_connections: int = Field(40, alias="WEBHOOK_MAX_CONNECTIONS")
+    webapp_host: str = Field("0.0.0.0", alias="WEBAPP_HOST")
+    webapp_port: int = Field(8080, alias="WEBAPP_PORT")
+    # Параллельная обработка обновлений: общий лимит, ёмкость и очередь чата
+    update_concurrency: int = Field(100, alias="UPDATE_CONCURRENCY")
+    update_max_pending: int = Field(1000, alias="UPDATE_MAX_PENDING")
+    update_chat_queue_limit: int = Field(20, alias="UPDATE_CHAT_QUEUE_LIMIT")
+
+    # Количество процессов-обработчиков в режиме webhook (1 - без супервизора)
+    webhook_workers: int = Field(1, alias="WEBHOOK_WORKERS")
+    webhook_queue_size: int = Field(1000, alias="WEBHOOK_QUEUE_SIZE")
+    webhook_worker_concurrency: int = Field(100, alias="WEBHOOK_WORKER_CONCURRENCY")
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -67,6 +173,32 @@ class Settings(BaseSettings):
                 return [int(x.strip()) for x in v.split(',') if x.strip()]
         return v
     
+    @validator('throttle_limits')
+    def parse_throttle_limits(cls, v):
+        """Парсим лимиты из JSON {"start": "3/10"} в {"start": (3, 10.0)}"""
+        if isinstance(v, str):
+            limits = {}
+            for bucket, rate in json.loads(v).items():
+                limit, window = str(rate).split('/', 1)
+                limits[bucket.lstrip('/')] = (int(limit), float(window))
+            limits.setdefault('default', (20, 10.0))
+            return limits
+        return v
+    
+    @validator('fsm_group_ttls')
+    def parse_fsm_group_ttls(cls, v):
+        """Парсим TTL групп состояний из JSON или строки Group=ttl через запятую"""
+        if isinstance(v, str):
+            try:
+                parsed = json.loads(v)
+                if isinstance(parsed, dict):
+                    return {group: int(ttl) for group, ttl in parsed.items()}
+            except (json.JSONDecodeError, ValueError):
+                pass
+            pairs = (item.split('=', 1) for item in v.split(',') if '=' in item)
+            return {group.strip(): int(ttl) for group, ttl in pairs}
+        return v
+    
     @property
     def database_url(self) -> str:
         """Формирование URL для подключения к базе данных"""
@@ -101,6 +233,16 @@ class Settings(BaseSettings):
         """Лимит скачивания файлов в MB"""
         return 2000 if self.use_local_api else 20
 
+    @property
+    def use_webhook(self) -> bool:
+        """Получение обновлений через webhook вместо long polling"""
+        return self.bot_mode.lower() == "webhook"
+
+    @property
+    def webhook_url(self) -> str:
+        """Публичный URL webhook, который регистрируется в Telegram"""
+        return f"{self.webhook_base_url.rstrip('/')}{self.webhook_path}"
+
     @property
     def api_mode_name(self) -> str:
         """Человекочитаемое название режима API"""
@@ -1,14 +1,18 @@
 """
 Класс для работы с базой данных
 """
+import asyncio
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy import select, func, update
+from sqlalchemy import select, func, update, delete
+from sqlalchemy.dialects.postgresql import insert
 from loguru import logger
 
 from app.config import settings
-from .models import Base, User, BotStats, MigrationHistory
+from app.utils.metrics import instrument_engine
+from app.utils.tracing import trace_engine, tracer
+from .models import Base, User, BotStats, MediaCache, MigrationHistory
 from .migrations import MigrationManager
 
 
@@ -24,6 +28,10 @@ class Database:
             echo=False,
             pool_pre_ping=True
         )
+        if settings.metrics_enabled:
+            instrument_engine(self.engine)
+        if tracer.enabled:
+            trace_engine(self.engine)
         
         self.session_maker = async_sessionmaker(
             bind=self.engine,
@@ -33,6 +41,7 @@ class Database:
         
         # Инициализируем менеджер миграций
         self.migration_manager = MigrationManager(self.engine)
+        self.backfill_task: Optional[asyncio.Task] = None
     
     async def run_migrations(self):
         """Запуск всех неприменённых миграций"""
@@ -43,6 +52,22 @@ class Database:
             logger.error(f"❌ Failed to run migrations: {e}")
             raise
     
+    def start_backfills(self) -> None:
+        """Запуск backfill-задач миграций в фоне"""
+        if self.backfill_task and not self.backfill_task.done():
+            return
+        self.backfill_task = asyncio.create_task(self.migration_manager.run_backfills())
+    
+    async def stop_backfills(self) -> None:
+        """Остановка фоновых backfill-задач (прогресс сохраняется)"""
+        if not self.backfill_task or self.backfill_task.done():
+            return
+        self.backfill_task.cancel()
+        try:
+            await self.backfill_task
+        except asyncio.CancelledError:
+            pass
+    
     async def create_tables(self):
         """Создание таблиц в базе данных"""
         # Сначала запускаем миграции
@@ -144,6 +169,55 @@ class Database:
             result = await session.execute(select(BotStats).order_by(BotStats.id.desc()).limit(1))
             return result.scalar_one_or_none()
     
+    async def get_dashboard_counts(self) -> Dict[str, Any]:
+        """
+        Данные админской панели одним запросом
+
+        Количество всех и активных пользователей считается за один проход
+        по users (count FILTER), последняя запись bot_stats - подзапросами.
+        """
+        latest_stats = select(BotStats).order_by(BotStats.id.desc()).limit(1).subquery()
+        query = select(
+            func.count(User.id).label("total_users"),
+            func.count(User.id).filter(User.is_active == True).label("active_users"),
+            select(latest_stats.c.status).scalar_subquery().label("status"),
+            select(latest_stats.c.last_restart).scalar_subquery().label("last_restart"),
+        )
+        async with self.session_maker() as session:
+            result = await session.execute(query)
+            return dict(result.one()._mapping)
+    
+    async def get_media_file_id(self, content_hash: str, media_type: str) -> Optional[str]:
+        """Получение file_id ранее загруженного файла по хэшу содержимого"""
+        async with self.session_maker() as session:
+            media = await session.get(MediaCache, (content_hash, media_type))
+            return media.file_id if media else None
+    
+    async def save_media_file_id(self, content_hash: str, media_type: str,
+                                 file_id: str, file_size: Optional[int] = None) -> None:
+        """Сохранение file_id загруженного файла"""
+        async with self.session_maker() as session:
+            stmt = insert(MediaCache).values(
+                content_hash=content_hash,
+                media_type=media_type,
+                file_id=file_id,
+                file_size=file_size
+            )
+            await session.execute(stmt.on_conflict_do_update(
+                index_elements=[MediaCache.content_hash, MediaCache.media_type],
+                set_={"file_id": stmt.excluded.file_id}
+            ))
+            await session.commit()
+    
+    async def delete_media_file_id(self, content_hash: str, media_type: str) -> None:
+        """Удаление недействительного file_id"""
+        async with self.session_maker() as session:
+            await session.execute(delete(MediaCache).where(
+                MediaCache.content_hash == content_hash,
+                MediaCache.media_type == media_type
+            ))
+            await session.commit()
+    
     async def get_migration_history(self) -> List[MigrationHistory]:
         """Получение истории миграций"""
         async with self.session_maker() as session:
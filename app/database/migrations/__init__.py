@@ -4,5 +4,7 @@
 
 from .manager import MigrationManager
 from .base import Migration
+from .backfill import Backfill, BackfillRunner
+from .schema import SchemaSnapshot
 
-__all__ = ['MigrationManager', 'Migration'] 
\ No newline at end of file
+__all__ = ['MigrationManager', 'Migration', 'Backfill', 'BackfillRunner', 'SchemaSnapshot'] 
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+Фоновое заполнение данных (backfill) для больших таблиц
+"""
+import asyncio
+import time
+from typing import List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from loguru import logger
+
+
+class Backfill:
+    """
+    Заполнение данных таблицы порциями по первичному ключу
+
+    Каждая порция выполняется и фиксируется в отдельной транзакции вместе
+    с курсором прогресса, поэтому прерванный backfill продолжается с места
+    остановки. Между порциями делается пауза, ограничивающая нагрузку на
+    диск и объём WAL.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        table_name: str,
+        set_clause: str,
+        where_clause: Optional[str] = None,
+        key_column: str = "id",
+        chunk_size: int = 1000,
+        sleep_seconds: float = 0.1
+    ):
+        self.name = name
+        self.table_name = table_name
+        self.set_clause = set_clause
+        self.where_clause = where_clause
+        self.key_column = key_column
+        self.chunk_size = chunk_size
+        self.sleep_seconds = sleep_seconds
+
+    async def get_chunk_upper_bound(self, connection: AsyncConnection, cursor: int) -> Optional[int]:
+        """Возвращает верхнюю границу ключа для следующей порции"""
+        result = await connection.execute(text(f"""
+            SELECT max({self.key_column}) FROM (
+                SELECT {self.key_column} FROM {self.table_name}
+                WHERE {self.key_column} > :cursor
+                ORDER BY {self.key_column}
+                LIMIT :chunk_size
+            ) AS chunk;
+        """), {"cursor": cursor, "chunk_size": self.chunk_size})
+        return result.scalar()
+
+    async def process_chunk(self, connection: AsyncConnection, lower: int, upper: int) -> int:
+        """
+        Обработка одной порции (lower, upper]
+
+        Переопределите для нестандартной логики заполнения.
+
+        Returns:
+            Количество обновлённых строк
+        """
+        where_sql = f" AND ({self.where_clause})" if self.where_clause else ""
+        result = await connection.execute(text(f"""
+            UPDATE {self.table_name}
+            SET {self.set_clause}
+            WHERE {self.key_column} > :lower AND {self.key_column} <= :upper{where_sql};
+        """), {"lower": lower, "upper": upper})
+        return result.rowcount
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.table_name})"
+
+    def __repr__(self) -> str:
+        return f"<Backfill({self.name})>"
+
+
+class BackfillRunner:
+    """Выполнение backfill-задач с сохранением курсора в таблице backfill_progress"""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    async def ensure_progress_table(self) -> None:
+        """Создает таблицу прогресса если её нет"""
+        async with self.engine.begin() as connection:
+            await connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS backfill_progress (
+                    name VARCHAR(255) PRIMARY KEY,
+                    last_key BIGINT NOT NULL DEFAULT 0,
+                    processed_rows BIGINT NOT NULL DEFAULT 0,
+                    completed_at TIMESTAMP WITH TIME ZONE,
+                    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+                );
+            """))
+
+    async def get_progress(self, backfill: Backfill) -> tuple[int, bool]:
+        """Возвращает сохранённый курсор и признак завершения"""
+        async with self.engine.connect() as connection:
+            result = await connection.execute(text("""
+                SELECT last_key, completed_at IS NOT NULL
+                FROM backfill_progress WHERE name = :name;
+            """), {"name": backfill.name})
+            row = result.first()
+
+        if row is None:
+            return 0, False
+        return row[0], row[1]
+
+    async def run(self, backfill: Backfill) -> int:
+        """
+        Выполняет backfill до конца таблицы
+
+        Returns:
+            Количество строк, обновлённых в этом запуске
+        """
+        cursor, completed = await self.get_progress(backfill)
+        if completed:
+            logger.debug(f"Backfill {backfill.name} already completed")
+            return 0
+
+        logger.info(f"🔄 Starting backfill {backfill} from {backfill.key_column} > {cursor}")
+        start_time = time.time()
+        processed = 0
+
+        while True:
+            async with self.engine.begin() as connection:
+                upper = await backfill.get_chunk_upper_bound(connection, cursor)
+
+                if upper is None:
+                    await connection.execute(text("""
+                        INSERT INTO backfill_progress (name, last_key, completed_at, updated_at)
+                        VALUES (:name, :cursor, NOW(), NOW())
+                        ON CONFLICT (name) DO UPDATE
+                        SET completed_at = NOW(), updated_at = NOW();
+                    """), {"name": backfill.name, "cursor": cursor})
+                    break
+
+                updated = await backfill.process_chunk(connection, cursor, upper)
+
+                # Курсор фиксируется в той же транзакции, что и данные порции
+                await connection.execute(text("""
+                    INSERT INTO backfill_progress (name, last_key, processed_rows, updated_at)
+                    VALUES (:name, :cursor, :updated, NOW())
+                    ON CONFLICT (name) DO UPDATE
+                    SET last_key = EXCLUDED.last_key,
+                        processed_rows = backfill_progress.processed_rows + EXCLUDED.processed_rows,
+                        updated_at = NOW();
+                """), {"name": backfill.name, "cursor": upper, "updated": updated})
+
+            cursor = upper
+            processed += updated
+
+            if backfill.sleep_seconds > 0:
+                await asyncio.sleep(backfill.sleep_seconds)
+
+        logger.info(
+            f"✅ Backfill {backfill.name} completed: {processed} rows "
+            f"in {time.time() - start_time:.2f}s"
+        )
+        return processed
+
+    async def run_all(self, backfills: List[Backfill]) -> None:
+        """Последовательно выполняет backfill-задачи, ошибки одной не останавливают остальные"""
+        if not backfills:
+            return
+
+        await self.ensure_progress_table()
+
+        for backfill in backfills:
+            try:
+                await self.run(backfill)
+            except asyncio.CancelledError:
+                logger.info(f"⏸️ Backfill {backfill.name} paused, will resume on next start")
+                raise
+            except Exception as e:
+                logger.error(f"❌ Backfill {backfill.name} failed: {e}")
@@ -2,17 +2,40 @@
 Базовый класс для миграций базы данных
 """
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import List, Optional, Sequence, TYPE_CHECKING
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncConnection
 from loguru import logger
 
+from .schema import SchemaSnapshot
+
+if TYPE_CHECKING:
+    from .backfill import Backfill
+
+
+def quote_identifier(name: str) -> str:
+    """
+    Имя в кавычках: Postgres не приводит его к нижнему регистру, поэтому
+    индекс называется ровно так, как передано, и находится по pg_class.relname
+    """
+    return '"' + name.replace('"', '""') + '"'
+
 
 class Migration(ABC):
     """Базовый класс для всех миграций"""
     
+    # Выполнять ли миграцию внутри транзакции.
+    # False - миграция выполняется в режиме autocommit, что позволяет
+    # использовать CREATE INDEX CONCURRENTLY и другие онлайн-операции
+    transactional: bool = True
+    
     def __init__(self):
         self.name = self.__class__.__name__
         self.version = self.get_version()
+        # Снимок схемы, который MigrationManager передаёт перед применением
+        self.schema: Optional[SchemaSnapshot] = None
+        # Индексы, которые миграция строит через CREATE INDEX CONCURRENTLY
+        self.concurrent_indexes: List[str] = []
     
     @abstractmethod
     def get_version(self) -> str:
@@ -38,6 +61,128 @@ class Migration(ABC):
         """Проверка, можно ли применить миграцию"""
         return True
     
+    async def table_exists(self, connection: AsyncConnection, table_name: str) -> bool:
+        """Проверка существования таблицы по снимку схемы (без запроса к БД)"""
+        if self.schema and not self.schema.stale:
+            return self.schema.has_table(table_name)
+        
+        result = await connection.execute(text("""
+            SELECT EXISTS (
+                SELECT FROM information_schema.tables 
+                WHERE table_schema = 'public' 
+                AND table_name = :table_name
+            );
+        """), {"table_name": table_name})
+        return result.scalar()
+    
+    async def column_exists(self, connection: AsyncConnection, table_name: str, column_name: str) -> bool:
+        """Проверка существования столбца по снимку схемы (без запроса к БД)"""
+        if self.schema and not self.schema.stale:
+            return self.schema.has_column(table_name, column_name)
+        
+        result = await connection.execute(text("""
+            SELECT EXISTS (
+                SELECT FROM information_schema.columns 
+                WHERE table_schema = 'public' 
+                AND table_name = :table_name 
+                AND column_name = :column_name
+            );
+        """), {"table_name": table_name, "column_name": column_name})
+        return result.scalar()
+    
+    def get_backfills(self) -> List["Backfill"]:
+        """
+        Заполнение данных, выполняемое в фоне после применения миграции
+        
+        Backfill не блокирует запуск бота и продолжается с места остановки
+        после перезапуска.
+        """
+        return []
+    
+    async def create_index_concurrently(
+        self,
+        connection: AsyncConnection,
+        index_name: str,
+        table_name: str,
+        columns: Sequence[str],
+        unique: bool = False,
+        where: Optional[str] = None
+    ) -> None:
+        """
+        Создание индекса без блокировки записи в таблицу
+        
+        Доступно только для миграций с transactional = False:
+        CREATE INDEX CONCURRENTLY нельзя выполнить внутри транзакции.
+        """
+        if self.transactional:
+            raise RuntimeError(
+                f"Migration {self.name} must set transactional = False "
+                f"to create index {index_name} concurrently"
+            )
+        
+        unique_sql = "UNIQUE " if unique else ""
+        where_sql = f" WHERE {where}" if where else ""
+        
+        # Невалидный индекс от прерванной попытки удаляем,
+        # иначе CREATE INDEX ... IF NOT EXISTS его пропустит
+        self.concurrent_indexes.append(index_name)
+        await self.drop_invalid_indexes(connection, [index_name])
+        
+        logger.info(f"Creating index {index_name} on {table_name} concurrently...")
+        await connection.execute(text(
+            f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {quote_identifier(index_name)} "
+            f"ON {table_name} ({', '.join(columns)}){where_sql};"
+        ))
+    
+    async def drop_invalid_indexes(
+        self,
+        connection: AsyncConnection,
+        index_names: Optional[Sequence[str]] = None
+    ) -> List[str]:
+        """
+        Удаляет невалидные индексы этой миграции, оставшиеся после прерванного
+        CREATE INDEX CONCURRENTLY
+        
+        Затрагиваются только index_names (по умолчанию - индексы, которые
+        миграция уже начала строить): чужие невалидные индексы, например после
+        неудачного REINDEX CONCURRENTLY, остаются администратору. Индексы,
+        которые прямо сейчас строятся другой сессией, не трогаем.
+        """
+        names = list(self.concurrent_indexes if index_names is None else index_names)
+        if not names:
+            return []
+        
+        result = await connection.execute(text("""
+            SELECT c.relname
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public'
+            AND c.relname = ANY(:names)
+            AND NOT i.indisvalid
+            AND NOT EXISTS (
+                SELECT 1 FROM pg_stat_progress_create_index p
+                WHERE p.index_relid = i.indexrelid
+            );
+        """), {"names": names})
+        invalid_indexes = [row[0] for row in result.fetchall()]
+        
+        for index_name in invalid_indexes:
+            logger.warning(f"⚠️ Dropping invalid index {index_name} left by interrupted migration")
+            await connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {quote_identifier(index_name)};"))
+        
+        return invalid_indexes
+    
+    async def drop_index_concurrently(self, connection: AsyncConnection, index_name: str) -> None:
+        """Удаление индекса без блокировки таблицы (только для transactional = False)"""
+        if self.transactional:
+            raise RuntimeError(
+                f"Migration {self.name} must set transactional = False "
+                f"to drop index {index_name} concurrently"
+            )
+        
+        await connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {quote_identifier(index_name)};"))
+    
     def __str__(self) -> str:
         return f"{self.version}_{self.name}: {self.get_description()}"
     
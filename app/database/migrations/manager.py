@@ -12,6 +12,8 @@ from loguru import logger
 
 from app.database.models import MigrationHistory
 from .base import Migration
+from .backfill import BackfillRunner
+from .schema import SchemaSnapshot
 
 
 class MigrationManager:
@@ -21,21 +23,15 @@ class MigrationManager:
         self.engine = engine
         self.migrations_dir = Path(__file__).parent / "versions"
         self.migrations_dir.mkdir(exist_ok=True)
+        self.backfill_runner = BackfillRunner(engine)
+        # Снимок схемы текущего запуска миграций
+        self.schema: Optional[SchemaSnapshot] = None
     
     async def ensure_migration_table(self, connection: AsyncConnection) -> None:
         """Создает таблицу миграций если её нет"""
         try:
             # Проверяем существование таблицы
-            result = await connection.execute(text("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_schema = 'public' 
-                    AND table_name = 'migration_history'
-                );
-            """))
-            exists = result.scalar()
-            
-            if not exists:
+            if not await self.check_table_exists(connection, "migration_history"):
                 # Создаем таблицу миграций
                 await connection.execute(text("""
                     CREATE TABLE migration_history (
@@ -47,6 +43,10 @@ class MigrationManager:
                         execution_time FLOAT
                     );
                 """))
+                if self.schema:
+                    self.schema.add_table("migration_history", [
+                        "id", "version", "name", "description", "applied_at", "execution_time"
+                    ])
                 logger.info("✅ Created migration_history table")
         except Exception as e:
             logger.error(f"❌ Error creating migration table: {e}")
@@ -104,13 +104,24 @@ class MigrationManager:
         try:
             logger.info(f"🔄 Applying migration: {migration}")
             
+            # Снимок устарел после предыдущей миграции - перечитываем из pg_catalog
+            if self.schema and self.schema.stale:
+                await self.schema.reload(connection)
+            
+            # Передаём миграции снимок схемы для проверок
+            migration.schema = self.schema
+            
             # Проверяем, можно ли применить миграцию
             if not await migration.check_can_apply(connection):
                 logger.warning(f"⚠️ Migration {migration.name} cannot be applied, skipping")
                 return False
             
-            # Применяем миграцию
-            await migration.upgrade(connection)
+            try:
+                await migration.upgrade(connection)
+            finally:
+                # Миграция могла выполнить любой DDL
+                if self.schema:
+                    self.schema.stale = True
             
             # Записываем в историю
             execution_time = time.time() - start_time
@@ -131,41 +142,90 @@ class MigrationManager:
             logger.error(f"❌ Error applying migration {migration.name}: {e}")
             raise
     
+    async def apply_non_transactional_migration(self, migration: Migration) -> bool:
+        """Применяет миграцию вне транзакции (autocommit)"""
+        autocommit_engine = self.engine.execution_options(isolation_level="AUTOCOMMIT")
+        
+        async with autocommit_engine.connect() as connection:
+            # Мусор от предыдущих неудачных попыток миграция убирает сама
+            # перед построением каждого своего индекса
+            migration.concurrent_indexes.clear()
+            try:
+                return await self.apply_migration(connection, migration)
+            except Exception:
+                # Частично построенные индексы этой миграции не откатываются сами
+                try:
+                    await migration.drop_invalid_indexes(connection)
+                except Exception as cleanup_error:
+                    logger.error(f"❌ Error cleaning up invalid indexes: {cleanup_error}")
+                raise
+    
     async def run_migrations(self) -> None:
         """Запускает все неприменённые миграции"""
-        async with self.engine.connect() as connection:
-            # Начинаем транзакцию
-            async with connection.begin():
-                # Убеждаемся что таблица миграций существует
-                await self.ensure_migration_table(connection)
-                
-                # Получаем список примененных миграций
-                applied_migrations = await self.get_applied_migrations(connection)
-                
-                # Находим все доступные миграции
-                all_migrations = self.discover_migrations()
-                
-                # Фильтруем неприменённые миграции
-                pending_migrations = [
-                    m for m in all_migrations 
-                    if m.version not in applied_migrations
-                ]
-                
-                if not pending_migrations:
-                    logger.info("✅ All migrations are up to date")
-                    return
-                
-                logger.info(f"🔄 Found {len(pending_migrations)} pending migrations")
-                
-                # Применяем миграции по порядку
-                for migration in pending_migrations:
+        try:
+            await self._run_pending_migrations()
+        finally:
+            # Снимок актуален только в рамках одного запуска
+            self.schema = None
+    
+    async def _run_pending_migrations(self) -> None:
+        """Применяет неприменённые миграции, используя снимок схемы"""
+        async with self.engine.begin() as connection:
+            # Загружаем снимок схемы одним запросом к pg_catalog
+            self.schema = await SchemaSnapshot.load(connection)
+            
+            # Убеждаемся что таблица миграций существует
+            await self.ensure_migration_table(connection)
+            
+            # Получаем список примененных миграций
+            applied_migrations = await self.get_applied_migrations(connection)
+        
+        # Находим все доступные миграции
+        all_migrations = self.discover_migrations()
+        
+        # Фильтруем неприменённые миграции
+        pending_migrations = [
+            m for m in all_migrations 
+            if m.version not in applied_migrations
+        ]
+        
+        if not pending_migrations:
+            logger.info("✅ All migrations are up to date")
+            return
+        
+        logger.info(f"🔄 Found {len(pending_migrations)} pending migrations")
+        
+        # Применяем миграции по порядку, каждую в своей транзакции,
+        # а нетранзакционные - в режиме autocommit
+        for migration in pending_migrations:
+            if migration.transactional:
+                async with self.engine.begin() as connection:
                     await self.apply_migration(connection, migration)
-                
-                logger.info(f"✅ Successfully applied {len(pending_migrations)} migrations")
+            else:
+                await self.apply_non_transactional_migration(migration)
+        
+        logger.info(f"✅ Successfully applied {len(pending_migrations)} migrations")
+    
+    async def run_backfills(self) -> None:
+        """Выполняет backfill-задачи всех применённых миграций"""
+        async with self.engine.connect() as connection:
+            applied_migrations = await self.get_applied_migrations(connection)
+        
+        backfills = [
+            backfill
+            for migration in self.discover_migrations()
+            if migration.version in applied_migrations
+            for backfill in migration.get_backfills()
+        ]
+        
+        await self.backfill_runner.run_all(backfills)
     
     async def check_column_exists(self, connection: AsyncConnection, 
                                 table_name: str, column_name: str) -> bool:
         """Проверяет существование столбца в таблице"""
+        if self.schema and not self.schema.stale:
+            return self.schema.has_column(table_name, column_name)
+        
         try:
             result = await connection.execute(text("""
                 SELECT EXISTS (
@@ -182,6 +242,9 @@ class MigrationManager:
     
     async def check_table_exists(self, connection: AsyncConnection, table_name: str) -> bool:
         """Проверяет существование таблицы"""
+        if self.schema and not self.schema.stale:
+            return self.schema.has_table(table_name)
+        
         try:
             result = await connection.execute(text("""
                 SELECT EXISTS (
@@ -193,4 +256,4 @@ class MigrationManager:
             return result.scalar()
         except Exception as e:
             logger.error(f"❌ Error checking table {table_name}: {e}")
-            return False 
\ No newline at end of file
+            return False
@@ -0,0 +1,77 @@
+"""
+Снимок схемы базы данных для проверок в миграциях
+"""
+from typing import Dict, List, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+class SchemaSnapshot:
+    """
+    Снимок таблиц, столбцов и индексов схемы public
+
+    Загружается одним запросом к pg_catalog в начале запуска миграций,
+    поэтому проверки в check_can_apply сводятся к поиску в словаре.
+    Миграция может выполнить любой DDL, поэтому после неё снимок помечается
+    устаревшим и перечитывается перед следующей миграцией.
+    """
+
+    def __init__(self):
+        self.tables: Dict[str, Set[str]] = {}
+        self.indexes: Dict[str, str] = {}  # имя индекса -> таблица
+        # Схема могла измениться - снимок нужно перезагрузить
+        self.stale = False
+
+    @classmethod
+    async def load(cls, connection: AsyncConnection) -> "SchemaSnapshot":
+        """Загружает снимок схемы одним запросом"""
+        snapshot = cls()
+        await snapshot.reload(connection)
+        return snapshot
+
+    async def reload(self, connection: AsyncConnection) -> None:
+        """Перечитывает схему из pg_catalog"""
+        result = await connection.execute(text("""
+            SELECT 'column' AS kind, c.relname AS table_name, a.attname AS name
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_attribute a
+                ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+            WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p')
+            UNION ALL
+            SELECT 'index', t.relname, i.relname
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_class t ON t.oid = x.indrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            WHERE n.nspname = 'public';
+        """))
+
+        self.tables = {}
+        self.indexes = {}
+        for kind, table_name, name in result.fetchall():
+            if kind == "column":
+                columns = self.tables.setdefault(table_name, set())
+                if name:
+                    columns.add(name)
+            else:
+                self.indexes[name] = table_name
+        self.stale = False
+
+    def has_table(self, table_name: str) -> bool:
+        """Проверяет существование таблицы"""
+        return table_name in self.tables
+
+    def has_column(self, table_name: str, column_name: str) -> bool:
+        """Проверяет существование столбца в таблице"""
+        return column_name in self.tables.get(table_name, ())
+
+    def has_index(self, index_name: str) -> bool:
+        """Проверяет существование индекса"""
+        return index_name in self.indexes
+
+    def add_table(self, table_name: str, columns: Optional[List[str]] = None) -> None:
+        self.tables.setdefault(table_name, set()).update(columns or [])
+
+    def __repr__(self) -> str:
+        return f"<SchemaSnapshot(tables={len(self.tables)}, indexes={len(self.indexes)})>"
@@ -26,28 +26,13 @@ class InitialTablesMigration(Migration):
         """Адаптация существующих таблиц и создание новых"""
         
         # Проверяем существует ли таблица users
-        result = await connection.execute(text("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name = 'users'
-            );
-        """))
-        users_exists = result.scalar()
+        users_exists = await self.table_exists(connection, "users")
         
         if users_exists:
             logger.info("Table 'users' already exists, checking structure...")
             
             # Проверяем и добавляем столбец is_active если его нет
-            result = await connection.execute(text("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.columns 
-                    WHERE table_schema = 'public' 
-                    AND table_name = 'users'
-                    AND column_name = 'is_active'
-                );
-            """))
-            has_is_active = result.scalar()
+            has_is_active = await self.column_exists(connection, "users", "is_active")
             
             if not has_is_active:
                 logger.info("Adding is_active column to users table...")
@@ -104,14 +89,7 @@ class InitialTablesMigration(Migration):
         """))
         
         # Проверяем существует ли таблица bot_stats
-        result = await connection.execute(text("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name = 'bot_stats'
-            );
-        """))
-        bot_stats_exists = result.scalar()
+        bot_stats_exists = await self.table_exists(connection, "bot_stats")
         
         if not bot_stats_exists:
             # Создаем таблицу статистики бота
@@ -136,14 +114,7 @@ class InitialTablesMigration(Migration):
             """))
         
         # Проверяем существует ли таблица migration_history (может быть создана init.sql)
-        result = await connection.execute(text("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name = 'migration_history'
-            );
-        """))
-        migration_history_exists = result.scalar()
+        migration_history_exists = await self.table_exists(connection, "migration_history")
         
         if not migration_history_exists:
             logger.info("Creating migration_history table...")
@@ -19,27 +19,9 @@ class AddUserColumnsExampleMigration(Migration):
     
     async def check_can_apply(self, connection: AsyncConnection) -> bool:
         """Проверяем, нужно ли добавлять столбцы"""
-        # Проверяем существование столбца phone
-        result = await connection.execute(text("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.columns 
-                WHERE table_schema = 'public' 
-                AND table_name = 'users' 
-                AND column_name = 'phone'
-            );
-        """))
-        phone_exists = result.scalar()
-        
-        # Проверяем существование столбца language_code
-        result = await connection.execute(text("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.columns 
-                WHERE table_schema = 'public' 
-                AND table_name = 'users' 
-                AND column_name = 'language_code'
-            );
-        """))
-        language_code_exists = result.scalar()
+        # Проверяем существование столбцов по снимку схемы
+        phone_exists = await self.column_exists(connection, "users", "phone")
+        language_code_exists = await self.column_exists(connection, "users", "language_code")
         
         # Применяем миграцию только если столбцы не существуют
         return not (phone_exists and language_code_exists)
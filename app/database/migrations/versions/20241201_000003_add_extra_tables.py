@@ -19,25 +19,9 @@ class AddExtraTablesMigration(Migration):
     
     async def check_can_apply(self, connection: AsyncConnection) -> bool:
         """Проверяем, нужно ли создавать таблицы"""
-        # Проверяем существование таблицы user_actions
-        result = await connection.execute(text("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name = 'user_actions'
-            );
-        """))
-        user_actions_exists = result.scalar()
-        
-        # Проверяем существование таблицы broadcasts
-        result = await connection.execute(text("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name = 'broadcasts'
-            );
-        """))
-        broadcasts_exists = result.scalar()
+        # Проверяем существование таблиц по снимку схемы
+        user_actions_exists = await self.table_exists(connection, "user_actions")
+        broadcasts_exists = await self.table_exists(connection, "broadcasts")
         
         # Применяем миграцию если хотя бы одной таблицы не существует
         return not (user_actions_exists and broadcasts_exists)
@@ -0,0 +1,42 @@
+"""
+Миграция для добавления таблицы media_cache
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from loguru import logger
+
+from app.database.migrations.base import Migration
+
+
+class AddMediaCacheMigration(Migration):
+    """Миграция для кэша file_id загруженных файлов по хэшу содержимого"""
+    
+    def get_version(self) -> str:
+        return "20261019_100000"
+    
+    def get_description(self) -> str:
+        return "Add media_cache table"
+    
+    async def check_can_apply(self, connection: AsyncConnection) -> bool:
+        """Проверяем, нужно ли создавать таблицу"""
+        return not await self.table_exists(connection, "media_cache")
+    
+    async def upgrade(self, connection: AsyncConnection) -> None:
+        """Создание таблицы sha256 содержимого -> file_id"""
+        await connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS media_cache (
+                content_hash VARCHAR(64) NOT NULL,
+                media_type VARCHAR(20) NOT NULL,
+                file_id TEXT NOT NULL,
+                file_size BIGINT,
+                created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (content_hash, media_type)
+            );
+        """))
+        
+        logger.info("✅ Created media_cache table")
+    
+    async def downgrade(self, connection: AsyncConnection) -> None:
+        """Откат миграции - удаление таблицы"""
+        await connection.execute(text("DROP TABLE IF EXISTS media_cache;"))
+        logger.info("✅ Dropped media_cache table")
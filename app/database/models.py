@@ -46,6 +46,21 @@ class BotStats(Base):
         return f"<BotStats(total_users={self.total_users}, status={self.status})>"
 
 
+class MediaCache(Base):
+    """Модель кэша file_id загруженных файлов по хэшу содержимого"""
+    
+    __tablename__ = "media_cache"
+    
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 содержимого
+    media_type: Mapped[str] = mapped_column(String(20), primary_key=True)
+    file_id: Mapped[str] = mapped_column(Text, nullable=False)
+    file_size: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self) -> str:
+        return f"<MediaCache(content_hash={self.content_hash}, media_type={self.media_type})>"
+
+
 class MigrationHistory(Base):
     """Модель для отслеживания примененных миграций"""
     
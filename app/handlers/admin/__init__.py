@@ -5,10 +5,12 @@ from aiogram import Router
 
 from .admin import router as admin_router
 from .api_settings import router as api_settings_router
+from .profiler import router as profiler_router
 
 # Объединяем роутеры
 combined_router = Router()
 combined_router.include_router(admin_router)
 combined_router.include_router(api_settings_router)
+combined_router.include_router(profiler_router)
 
 __all__ = ["combined_router"]
\ No newline at end of file
@@ -8,13 +8,15 @@ from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseStorage
 from loguru import logger
 
 from app.config import settings
 from app.database import db
 from app.states import AdminStates
 from app.keyboards import AdminKeyboards
-from app.services import BroadcastService
+from app.services import BroadcastService, BroadcastDraft, api_monitor, dashboard_service
+from app.utils.storage import CachedStorage
 
 router = Router()
 
@@ -24,38 +26,32 @@ def is_admin(user_id: int) -> bool:
     return settings.is_admin(user_id)
 
 
-@router.message(Command("admin"))
-async def admin_command(message: Message, bot: Bot):
-    """Обработчик команды /admin"""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав администратора")
-        return
-    
-    # Получаем статистику бота
-    stats = await db.get_bot_stats()
-    if not stats:
-        # Если статистики нет, создаем её
-        stats = await db.update_bot_stats()
-    
-    # Получаем актуальные данные
-    total_users = await db.get_users_count()
-    active_users = await db.get_active_users_count()
-    
-    # Форматируем время последнего запуска
-    last_restart = stats.last_restart.strftime("%d.%m.%Y %H:%M:%S")
-    
-    # Формируем сообщение со статистикой
-    text = f"""
+async def admin_panel_text() -> str:
+    """Текст главного меню админской панели со статистикой бота"""
+    snapshot = await dashboard_service.get_snapshot()
+    last_restart = snapshot.last_restart.strftime("%d.%m.%Y %H:%M:%S")
+    return f"""
 🔧 <b>Админская панель</b>
 
 📊 <b>Статистика бота:</b>
-👥 Всего пользователей: <b>{total_users}</b>
-✅ Активных пользователей: <b>{active_users}</b>
-🟢 Статус: <b>{stats.status}</b>
+👥 Всего пользователей: <b>{snapshot.total_users}</b>
+✅ Активных пользователей: <b>{snapshot.active_users}</b>
+🟢 Статус: <b>{snapshot.status}</b>
 🕐 Последний запуск: <b>{last_restart}</b>
+🌐 Режим API: <b>{api_monitor.active_mode_name}</b>
 
 Выберите действие:
 """
+
+
+@router.message(Command("admin"))
+async def admin_command(message: Message, bot: Bot):
+    """Обработчик команды /admin"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав администратора")
+        return
+    
+    text = await admin_panel_text()
     
     await message.answer(
         text=text,
@@ -89,8 +85,16 @@ async def receive_broadcast_message(message: Message, state: FSMContext):
         await state.clear()
         return
     
-    # Сохраняем сообщение в состояние
-    await state.update_data(broadcast_message=message)
+    draft = BroadcastDraft.from_message(message)
+    if not draft:
+        await message.answer(
+            "❌ <b>Этот тип сообщения не поддерживается</b>\n\n"
+            "Отправьте другое сообщение или введите /cancel для отмены"
+        )
+        return
+    
+    # Сохраняем в состояние компактный черновик вместо объекта Message
+    await state.update_data(broadcast_draft=draft.to_dict())
     
     # Получаем количество пользователей для рассылки
     users_count = await db.get_active_users_count()
@@ -143,11 +147,16 @@ async def receive_broadcast_button(message: Message, state: FSMContext):
     button_text = match.group(1).strip()
     button_url = match.group(2).strip()
     
-    # Сохраняем данные кнопки
-    await state.update_data(
-        button_text=button_text,
-        button_url=button_url
-    )
+    draft = BroadcastDraft.from_dict(await state.get_value("broadcast_draft"))
+    if not draft:
+        await message.answer("❌ Черновик рассылки устарел, начните заново через /admin")
+        await state.clear()
+        return
+    
+    # Сохраняем данные кнопки в черновик
+    draft.button_text = button_text
+    draft.button_url = button_url
+    await state.update_data(broadcast_draft=draft.to_dict())
     
     # Создаем превью кнопки
     preview_keyboard = AdminKeyboards.create_custom_button(button_text, button_url)
@@ -161,7 +170,6 @@ async def receive_broadcast_button(message: Message, state: FSMContext):
     )
     
     # Переходим к подтверждению
-    data = await state.get_data()
     users_count = await db.get_active_users_count()
     
     await message.answer(
@@ -196,22 +204,14 @@ async def confirm_broadcast(callback: CallbackQuery, state: FSMContext, bot: Bot
         await callback.answer("❌ У вас нет прав администратора")
         return
     
-    data = await state.get_data()
-    broadcast_message = data.get("broadcast_message")
+    # Загружаем только черновик рассылки
+    draft = BroadcastDraft.from_dict(await state.get_value("broadcast_draft"))
     
-    if not broadcast_message:
-        await callback.message.edit_text("❌ Ошибка: сообщение для рассылки не найдено")
+    if not draft:
+        await callback.message.edit_text("❌ Ошибка: сообщение для рассылки не найдено или устарело")
         await state.clear()
         return
     
-    # Создаем кнопку если есть
-    custom_keyboard = None
-    if data.get("button_text") and data.get("button_url"):
-        custom_keyboard = AdminKeyboards.create_custom_button(
-            data["button_text"],
-            data["button_url"]
-        )
-    
     # Начинаем рассылку
     broadcast_service = BroadcastService(bot)
     
@@ -243,8 +243,7 @@ async def confirm_broadcast(callback: CallbackQuery, state: FSMContext, bot: Bot
     # Запускаем рассылку
     try:
         final_stats = await broadcast_service.send_broadcast(
-            message=broadcast_message,
-            custom_keyboard=custom_keyboard,
+            draft=draft,
             progress_callback=update_progress
         )
         
@@ -299,4 +298,35 @@ async def cancel_any_state(message: Message, state: FSMContext):
         await state.clear()
         await message.answer("❌ Операция отменена")
     else:
-        await message.answer("ℹ️ Нет активных операций для отмены") 
\ No newline at end of file
+        await message.answer("ℹ️ Нет активных операций для отмены") 
+
+
+@router.message(Command("fsm_stats"))
+async def fsm_stats_command(message: Message, fsm_storage: BaseStorage):
+    """Количество ключей FSM в Redis и занимаемая ими память"""
+    if not is_admin(message.from_user.id):
+        return
+    
+    if not isinstance(fsm_storage, CachedStorage):
+        await message.answer("ℹ️ Отчёт доступен только для хранилища Redis")
+        return
+    
+    report = await fsm_storage.get_memory_report()
+    cache = fsm_storage.get_stats()
+    
+    parts = "\n".join(
+        f"• {part}: <b>{stats['keys']}</b> ключей, ~{stats['memory_bytes'] // 1024} KB"
+        for part, stats in sorted(report["parts"].items())
+    ) or "• ключей нет"
+    groups = "\n".join(
+        f"• {group}: <b>{count}</b>"
+        for group, count in sorted(report["state_groups"].items(), key=lambda item: -item[1])
+    ) or "• активных состояний нет"
+    
+    await message.answer(
+        f"🧠 <b>FSM в Redis</b>\n\n"
+        f"🔑 <b>Ключи:</b>\n{parts}\n\n"
+        f"📂 <b>Группы состояний</b> (выборка {report['sampled']} ключей):\n{groups}\n\n"
+        f"💾 Redis всего: <b>{report['used_memory'] // (1024 * 1024)} MB</b>\n"
+        f"⚡ Локальный кэш: <b>{cache['size']}</b> записей, попаданий {cache['hit_ratio']:.0%}"
+    )
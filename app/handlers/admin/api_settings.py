@@ -4,7 +4,6 @@
 import time
 from contextlib import suppress
 
-import aiohttp
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.exceptions import TelegramBadRequest
@@ -12,32 +11,18 @@ from loguru import logger
 
 from app.config import settings
 from app.keyboards import AdminKeyboards
-from app.database import db
+from app.services import api_monitor, http_pool
+from app.handlers.admin.admin import admin_panel_text
 
 router = Router()
 
 
-async def check_local_api_status() -> dict:
-    """Проверка статуса Local Bot API Server"""
-    result = {"available": False, "response_time_ms": None, "error": None}
-
-    try:
-        start = time.monotonic()
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                settings.local_api_url,
-                timeout=aiohttp.ClientTimeout(total=5)
-            ) as response:
-                result["response_time_ms"] = int((time.monotonic() - start) * 1000)
-                # Local API возвращает 404 на root, но соединение работает
-                result["available"] = response.status in (200, 404)
-    except aiohttp.ClientConnectorError:
-        result["error"] = "Connection refused"
-    except Exception as e:
-        result["error"] = str(e)
-
-    return result
+async def get_local_api_status() -> dict:
+    """Статус Local Bot API Server из кэша монитора"""
+    if api_monitor.is_running and api_monitor.status["checked_at"]:
+        return api_monitor.status
+    # Монитор не запущен (режим Public API) - разовая проверка
+    return await api_monitor.probe()
 
 
 @router.callback_query(F.data == "admin_api_settings")
@@ -47,7 +32,7 @@ async def api_settings_handler(callback: CallbackQuery):
         await callback.answer("Нет прав")
         return
 
-    mode = "Local Bot API" if settings.use_local_api else "Public Bot API"
+    mode = api_monitor.active_mode_name
 
     text = f"""
 <b>Настройки Bot API</b>
@@ -61,6 +46,16 @@ async def api_settings_handler(callback: CallbackQuery):
 
     if settings.use_local_api:
         text += f"\n<b>URL:</b> <code>{settings.local_api_url}</code>\n"
+        if not api_monitor.is_local_active:
+            text += "\n⚠️ Local API недоступен, бот временно работает через Public API\n"
+
+    pool = http_pool.get_stats()
+    text += f"""
+<b>HTTP-пул:</b>
+ Запросов: <b>{pool['requests']}</b> (ошибок: {pool['errors']})
+ Переиспользовано соединений: <b>{pool['reuse_ratio']:.0%}</b>
+ Лимит: {pool['limit']} (на хост: {pool['limit_per_host']})
+"""
 
     await callback.message.edit_text(
         text=text,
@@ -76,9 +71,10 @@ async def check_api_status_handler(callback: CallbackQuery):
         await callback.answer("Нет прав")
         return
 
-    await callback.answer("Проверяю...")
+    await callback.answer()
 
-    status = await check_local_api_status()
+    status = await get_local_api_status()
+    checked_at = time.strftime('%H:%M:%S', time.localtime(status["checked_at"]))
 
     if status["available"]:
         text = f"""
@@ -86,7 +82,7 @@ async def check_api_status_handler(callback: CallbackQuery):
 
 URL: <code>{settings.local_api_url}</code>
 Время ответа: <b>{status['response_time_ms']} мс</b>
-Проверено: <code>{time.strftime('%H:%M:%S')}</code>
+Проверено: <code>{checked_at}</code>
 """
     else:
         text = f"""
@@ -94,7 +90,7 @@ URL: <code>{settings.local_api_url}</code>
 
 URL: <code>{settings.local_api_url}</code>
 Ошибка: <code>{status.get('error', 'Unknown')}</code>
-Проверено: <code>{time.strftime('%H:%M:%S')}</code>
+Проверено: <code>{checked_at}</code>
 
 <b>Решения:</b>
 1. Запустите: <code>make dev-local</code>
@@ -150,24 +146,6 @@ async def api_back_handler(callback: CallbackQuery):
         await callback.answer("Нет прав")
         return
 
-    stats = await db.get_bot_stats()
-    if not stats:
-        stats = await db.update_bot_stats()
-
-    total_users = await db.get_users_count()
-    active_users = await db.get_active_users_count()
-    last_restart = stats.last_restart.strftime("%d.%m.%Y %H:%M:%S")
-
-    text = f"""
-<b>Админская панель</b>
-
-<b>Статистика бота:</b>
-Всего пользователей: <b>{total_users}</b>
-Активных: <b>{active_users}</b>
-Статус: <b>{stats.status}</b>
-Последний запуск: <b>{last_restart}</b>
-Режим API: <b>{settings.api_mode_name}</b>
-"""
-
+    text = await admin_panel_text()
     await callback.message.edit_text(text, reply_markup=AdminKeyboards.main_admin_menu())
     await callback.answer()
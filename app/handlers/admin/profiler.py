@@ -0,0 +1,165 @@
+"""
+Хендлеры профилирования работающего бота
+"""
+import asyncio
+import time
+import tracemalloc
+from typing import Awaitable, Callable
+
+from aiogram import Router, F
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BufferedInputFile, CallbackQuery, Message
+from loguru import logger
+
+from app.config import settings
+from app.keyboards import AdminKeyboards
+from app.services import ProfilerBusyError, profiler
+
+router = Router()
+
+
+def profiler_menu_text() -> str:
+    """Текст меню профилирования"""
+    memory = "включён" if tracemalloc.is_tracing() else "выключен"
+    return f"""
+🩺 <b>Профилирование</b>
+
+⏱ <b>cProfile</b> - статистика вызовов в event loop за {settings.profiler_duration} сек
+🔥 <b>Flamegraph</b> - сэмплы стека в формате folded stacks (speedscope, flamegraph.pl)
+🧵 <b>Задачи asyncio</b> - все задачи со стеками
+🧠 <b>Память</b> - разница снимков tracemalloc (сейчас {memory})
+
+Длительность замера можно задать командой <code>/profile 60</code>
+"""
+
+
+async def send_report(message: Message, data: bytes, filename: str, caption: str) -> None:
+    """Отправка отчёта документом"""
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    await message.answer_document(
+        BufferedInputFile(data, filename=f"{stamp}_{filename}"),
+        caption=caption
+    )
+
+
+async def run_capture(
+    message: Message,
+    capture: Callable[[], Awaitable[bytes]],
+    filename: str,
+    title: str
+) -> None:
+    """Замер CPU с уведомлением о начале и отправкой результата"""
+    try:
+        data = await capture()
+    except ProfilerBusyError:
+        await message.answer("⏳ Профилирование уже выполняется, дождитесь результата")
+        return
+    except Exception as e:
+        logger.error(f"❌ Profiler capture failed: {e}")
+        await message.answer(f"❌ Ошибка профилирования: {e}")
+        return
+
+    await send_report(message, data, filename, title)
+
+
+@router.callback_query(F.data == "admin_profiler")
+async def profiler_menu_handler(callback: CallbackQuery):
+    """Показать меню профилирования"""
+    if not settings.is_admin(callback.from_user.id):
+        await callback.answer("Нет прав")
+        return
+
+    await callback.message.edit_text(
+        profiler_menu_text(),
+        reply_markup=AdminKeyboards.profiler_menu(settings.profiler_duration, tracemalloc.is_tracing())
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data == "profiler_cpu")
+async def profiler_cpu_handler(callback: CallbackQuery):
+    """Замер cProfile на длительность по умолчанию"""
+    if not settings.is_admin(callback.from_user.id):
+        await callback.answer("Нет прав")
+        return
+
+    await callback.answer(f"⏱ Замер {settings.profiler_duration} сек...")
+    await run_capture(callback.message, profiler.profile_cpu, "cprofile.txt", "⏱ cProfile")
+
+
+@router.callback_query(F.data == "profiler_sample")
+async def profiler_sample_handler(callback: CallbackQuery):
+    """Сэмплирование стека для flamegraph"""
+    if not settings.is_admin(callback.from_user.id):
+        await callback.answer("Нет прав")
+        return
+
+    await callback.answer(f"🔥 Сэмплирование {settings.profiler_duration} сек...")
+    await run_capture(
+        callback.message, profiler.sample_stacks, "stacks.folded",
+        "🔥 Стеки в формате folded: откройте в speedscope.app или flamegraph.pl"
+    )
+
+
+@router.message(Command("profile"))
+async def profile_command(message: Message, command: CommandObject):
+    """Замер cProfile на заданное количество секунд: /profile 60"""
+    if not settings.is_admin(message.from_user.id):
+        return
+
+    seconds = settings.profiler_duration
+    if command.args:
+        if not command.args.strip().isdigit():
+            await message.answer("❌ Формат: <code>/profile 60</code>")
+            return
+        seconds = min(int(command.args), settings.profiler_max_duration)
+
+    await message.answer(f"⏱ Замер cProfile {seconds} сек...")
+    await run_capture(message, lambda: profiler.profile_cpu(seconds), "cprofile.txt", f"⏱ cProfile, {seconds} сек")
+
+
+@router.callback_query(F.data == "profiler_tasks")
+async def profiler_tasks_handler(callback: CallbackQuery):
+    """Дамп задач asyncio"""
+    if not settings.is_admin(callback.from_user.id):
+        await callback.answer("Нет прав")
+        return
+
+    await callback.answer()
+    await send_report(callback.message, profiler.dump_tasks(), "tasks.txt", "🧵 Задачи asyncio")
+
+
+@router.callback_query(F.data == "profiler_memory")
+async def profiler_memory_handler(callback: CallbackQuery):
+    """Снимок tracemalloc и разница с предыдущим"""
+    if not settings.is_admin(callback.from_user.id):
+        await callback.answer("Нет прав")
+        return
+
+    # Сравнение снимков занимает заметное время - не держим event loop
+    result = await asyncio.to_thread(profiler.memory_diff)
+    if result["started"]:
+        await callback.answer("🧠 tracemalloc включён, снимите следующий снимок позже")
+        await callback.message.edit_text(
+            profiler_menu_text(),
+            reply_markup=AdminKeyboards.profiler_menu(settings.profiler_duration, True)
+        )
+        return
+
+    await callback.answer()
+    await send_report(callback.message, result["report"], "memory.txt", "🧠 Разница с предыдущим снимком")
+
+
+@router.callback_query(F.data == "profiler_memory_stop")
+async def profiler_memory_stop_handler(callback: CallbackQuery):
+    """Выключение tracemalloc"""
+    if not settings.is_admin(callback.from_user.id):
+        await callback.answer("Нет прав")
+        return
+
+    profiler.stop_memory_tracing()
+    await callback.answer("⏹ tracemalloc выключен")
+    await callback.message.edit_text(
+        profiler_menu_text(),
+        reply_markup=AdminKeyboards.profiler_menu(settings.profiler_duration, False)
+    )
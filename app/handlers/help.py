@@ -1,14 +1,37 @@
 """
 Обработчики команд помощи и информации
 """
+import html
+from datetime import datetime
 from aiogram import Router, types
 from aiogram.filters import Command
 from loguru import logger
 
 from app.config import settings
+from app.services import health_prober
 
 router = Router(name="help")
 
+DEPENDENCY_NAMES = {
+    "database": "🗄️ База данных",
+    "redis": "🚀 Redis",
+    "bot_api": "📡 API Telegram",
+}
+
+
+def format_dependency(name: str) -> str:
+    """Строка статуса зависимости по результату последней фоновой проверки"""
+    title = DEPENDENCY_NAMES[name]
+    result = health_prober.status.get(name)
+    if result is None:
+        return f"{title}: нет данных"
+    if result["ok"]:
+        return f"{title}: ✅ {result['latency_ms']} мс"
+    if result["latency_ms"] is not None:
+        return f"{title}: ⚠️ медленно ({result['latency_ms']} мс)"
+    # Текст исключения может содержать <...>, а сообщение отправляется в HTML
+    return f"{title}: ❌ недоступна ({html.escape(result['error'])})"
+
 
 @router.message(Command("help"))
 async def help_command(message: types.Message) -> None:
@@ -40,14 +63,19 @@ async def status_command(message: types.Message) -> None:
     
     logger.info(f"📊 User {user.id} requested status")
     
+    # Команда показывает результат последней фоновой проверки, не проверяя заново
+    dependencies = "\n".join(format_dependency(name) for name in DEPENDENCY_NAMES)
+    checked_at = max((result["checked_at"] for result in health_prober.status.values()), default=None)
+    checked_text = (
+        datetime.fromtimestamp(checked_at).strftime('%H:%M:%S %d.%m.%Y') if checked_at else "ещё не проверялось"
+    )
+    
     status_text = (
         f"📊 <b>Статус бота</b>\n\n"
-        f"✅ Бот активен и работает\n"
+        f"{'✅ Бот активен и работает' if health_prober.is_ready else '⚠️ Бот работает с ограничениями'}\n"
         f"🏠 Среда: <code>{settings.env}</code>\n"
-        f"🗄️ База данных: Подключена\n"
-        f"🚀 Redis: Подключен\n"
-        f"📡 API Telegram: Доступен\n\n"
-        f"⏰ Время проверки: {message.date.strftime('%H:%M:%S %d.%m.%Y')}"
+        f"{dependencies}\n\n"
+        f"⏰ Время проверки: {checked_text}"
     )
     
     await message.answer(status_text)
@@ -2,10 +2,14 @@
 Обработчик команды /start
 """
 from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import Message
 from aiogram.filters import CommandStart
+from loguru import logger
 
+from app.config import settings
 from app.database import db
+from app.services import media_cache
 
 router = Router()
 
@@ -32,4 +36,14 @@ async def start_command(message: Message):
 Для получения помощи используйте команду /help
 """
     
+    # Картинка загружается один раз, дальше отправляется сохранённый file_id
+    if settings.welcome_image:
+        try:
+            await media_cache.send(
+                message.bot, message.chat.id, settings.welcome_image, "photo", caption=welcome_text
+            )
+            return
+        except (OSError, TelegramBadRequest) as e:
+            logger.warning(f"⚠️ Failed to send welcome image {settings.welcome_image}: {e}")
+    
     await message.answer(welcome_text)
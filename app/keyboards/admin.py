@@ -23,6 +23,11 @@ class AdminKeyboards:
             callback_data="admin_api_settings"
         ))
 
+        builder.add(InlineKeyboardButton(
+            text="🩺 Профилирование",
+            callback_data="admin_profiler"
+        ))
+
         builder.adjust(1)
         return builder.as_markup()
     
@@ -132,4 +137,43 @@ class AdminKeyboards:
         ))
 
         builder.adjust(1)
-        return builder.as_markup()
\ No newline at end of file
+        return builder.as_markup()
+
+    @staticmethod
+    def profiler_menu(duration: int, memory_tracing: bool) -> InlineKeyboardMarkup:
+        """Меню профилирования"""
+        builder = InlineKeyboardBuilder()
+
+        builder.add(InlineKeyboardButton(
+            text=f"⏱ cProfile ({duration} сек)",
+            callback_data="profiler_cpu"
+        ))
+
+        builder.add(InlineKeyboardButton(
+            text=f"🔥 Flamegraph ({duration} сек)",
+            callback_data="profiler_sample"
+        ))
+
+        builder.add(InlineKeyboardButton(
+            text="🧵 Задачи asyncio",
+            callback_data="profiler_tasks"
+        ))
+
+        builder.add(InlineKeyboardButton(
+            text="🧠 Снимок памяти" if memory_tracing else "🧠 Включить tracemalloc",
+            callback_data="profiler_memory"
+        ))
+
+        if memory_tracing:
+            builder.add(InlineKeyboardButton(
+                text="⏹ Выключить tracemalloc",
+                callback_data="profiler_memory_stop"
+            ))
+
+        builder.add(InlineKeyboardButton(
+            text="◀️ Назад",
+            callback_data="api_back"
+        ))
+
+        builder.adjust(1)
+        return builder.as_markup()
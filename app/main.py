@@ -5,47 +5,77 @@ import asyncio
 import sys
 from loguru import logger
 
-import aiohttp
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
-from aiogram.client.session.aiohttp import AiohttpSession
-from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.redis import RedisStorage
 
 from app.config import settings
 from app.handlers import setup_routers
-from app.middlewares import setup_middlewares
+from app.middlewares import setup_middlewares, setup_update_executor
 from app.database import db
+from app.monitoring import monitoring_server
+from app.services import api_monitor, dashboard_service, health_prober, http_pool, media_cache, update_recorder
+from app.utils.logging import setup_logging
+from app.utils.startup import startup_timer
+from app.utils.storage import CachedStorage
+from app.utils.tracing import trace_redis, tracer
+from app.webhook import run_webhook
+from app.workers import run_webhook_workers
 
 
-async def check_local_api_available() -> bool:
-    """Проверка доступности Local Bot API Server"""
+async def setup_bot() -> tuple[Bot, Dispatcher]:
+    """Настройка бота и диспетчера"""
+
+    # Создаем хранилище состояний: RedisStorage с локальным кэшем
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                settings.local_api_url,
-                timeout=aiohttp.ClientTimeout(total=5)
-            ) as response:
-                # Local API возвращает 404 на root, но соединение работает
-                return response.status in (200, 404)
-    except Exception:
-        return False
+        storage = CachedStorage.from_url(
+            settings.redis_url,
+            max_size=settings.fsm_cache_size,
+            ttl=settings.fsm_cache_ttl,
+            group_ttls=settings.fsm_group_ttls,
+            sweep_interval=settings.fsm_sweep_interval,
+            state_ttl=settings.fsm_state_ttl,
+            data_ttl=settings.fsm_data_ttl
+        )
+    except Exception as e:
+        logger.error(f"❌ Failed to connect to Redis: {e}")
+        sys.exit(1)
 
+    # Проверка Local API и подключение к Redis не зависят друг от друга
+    local_api_probe = (
+        startup_timer.measure("local_api_probe", api_monitor.create_session())
+        if settings.use_local_api else api_monitor.create_session()
+    )
+    session, redis_result = await asyncio.gather(
+        local_api_probe,
+        startup_timer.measure("redis_connect", storage.redis.ping()),
+        return_exceptions=True
+    )
 
-async def setup_bot() -> tuple[Bot, Dispatcher]:
-    """Настройка бота и диспетчера"""
+    if isinstance(redis_result, Exception):
+        logger.error(f"❌ Failed to connect to Redis: {redis_result}")
+        sys.exit(1)
+    logger.info("✅ Redis storage connected successfully")
+    storage.start()
+    # Сервисы с кэшем в Redis используют клиент хранилища, а не свои пулы
+    media_cache.setup_redis(storage.redis)
+    dashboard_service.setup_redis(storage.redis)
+    if tracer.enabled:
+        trace_redis(storage.redis)
+        tracer.start()
+    if settings.record_updates:
+        update_recorder.start()
 
     # Настройка session в зависимости от режима API
-    session = None
+    if isinstance(session, Exception):
+        logger.error(f"❌ Failed to probe Local Bot API: {session}")
+        session = http_pool.create_bot_session()
+
     if settings.use_local_api:
         logger.info("🔧 Initializing Local Bot API mode...")
         logger.info(f"📡 API URL: {settings.local_api_url}")
 
-        if await check_local_api_available():
-            session = AiohttpSession(
-                api=TelegramAPIServer.from_base(settings.local_api_url, is_local=True)
-            )
+        if session.api.is_local:
             logger.info("✅ Local Bot API connected")
             logger.info(f"📁 File upload limit: {settings.file_upload_limit_mb} MB")
         else:
@@ -61,14 +91,6 @@ async def setup_bot() -> tuple[Bot, Dispatcher]:
         session=session
     )
     
-    # Создаем хранилище состояний
-    try:
-        storage = RedisStorage.from_url(settings.redis_url)
-        logger.info("✅ Redis storage connected successfully")
-    except Exception as e:
-        logger.error(f"❌ Failed to connect to Redis: {e}")
-        sys.exit(1)
-    
     # Создаем диспетчер
     dp = Dispatcher(storage=storage)
     
@@ -81,59 +103,123 @@ async def setup_bot() -> tuple[Bot, Dispatcher]:
     return bot, dp
 
 
-async def on_startup(bot: Bot) -> None:
+async def record_restart() -> None:
+    """Обновление статистики запуска и сброс устаревшего снимка админской панели"""
+    await db.update_bot_stats()
+    await dashboard_service.invalidate()
+
+
+async def on_startup(bot: Bot, dispatcher: Dispatcher) -> None:
     """Действия при запуске бота"""
-    # Инициализируем базу данных
-    try:
-        await db.create_tables()
-        await db.update_bot_stats()
-        logger.info("✅ Database initialized successfully")
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize database: {e}")
+    # Миграции и get_me не зависят друг от друга - выполняем параллельно
+    db_result, bot_info = await asyncio.gather(
+        startup_timer.measure("database", db.create_tables()),
+        startup_timer.measure("get_me", bot.get_me()),
+        return_exceptions=True
+    )
+    
+    if isinstance(db_result, Exception):
+        logger.error(f"❌ Failed to initialize database: {db_result}")
         sys.exit(1)
+    logger.info("✅ Database initialized successfully")
+    
+    if isinstance(bot_info, Exception):
+        raise bot_info
+    
+    # Необязательные этапы не задерживают получение первого обновления
+    startup_timer.run_in_background("bot_stats", record_restart())
+    db.start_backfills()
+    await api_monitor.start(bot)
+    await health_prober.start(bot, getattr(dispatcher.storage, "redis", None))
+    await monitoring_server.start()
     
-    bot_info = await bot.get_me()
     logger.info(f"🚀 Bot @{bot_info.username} started successfully!")
     logger.info(f"🏠 Environment: {settings.env}")
-    logger.info(f"🌐 API Mode: {settings.api_mode_name}")
+    logger.info(f"🌐 API Mode: {api_monitor.active_mode_name}")
+    logger.info(f"📬 Updates: {'webhook' if settings.use_webhook else 'long polling'}")
+    startup_timer.report()
+
+
+async def on_worker_startup(bot: Bot, dispatcher: Dispatcher) -> None:
+    """
+    Действия при запуске процесса-обработчика webhook
+
+    Миграции, статистика запуска, backfill и сервер мониторинга выполняются
+    один раз в главном процессе, здесь - только то, что нужно для обработки
+    обновлений в этом процессе. Обработчики (например, /status) читают
+    результаты проверок зависимостей своего процесса, поэтому health_prober
+    запускается в каждом процессе-обработчике.
+    """
+    await api_monitor.start(bot)
+    await health_prober.start(bot, getattr(dispatcher.storage, "redis", None))
+
+
+async def on_worker_shutdown(bot: Bot) -> None:
+    """Действия при остановке процесса-обработчика webhook"""
+    await health_prober.stop()
+    await api_monitor.stop()
+    await close_services(bot)
 
 
 async def on_shutdown(bot: Bot) -> None:
     """Действия при остановке бота"""
     logger.info("🛑 Bot is shutting down...")
+    # Сначала перестаём быть готовыми, чтобы балансировщик убрал трафик
+    await health_prober.stop()
+    await monitoring_server.stop()
+    await db.stop_backfills()
+    await api_monitor.stop()
+    await close_services(bot)
+
+
+async def close_services(bot: Bot) -> None:
+    """Закрытие соединений сервисов и сессии бота"""
+    await tracer.close()
+    await update_recorder.close()
     await bot.session.close()
+    await http_pool.close()
 
 
 async def main() -> None:
     """Главная функция"""
     
     # Настройка логирования
-    logger.remove()
-    logger.add(
-        sys.stdout,
-        level=settings.log_level,
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
-               "<level>{level: <8}</level> | "
-               "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
-               "<level>{message}</level>",
-        colorize=True
-    )
+    setup_logging()
     
     logger.info("🎯 Starting Aiogram Bot...")
     
     # Создаем бота и диспетчер
     bot, dp = await setup_bot()
     
+    # Ограниченная параллельная обработка с очередью на каждый чат.
+    # Регистрируется до on_shutdown, чтобы принятые обновления
+    # обработались до закрытия сессии бота
+    if not settings.use_webhook:
+        setup_update_executor(dp)
+    
     # Регистрируем startup и shutdown обработчики
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
     
     try:
-        # Запускаем polling
-        await dp.start_polling(
-            bot,
-            allowed_updates=dp.resolve_used_update_types()
-        )
+        if settings.use_webhook and settings.webhook_workers > 1:
+            # Принимаем webhook и распределяем обновления по процессам
+            await run_webhook_workers(bot, dp)
+        elif settings.use_webhook:
+            # Принимаем обновления через webhook
+            await run_webhook(bot, dp)
+        else:
+            # Снимаем webhook, иначе getUpdates вернёт конфликт
+            await bot.delete_webhook()
+            
+            # Запускаем polling
+            # handle_as_tasks=False: параллелизм и порядок обеспечивает
+            # UpdateExecutor, а polling ждёт, когда в нём есть место
+            await dp.start_polling(
+                bot,
+                allowed_updates=dp.resolve_used_update_types(),
+                handle_as_tasks=False
+            )
     except KeyboardInterrupt:
         logger.info("👋 Bot stopped by user")
     except Exception as e:
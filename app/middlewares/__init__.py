@@ -5,14 +5,56 @@ from aiogram import Dispatcher
 
 from .logging import LoggingMiddleware
 from .user import UserMiddleware
+from .executor import setup_update_executor
+from .throttling import ThrottlingMiddleware
+from .deduplication import DeduplicationMiddleware
+from .metrics import MetricsMiddleware
+from .tracing import HandlerSpanMiddleware, setup_update_tracing
+from .recording import RecordingMiddleware
+from app.config import settings
+from app.services import update_recorder
+from app.utils.tracing import tracer
 
 
 def setup_middlewares(dp: Dispatcher) -> None:
     """Настройка всех middleware"""
+    redis = getattr(dp.storage, "redis", None)
+    
+    # Метрики обработки обновлений (inner - замер внутри исполнителя обновлений)
+    if settings.metrics_enabled:
+        dp.update.middleware(MetricsMiddleware())
+    
+    # Трассировка: корневой span вокруг feed_update, включая чтение состояния FSM
+    if tracer.enabled:
+        setup_update_tracing(dp)
+    
+    # Повторно доставленные обновления отбрасываются первыми из наших middleware.
+    # В режиме polling они выполняются внутри задачи UpdateExecutor, поэтому
+    # ошибка обработчика доходит до middleware и снимает отметку update_id
+    if settings.dedup_ttl and redis is not None:
+        dp.update.outer_middleware(DeduplicationMiddleware(redis, ttl=settings.dedup_ttl))
+    
+    # Запись обезличенного трафика для воспроизведения (только по явному включению)
+    if settings.record_updates:
+        dp.update.outer_middleware(RecordingMiddleware(update_recorder))
+    
+    # Защита от флуда: outer middleware отбрасывает лишние обновления
+    # до логирования и сохранения пользователя
+    if settings.throttle_enabled and redis is not None:
+        throttling = ThrottlingMiddleware(redis, settings.throttle_limits, warn=settings.throttle_warn)
+        dp.message.outer_middleware(throttling)
+        dp.callback_query.outer_middleware(throttling)
+    
     # Middleware для логирования
-    dp.message.middleware(LoggingMiddleware())
-    dp.callback_query.middleware(LoggingMiddleware())
+    logging_middleware = LoggingMiddleware(sample_rate=settings.log_sample_rate)
+    dp.message.middleware(logging_middleware)
+    dp.callback_query.middleware(logging_middleware)
     
     # Middleware для пользователей
     dp.message.middleware(UserMiddleware())
     dp.callback_query.middleware(UserMiddleware())
+    
+    # Span самого обработчика - последним, чтобы не включать в него middleware
+    if tracer.enabled:
+        dp.message.middleware(HandlerSpanMiddleware())
+        dp.callback_query.middleware(HandlerSpanMiddleware())
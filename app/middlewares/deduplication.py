@@ -0,0 +1,86 @@
+"""
+Middleware для отбрасывания повторно доставленных обновлений
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from loguru import logger
+from redis.asyncio import Redis
+
+from app.utils.metrics import UPDATES_DROPPED
+
+
+class DeduplicationMiddleware(BaseMiddleware):
+    """
+    Обрабатывает каждое обновление не больше одного раза
+
+    При переключении API, повторах webhook и нескольких экземплярах бота
+    одно и то же обновление может прийти дважды. Перед обработкой update_id
+    атомарно отмечается в Redis (SET NX с коротким TTL); повтор, уже
+    отмеченный любым экземпляром, отбрасывается. Недавние update_id также
+    хранятся в локальном LRU, поэтому повтор в том же процессе отсекается
+    без запроса в Redis.
+
+    Если обработка завершилась ошибкой, отметка снимается, чтобы повторная
+    доставка могла обработать обновление заново. Для этого handler должен
+    выполнять обработку до конца, а не только ставить её в очередь: в режиме
+    polling UpdateExecutor оборачивает dp.feed_update целиком
+    (setup_update_executor), поэтому middleware работает внутри задачи
+    исполнителя и видит ошибку обработчика.
+    """
+
+    def __init__(self, redis: Redis, ttl: int = 300, local_size: int = 10000):
+        self.redis = redis
+        self.ttl = ttl
+        self.local_size = local_size
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+
+        self.duplicates = 0
+
+    def _remember(self, update_id: int) -> None:
+        self._seen[update_id] = None
+        if len(self._seen) > self.local_size:
+            self._seen.popitem(last=False)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+
+        update_id = event.update_id
+        if update_id in self._seen:
+            self.duplicates += 1
+            UPDATES_DROPPED.labels("duplicate").inc()
+            logger.debug(f"🔁 Duplicate update {update_id} dropped (local)")
+            return None
+
+        bot = data.get("bot")
+        key = f"dedup:{bot.id if bot else 0}:{update_id}"
+        try:
+            is_new = await self.redis.set(key, 1, nx=True, ex=self.ttl)
+        except Exception as e:
+            # Без Redis остаётся только локальная проверка
+            logger.warning(f"⚠️ Update deduplication check failed: {e}")
+            is_new = True
+
+        self._remember(update_id)
+        if not is_new:
+            self.duplicates += 1
+            UPDATES_DROPPED.labels("duplicate").inc()
+            logger.debug(f"🔁 Duplicate update {update_id} dropped")
+            return None
+
+        try:
+            return await handler(event, data)
+        except Exception:
+            self._seen.pop(update_id, None)
+            try:
+                await self.redis.delete(key)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to release update {update_id}: {e}")
+            raise
@@ -0,0 +1,67 @@
+"""
+Ограниченная параллельная обработка обновлений в режиме polling
+"""
+from typing import Any, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+from loguru import logger
+
+from app.config import settings
+from app.utils.executor import UpdateExecutor
+from app.utils.metrics import UPDATES_DROPPED
+
+
+def get_update_chat_id(update: Update) -> Optional[int]:
+    """Ключ очереди обновления: чат, а без чата - пользователь"""
+    context = UserContextMiddleware.resolve_event_context(update)
+    return context.chat_id if context.chat_id is not None else context.user_id
+
+
+def setup_update_executor(dp: Dispatcher) -> UpdateExecutor:
+    """
+    Подключение исполнителя обновлений к диспетчеру
+
+    Обновления одного чата выполняются по порядку, разных чатов - параллельно
+    с общим ограничением. Исполнитель оборачивает dp.feed_update, как и
+    процессы-обработчики webhook (app/workers.py), поэтому вся обработка,
+    включая чтение состояния FSM встроенным middleware aiogram, начинается
+    только после завершения предыдущего обновления этого чата: StateFilter
+    видит состояние, установленное предыдущим обработчиком.
+
+    Обёрнутый feed_update возвращает управление, как только обновление
+    принято в очередь, - polling сразу получает следующие обновления, а при
+    заполненном исполнителе ждёт. Ответ обработчика в виде метода Bot API
+    выполняется внутри задачи, ошибки обработки логирует исполнитель.
+    """
+    executor = UpdateExecutor(
+        concurrency=settings.update_concurrency,
+        max_pending=settings.update_max_pending,
+        chat_queue_limit=settings.update_chat_queue_limit
+    )
+    feed_update = dp.feed_update
+
+    async def process_update(bot: Bot, update: Update, **kwargs: Any) -> None:
+        response = await feed_update(bot, update, **kwargs)
+        if isinstance(response, TelegramMethod):
+            await dp.silent_call_request(bot=bot, result=response)
+
+    async def submit_update(bot: Bot, update: Update, **kwargs: Any) -> Any:
+        key = get_update_chat_id(update)
+
+        # Обновления без чата и пользователя не требуют упорядочивания
+        if key is None:
+            return await feed_update(bot, update, **kwargs)
+
+        if not await executor.submit(key, lambda: process_update(bot, update, **kwargs)):
+            logger.warning(f"⚠️ Update queue of chat {key} is full, update dropped")
+            UPDATES_DROPPED.labels("queue_full").inc()
+        return None
+
+    dp.feed_update = submit_update
+
+    dp.startup.register(executor.start_reporting)
+    dp.shutdown.register(executor.close)
+    return executor
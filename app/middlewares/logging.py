@@ -1,14 +1,47 @@
 """
 Middleware для логирования запросов
 """
+import random
+import time
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message, CallbackQuery
 from loguru import logger
 
+from app.utils.metrics import LOGGING_DURATION, LOG_RECORDS
+
 
 class LoggingMiddleware(BaseMiddleware):
-    """Middleware для логирования всех входящих обновлений"""
+    """
+    Middleware для логирования всех входящих обновлений
+
+    Одна запись на обновление после обработки, с длительностью в поле
+    duration_ms. Обычные обновления логируются с вероятностью sample_rate,
+    ошибки - всегда. Сообщение форматируется только если запись пройдёт
+    по уровню, а запись в stdout выполняет поток loguru (enqueue).
+    """
+    
+    def __init__(self, sample_rate: float = 1.0):
+        self.sample_rate = sample_rate
+    
+    @staticmethod
+    def _describe(event: TelegramObject) -> Dict[str, Any]:
+        """Поля записи лога для события"""
+        if isinstance(event, Message):
+            return {
+                "event": "message",
+                "user_id": event.from_user.id if event.from_user else None,
+                "username": event.from_user.username if event.from_user else None,
+                "text": event.text[:50] if event.text else None,
+            }
+        if isinstance(event, CallbackQuery):
+            return {
+                "event": "callback",
+                "user_id": event.from_user.id,
+                "username": event.from_user.username,
+                "data": event.data,
+            }
+        return {"event": type(event).__name__}
     
     async def __call__(
         self,
@@ -17,27 +50,39 @@ class LoggingMiddleware(BaseMiddleware):
         data: Dict[str, Any]
     ) -> Any:
         """Основной метод middleware"""
-        
-        # Логируем входящие сообщения
-        if isinstance(event, Message):
-            user = event.from_user
-            logger.info(
-                f"📥 Message from {user.id} (@{user.username}): "
-                f"'{event.text[:50] if event.text else 'No text'}'"
-            )
-        
-        # Логируем callback запросы
-        elif isinstance(event, CallbackQuery):
-            user = event.from_user
-            logger.info(
-                f"🔘 Callback from {user.id} (@{user.username}): "
-                f"'{event.data}'"
-            )
+        start = time.perf_counter()
         
         # Выполняем обработчик
         try:
             result = await handler(event, data)
-            return result
         except Exception as e:
-            logger.error(f"❌ Error in handler: {e}")
+            # Ошибки логируются всегда, независимо от выборки
+            duration_ms = round((time.perf_counter() - start) * 1000, 2)
+            log_start = time.perf_counter()
+            logger.bind(**self._describe(event), duration_ms=duration_ms).error(
+                "❌ Error in handler: {}", e
+            )
+            LOGGING_DURATION.observe(time.perf_counter() - log_start)
+            LOG_RECORDS.labels("error").inc()
             raise
+        
+        if self.sample_rate >= 1 or random.random() < self.sample_rate:
+            duration_ms = round((time.perf_counter() - start) * 1000, 2)
+            log_start = time.perf_counter()
+            fields = self._describe(event)
+            if fields["event"] == "message":
+                logger.bind(**fields, duration_ms=duration_ms).info(
+                    "📥 Message from {} (@{}): {!r} [{} ms]",
+                    fields["user_id"], fields["username"], fields["text"] or "No text", duration_ms
+                )
+            elif fields["event"] == "callback":
+                logger.bind(**fields, duration_ms=duration_ms).info(
+                    "🔘 Callback from {} (@{}): {!r} [{} ms]",
+                    fields["user_id"], fields["username"], fields["data"], duration_ms
+                )
+            LOGGING_DURATION.observe(time.perf_counter() - log_start)
+            LOG_RECORDS.labels("sampled").inc()
+        else:
+            LOG_RECORDS.labels("skipped").inc()
+        
+        return result
@@ -0,0 +1,37 @@
+"""
+Middleware для сбора метрик обработки обновлений
+"""
+import time
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.utils.metrics import UPDATES, UPDATE_ERRORS, UPDATE_LATENCY
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Количество, ошибки и время обработки обновлений по типам
+
+    Регистрируется как inner middleware на dp.update, поэтому время
+    замеряется внутри UpdateExecutor - это реальное время обработчиков,
+    а не время постановки в очередь.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        UPDATES.labels(update_type).inc()
+
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            UPDATE_ERRORS.labels(update_type).inc()
+            raise
+        finally:
+            UPDATE_LATENCY.labels(update_type).observe(time.perf_counter() - start)
@@ -0,0 +1,32 @@
+"""
+Middleware для записи входящих обновлений
+"""
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.config import settings
+from app.services.recorder import UpdateRecorder
+
+
+class RecordingMiddleware(BaseMiddleware):
+    """
+    Передаёт каждое обновление в UpdateRecorder
+
+    Регистрируется outer middleware после дедупликации, поэтому повторные
+    доставки не записываются. Сама запись выполняется в фоне.
+    """
+
+    def __init__(self, recorder: UpdateRecorder):
+        self.recorder = recorder
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if isinstance(event, Update):
+            user = data.get("event_from_user")
+            self.recorder.record(event, is_admin=bool(user and settings.is_admin(user.id)))
+        return await handler(event, data)
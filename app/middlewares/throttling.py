@@ -0,0 +1,146 @@
+"""
+Middleware для защиты от флуда
+"""
+import time
+import uuid
+from typing import Callable, Dict, Any, Awaitable, Optional, Tuple
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Message, CallbackQuery
+from loguru import logger
+from redis.asyncio import Redis
+
+from app.config import settings
+from app.utils.metrics import UPDATES_DROPPED
+
+# Скользящее окно в sorted set: удаляем отметки старше окна, считаем оставшиеся.
+# Возвращает {разрешено, нужно предупредить, через сколько мс освободится окно}.
+# Предупреждение отправляется один раз за окно благодаря ключу с SET NX.
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local warned_key = KEYS[2]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+if redis.call('ZCARD', key) < limit then
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('PEXPIRE', key, window)
+    return {1, 0, 0}
+end
+
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+local retry_after = window
+if oldest[2] then
+    retry_after = tonumber(oldest[2]) + window - now
+end
+
+local warn = 0
+if redis.call('SET', warned_key, 1, 'NX', 'PX', window) then
+    warn = 1
+end
+return {0, warn, retry_after}
+"""
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничение частоты запросов пользователя (скользящее окно в Redis)
+
+    Лимиты задаются отдельно для команд, callback-запросов и остальных
+    сообщений. Проверка выполняется одним атомарным Lua-скриптом, поэтому
+    лимит общий для всех экземпляров бота. Пользователи, уже упёршиеся
+    в лимит, отсекаются локально до конца окна без запросов в Redis.
+
+    Регистрируется как outer middleware, чтобы лишние обновления
+    отбрасывались до сохранения пользователя в базе и логирования.
+    """
+
+    def __init__(self, redis: Redis, limits: Dict[str, Tuple[int, float]], warn: bool = True):
+        self.redis = redis
+        self.limits = limits
+        self.warn = warn
+        self.script = redis.register_script(SLIDING_WINDOW_SCRIPT)
+        # (пользователь, бакет) -> время, до которого запросы отбрасываются локально
+        self._blocked: Dict[Tuple[int, str], float] = {}
+
+        self.throttled = 0
+
+    @staticmethod
+    def get_bucket(event: TelegramObject) -> str:
+        """Бакет лимита: имя команды, callback или default"""
+        if isinstance(event, CallbackQuery):
+            return "callback"
+        if isinstance(event, Message) and event.text and event.text.startswith("/"):
+            # /start@bot_name payload -> start; у "/" и "/ текст" команды нет
+            parts = event.text[1:].split(maxsplit=1)
+            if parts and not event.text[1].isspace():
+                return parts[0].split("@", 1)[0].lower() or "default"
+        return "default"
+
+    def _get_limit(self, bucket: str) -> Tuple[str, Tuple[int, float]]:
+        if bucket in self.limits:
+            return bucket, self.limits[bucket]
+        # Команды без своего лимита делят общий
+        return "default", self.limits["default"]
+
+    async def _check(self, user_id: int, bucket: str, limit: int, window: float) -> Tuple[bool, bool, float]:
+        """Проверка в Redis: (разрешено, предупредить, сек до освобождения окна)"""
+        allowed, warn, retry_after = await self.script(
+            keys=[f"throttle:{user_id}:{bucket}", f"throttle:warned:{user_id}:{bucket}"],
+            args=[int(time.time() * 1000), int(window * 1000), limit, uuid.uuid4().hex]
+        )
+        return bool(allowed), bool(warn), retry_after / 1000
+
+    def _cleanup(self, now: float) -> None:
+        self._blocked = {key: until for key, until in self._blocked.items() if until > now}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if not user or settings.is_admin(user.id):
+            return await handler(event, data)
+
+        bucket, (limit, window) = self._get_limit(self.get_bucket(event))
+        now = time.monotonic()
+
+        # Локальная проверка: пользователь уже упёрся в лимит
+        blocked_until: Optional[float] = self._blocked.get((user.id, bucket))
+        if blocked_until and blocked_until > now:
+            self.throttled += 1
+            UPDATES_DROPPED.labels("throttled").inc()
+            return None
+
+        try:
+            allowed, warn, retry_after = await self._check(user.id, bucket, limit, window)
+        except Exception as e:
+            # Недоступность Redis не должна останавливать бота
+            logger.warning(f"⚠️ Throttling check failed: {e}")
+            return await handler(event, data)
+
+        if allowed:
+            return await handler(event, data)
+
+        self.throttled += 1
+        UPDATES_DROPPED.labels("throttled").inc()
+        if len(self._blocked) > 10000:
+            self._cleanup(now)
+        self._blocked[(user.id, bucket)] = now + retry_after
+        logger.debug(f"🚦 Throttled {user.id} on {bucket}, retry in {retry_after:.1f}s")
+
+        if warn and self.warn:
+            await self._send_warning(event, retry_after)
+        return None
+
+    @staticmethod
+    async def _send_warning(event: TelegramObject, retry_after: float) -> None:
+        text = f"⏳ Слишком много запросов, попробуйте через {max(int(retry_after), 1)} сек."
+        try:
+            if isinstance(event, (Message, CallbackQuery)):
+                await event.answer(text)
+        except Exception as e:
+            logger.debug(f"Failed to send throttling warning: {e}")
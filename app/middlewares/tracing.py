@@ -0,0 +1,50 @@
+"""
+Middleware для трассировки обработки обновлений
+"""
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.utils.tracing import tracer
+
+
+def setup_update_tracing(dp: Dispatcher) -> None:
+    """
+    Корневой span на каждое обновление
+
+    Оборачивает dp.feed_update, поэтому трассировка начинается до встроенных
+    middleware aiogram: чтение состояния FSM из Redis (FSMContextMiddleware)
+    попадает в трассировку. В режиме polling исполнитель обновлений
+    оборачивает уже трассируемый feed_update, поэтому время ожидания в очереди
+    чата в span не входит. Запросы к базе данных, Redis и Bot API внутри
+    обработки становятся дочерними span.
+    """
+    feed_update = dp.feed_update
+
+    async def traced_feed_update(bot: Bot, update: Update, **kwargs: Any) -> Any:
+        user_id = UserContextMiddleware.resolve_event_context(update).user_id
+        with tracer.trace(
+            f"update.{update.event_type}",
+            update_id=update.update_id,
+            user_id=user_id or 0
+        ):
+            return await feed_update(bot, update, **kwargs)
+
+    dp.feed_update = traced_feed_update
+
+
+class HandlerSpanMiddleware(BaseMiddleware):
+    """Span вокруг самого обработчика - регистрируется последним inner middleware"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object: HandlerObject = data.get("handler")
+        name = getattr(handler_object.callback, "__name__", "handler") if handler_object else "handler"
+        with tracer.span(f"handler.{name}"):
+            return await handler(event, data)
@@ -7,6 +7,7 @@ from aiogram.types import TelegramObject, User
 from loguru import logger
 
 from app.database import db
+from app.utils.tracing import tracer
 
 
 class UserMiddleware(BaseMiddleware):
@@ -24,12 +25,13 @@ class UserMiddleware(BaseMiddleware):
         if user and not user.is_bot:
             try:
                 # Сохраняем/обновляем пользователя в базе данных
-                await db.add_user(
-                    user_id=user.id,
-                    username=user.username,
-                    first_name=user.first_name,
-                    last_name=user.last_name
-                )
+                with tracer.span("middleware.user_upsert"):
+                    await db.add_user(
+                        user_id=user.id,
+                        username=user.username,
+                        first_name=user.first_name,
+                        last_name=user.last_name
+                    )
             except Exception as e:
                 logger.error(f"Ошибка при сохранении пользователя {user.id}: {e}")
         
@@ -0,0 +1,67 @@
+"""
+Внутренний HTTP сервер мониторинга: метрики Prometheus, liveness и readiness
+"""
+from typing import Optional
+
+from aiohttp import web
+from loguru import logger
+
+from app.config import settings
+from app.services import health_prober
+from app.utils.metrics import render_metrics
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """Метрики в формате Prometheus"""
+    body, content_type = render_metrics()
+    # aiohttp не принимает charset внутри content_type
+    return web.Response(body=body, headers={"Content-Type": content_type})
+
+
+async def healthz_handler(request: web.Request) -> web.Response:
+    """Liveness: процесс жив и event loop отвечает"""
+    return web.json_response({"status": "ok"})
+
+
+async def readyz_handler(request: web.Request) -> web.Response:
+    """Readiness: последняя фоновая проверка зависимостей прошла успешно"""
+    return web.json_response(
+        {"ready": health_prober.is_ready, "dependencies": health_prober.status},
+        status=200 if health_prober.is_ready else 503
+    )
+
+
+def create_monitoring_app() -> web.Application:
+    """Создание aiohttp приложения мониторинга"""
+    app = web.Application()
+    app.router.add_get("/healthz", healthz_handler)
+    app.router.add_get("/readyz", readyz_handler)
+    if settings.metrics_enabled:
+        app.router.add_get("/metrics", metrics_handler)
+    return app
+
+
+class MonitoringServer:
+    """Сервер мониторинга на отдельном порту, недоступном снаружи"""
+
+    def __init__(self):
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        if self._runner is not None:
+            return
+
+        self._runner = web.AppRunner(create_monitoring_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host=settings.monitoring_host, port=settings.monitoring_port)
+        await site.start()
+        logger.info(f"📈 Monitoring server listening on {settings.monitoring_host}:{settings.monitoring_port}")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+# Создаем глобальный сервер мониторинга
+monitoring_server = MonitoringServer()
@@ -1,6 +1,35 @@
 """
 Services package
 """
-from .broadcast import BroadcastService
+from .broadcast import BroadcastService, BroadcastDraft
+from .api_monitor import BotApiMonitor, api_monitor
+from .http_pool import HttpPool, http_pool
+from .files import FileService, file_service
+from .media_cache import MediaCacheService, media_cache
+from .health import HealthProber, health_prober
+from .profiler import RuntimeProfiler, ProfilerBusyError, profiler
+from .recorder import UpdateRecorder, update_recorder
+from .dashboard import DashboardService, DashboardSnapshot, dashboard_service
 
-__all__ = ["BroadcastService"] 
\ No newline at end of file
+__all__ = [
+    "BroadcastService",
+    "BroadcastDraft",
+    "BotApiMonitor",
+    "api_monitor",
+    "HttpPool",
+    "http_pool",
+    "FileService",
+    "file_service",
+    "MediaCacheService",
+    "media_cache",
+    "HealthProber",
+    "health_prober",
+    "RuntimeProfiler",
+    "ProfilerBusyError",
+    "profiler",
+    "UpdateRecorder",
+    "update_recorder",
+    "DashboardService",
+    "DashboardSnapshot",
+    "dashboard_service",
+] 
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Фоновый мониторинг Local Bot API Server с переключением на Public API
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.client.telegram import TelegramAPIServer
+from loguru import logger
+
+from app.config import settings
+from .http_pool import http_pool
+
+
+class BotApiMonitor:
+    """
+    Мониторинг доступности Local Bot API Server
+
+    Проверяет сервер с заданным интервалом через долгоживущую HTTP-сессию
+    и хранит последний статус. После нескольких неудачных проверок подряд бот
+    переключается на Public API, после восстановления - обратно на Local API.
+    """
+
+    def __init__(self):
+        self.status: Dict[str, Any] = {
+            "available": False,
+            "response_time_ms": None,
+            "error": None,
+            "checked_at": None,
+        }
+        self.is_local_active = False
+
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._bot: Optional[Bot] = None
+        self._local_session: Optional[BaseSession] = None
+        self._public_session: Optional[BaseSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._failures = 0
+        self._successes = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def active_mode_name(self) -> str:
+        """Режим API, через который бот работает сейчас"""
+        return "Local Bot API" if self.is_local_active else "Public Bot API"
+
+    def _get_http(self) -> aiohttp.ClientSession:
+        if self._http is None or self._http.closed:
+            self._http = http_pool.client_session(timeout=aiohttp.ClientTimeout(total=5))
+        return self._http
+
+    async def probe(self) -> Dict[str, Any]:
+        """Проверка Local Bot API Server, результат сохраняется в status"""
+        status: Dict[str, Any] = {"available": False, "response_time_ms": None, "error": None}
+
+        try:
+            start = time.monotonic()
+            async with self._get_http().get(settings.local_api_url) as response:
+                status["response_time_ms"] = int((time.monotonic() - start) * 1000)
+                # Local API возвращает 404 на root, но соединение работает
+                status["available"] = response.status in (200, 404)
+        except aiohttp.ClientConnectorError:
+            status["error"] = "Connection refused"
+        except asyncio.TimeoutError:
+            status["error"] = "Timeout"
+        except Exception as e:
+            status["error"] = str(e)
+
+        status["checked_at"] = time.time()
+        self.status = status
+        return status
+
+    def _create_local_session(self) -> BaseSession:
+        return http_pool.create_bot_session(
+            api=TelegramAPIServer.from_base(settings.local_api_url, is_local=True)
+        )
+
+    async def create_session(self) -> BaseSession:
+        """Сессия бота для запуска: Local API если он доступен, иначе Public API"""
+        if settings.use_local_api and (await self.probe())["available"]:
+            self._local_session = self._create_local_session()
+            return self._local_session
+
+        self._public_session = http_pool.create_bot_session()
+        return self._public_session
+
+    def _switch(self, to_local: bool) -> None:
+        """Переключение сессии бота между Local и Public API"""
+        if to_local:
+            if self._local_session is None:
+                self._local_session = self._create_local_session()
+            self._bot.session = self._local_session
+            logger.info("✅ Local Bot API recovered, switched back to Local API")
+        else:
+            if self._public_session is None:
+                self._public_session = http_pool.create_bot_session()
+            self._bot.session = self._public_session
+            logger.warning("⚠️ Local Bot API is down, switched to Public API")
+
+        self.is_local_active = to_local
+        self._failures = 0
+        self._successes = 0
+
+    async def _run(self) -> None:
+        """Цикл проверок"""
+        while True:
+            await asyncio.sleep(settings.api_health_interval)
+            status = await self.probe()
+
+            if status["available"]:
+                self._successes += 1
+                self._failures = 0
+            else:
+                self._failures += 1
+                self._successes = 0
+
+            if self.is_local_active and self._failures >= settings.api_failover_threshold:
+                self._switch(to_local=False)
+            elif not self.is_local_active and self._successes >= settings.api_recovery_threshold:
+                self._switch(to_local=True)
+
+    async def start(self, bot: Bot) -> None:
+        """Запуск мониторинга для бота (только в режиме Local API)"""
+        self._bot = bot
+        self.is_local_active = self._local_session is not None and bot.session is self._local_session
+
+        if settings.use_local_api and not self.is_running:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"🩺 Bot API health monitor started (every {settings.api_health_interval}s)")
+
+    async def stop(self) -> None:
+        """Остановка мониторинга; активную сессию закрывает бот"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+        if self._http and not self._http.closed:
+            await self._http.close()
+
+        if self._bot:
+            for session in (self._local_session, self._public_session):
+                if session is not None and session is not self._bot.session:
+                    await session.close()
+
+
+# Создаем глобальный монитор Bot API
+api_monitor = BotApiMonitor()
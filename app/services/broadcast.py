@@ -2,13 +2,83 @@
 Сервис рассылки сообщений
 """
 import asyncio
-from typing import List, Optional, Dict, Any
+import time
+from dataclasses import asdict, dataclass, field
+from typing import ClassVar, List, Optional, Dict, Any
 from aiogram import Bot
 from aiogram.types import Message, InlineKeyboardMarkup
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from loguru import logger
 
+from app.config import settings
 from app.database import db
+from app.keyboards import AdminKeyboards
+from app.utils.metrics import BROADCAST_DURATION, BROADCAST_MESSAGES, BROADCASTS_RUNNING
+
+
+# Типы сообщений в порядке проверки: animation раньше document,
+# так как у сообщения с анимацией заполнены оба поля
+MEDIA_CONTENT_TYPES = ("photo", "video", "animation", "document", "audio", "voice", "video_note", "sticker")
+# Типы без подписи
+NO_CAPTION_CONTENT_TYPES = ("video_note", "sticker")
+
+
+@dataclass
+class BroadcastDraft:
+    """
+    Черновик рассылки в данных FSM
+
+    Хранит только то, что нужно для отправки: тип, file_id, готовый HTML
+    и кнопку, поэтому данные FSM остаются маленькими и не зависят от объекта
+    Message. Версия и срок действия проверяются при загрузке.
+    """
+
+    VERSION: ClassVar[int] = 1
+
+    content_type: str
+    html: Optional[str] = None
+    file_id: Optional[str] = None
+    button_text: Optional[str] = None
+    button_url: Optional[str] = None
+    expires_at: float = field(default_factory=lambda: time.time() + settings.broadcast_draft_ttl)
+
+    @classmethod
+    def from_message(cls, message: Message) -> Optional["BroadcastDraft"]:
+        """Черновик из сообщения админа, None - тип сообщения не поддерживается"""
+        if message.text:
+            return cls(content_type="text", html=message.html_text)
+
+        for content_type in MEDIA_CONTENT_TYPES:
+            media = getattr(message, content_type)
+            if media:
+                # Для фото берём самый большой размер
+                file_id = media[-1].file_id if content_type == "photo" else media.file_id
+                html = message.html_text if message.caption else None
+                return cls(content_type=content_type, html=html, file_id=file_id)
+
+        return None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["BroadcastDraft"]:
+        """Загрузка из данных FSM, None - черновика нет, он устарел или другой версии"""
+        if not data or data.get("v") != cls.VERSION:
+            return None
+
+        draft = cls(**{key: value for key, value in data.items() if key != "v"})
+        if draft.expires_at < time.time():
+            return None
+        return draft
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Представление для данных FSM"""
+        return {"v": self.VERSION, **asdict(self)}
+
+    @property
+    def keyboard(self) -> Optional[InlineKeyboardMarkup]:
+        """Клавиатура с кнопкой рассылки"""
+        if self.button_text and self.button_url:
+            return AdminKeyboards.create_custom_button(self.button_text, self.button_url)
+        return None
 
 
 class BroadcastService:
@@ -19,16 +89,14 @@ class BroadcastService:
     
     async def send_broadcast(
         self,
-        message: Message,
-        custom_keyboard: Optional[InlineKeyboardMarkup] = None,
+        draft: BroadcastDraft,
         progress_callback: Optional[callable] = None
     ) -> Dict[str, int]:
         """
         Отправка рассылки всем пользователям
         
         Args:
-            message: Сообщение для рассылки
-            custom_keyboard: Кастомная клавиатура
+            draft: Черновик рассылки
             progress_callback: Функция для отслеживания прогресса
             
         Returns:
@@ -45,6 +113,28 @@ class BroadcastService:
         
         logger.info(f"Начинаем рассылку для {len(users)} пользователей")
         
+        # Клавиатура общая для всех получателей
+        custom_keyboard = draft.keyboard
+        
+        BROADCASTS_RUNNING.inc()
+        try:
+            with BROADCAST_DURATION.time():
+                await self._send_batches(users, draft, custom_keyboard, stats, progress_callback)
+        finally:
+            BROADCASTS_RUNNING.dec()
+        
+        logger.info(f"Рассылка завершена. Отправлено: {stats['sent']}, Ошибок: {stats['failed']}, Заблокировано: {stats['blocked']}")
+        return stats
+    
+    async def _send_batches(
+        self,
+        users: List[Any],
+        draft: BroadcastDraft,
+        custom_keyboard: Optional[InlineKeyboardMarkup],
+        stats: Dict[str, int],
+        progress_callback: Optional[callable] = None
+    ) -> None:
+        """Отправка пачками с паузами и обновлением статистики"""
         # Отправляем сообщения пачками по 30 штук
         batch_size = 30
         delay_between_batches = 1  # секунда между пачками
@@ -56,7 +146,7 @@ class BroadcastService:
             for user in batch:
                 task = self._send_single_message(
                     user_id=user.id,
-                    message=message,
+                    draft=draft,
                     custom_keyboard=custom_keyboard
                 )
                 tasks.append(task)
@@ -68,13 +158,15 @@ class BroadcastService:
             for result in results:
                 if isinstance(result, Exception):
                     if isinstance(result, TelegramForbiddenError):
-                        stats["blocked"] += 1
+                        outcome = "blocked"
                     else:
-                        stats["failed"] += 1
+                        outcome = "failed"
                 elif result:
-                    stats["sent"] += 1
+                    outcome = "sent"
                 else:
-                    stats["failed"] += 1
+                    outcome = "failed"
+                stats[outcome] += 1
+                BROADCAST_MESSAGES.labels(outcome).inc()
             
             # Вызываем callback для обновления прогресса
             if progress_callback:
@@ -83,14 +175,11 @@ class BroadcastService:
             # Пауза между пачками
             if i + batch_size < len(users):
                 await asyncio.sleep(delay_between_batches)
-        
-        logger.info(f"Рассылка завершена. Отправлено: {stats['sent']}, Ошибок: {stats['failed']}, Заблокировано: {stats['blocked']}")
-        return stats
     
     async def _send_single_message(
         self,
         user_id: int,
-        message: Message,
+        draft: BroadcastDraft,
         custom_keyboard: Optional[InlineKeyboardMarkup] = None
     ) -> bool:
         """
@@ -98,7 +187,7 @@ class BroadcastService:
         
         Args:
             user_id: ID пользователя
-            message: Сообщение для отправки
+            draft: Черновик рассылки
             custom_keyboard: Кастомная клавиатура
             
         Returns:
@@ -106,72 +195,26 @@ class BroadcastService:
         """
         try:
             # Определяем тип сообщения и отправляем соответствующим методом
-            if message.text:
+            if draft.content_type == "text":
                 await self.bot.send_message(
                     chat_id=user_id,
-                    text=message.text,
+                    text=draft.html,
                     reply_markup=custom_keyboard,
-                    parse_mode=message.html_text and "HTML" or None
+                    parse_mode="HTML"
                 )
-            elif message.photo:
-                await self.bot.send_photo(
+            elif draft.content_type in NO_CAPTION_CONTENT_TYPES:
+                await getattr(self.bot, f"send_{draft.content_type}")(
                     chat_id=user_id,
-                    photo=message.photo[-1].file_id,
-                    caption=message.caption,
                     reply_markup=custom_keyboard,
-                    parse_mode=message.html_text and "HTML" or None
+                    **{draft.content_type: draft.file_id}
                 )
-            elif message.video:
-                await self.bot.send_video(
+            elif draft.content_type in MEDIA_CONTENT_TYPES:
+                await getattr(self.bot, f"send_{draft.content_type}")(
                     chat_id=user_id,
-                    video=message.video.file_id,
-                    caption=message.caption,
+                    caption=draft.html,
                     reply_markup=custom_keyboard,
-                    parse_mode=message.html_text and "HTML" or None
-                )
-            elif message.document:
-                await self.bot.send_document(
-                    chat_id=user_id,
-                    document=message.document.file_id,
-                    caption=message.caption,
-                    reply_markup=custom_keyboard,
-                    parse_mode=message.html_text and "HTML" or None
-                )
-            elif message.audio:
-                await self.bot.send_audio(
-                    chat_id=user_id,
-                    audio=message.audio.file_id,
-                    caption=message.caption,
-                    reply_markup=custom_keyboard,
-                    parse_mode=message.html_text and "HTML" or None
-                )
-            elif message.voice:
-                await self.bot.send_voice(
-                    chat_id=user_id,
-                    voice=message.voice.file_id,
-                    caption=message.caption,
-                    reply_markup=custom_keyboard,
-                    parse_mode=message.html_text and "HTML" or None
-                )
-            elif message.video_note:
-                await self.bot.send_video_note(
-                    chat_id=user_id,
-                    video_note=message.video_note.file_id,
-                    reply_markup=custom_keyboard
-                )
-            elif message.animation:
-                await self.bot.send_animation(
-                    chat_id=user_id,
-                    animation=message.animation.file_id,
-                    caption=message.caption,
-                    reply_markup=custom_keyboard,
-                    parse_mode=message.html_text and "HTML" or None
-                )
-            elif message.sticker:
-                await self.bot.send_sticker(
-                    chat_id=user_id,
-                    sticker=message.sticker.file_id,
-                    reply_markup=custom_keyboard
+                    parse_mode="HTML",
+                    **{draft.content_type: draft.file_id}
                 )
             else:
                 # Если тип сообщения не поддерживается
@@ -190,4 +233,4 @@ class BroadcastService:
         except Exception as e:
             # Неожиданные ошибки
             logger.error(f"Неожиданная ошибка при отправке пользователю {user_id}: {e}")
-            return False 
\ No newline at end of file
+            return False
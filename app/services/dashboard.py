@@ -0,0 +1,113 @@
+"""
+Данные админской панели с коротким кэшем в Redis
+"""
+import asyncio
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from app.config import settings
+from app.database import db
+
+DASHBOARD_KEY = "dashboard:snapshot"
+
+
+@dataclass
+class DashboardSnapshot:
+    """Цифры админской панели на момент computed_at"""
+
+    total_users: int
+    active_users: int
+    status: str
+    last_restart: datetime
+    computed_at: datetime
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["last_restart"] = self.last_restart.isoformat()
+        data["computed_at"] = self.computed_at.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "DashboardSnapshot":
+        data = json.loads(raw)
+        data["last_restart"] = datetime.fromisoformat(data["last_restart"])
+        data["computed_at"] = datetime.fromisoformat(data["computed_at"])
+        return cls(**data)
+
+
+class DashboardService:
+    """
+    Снимок статистики для /admin и возврата в админское меню
+
+    Все цифры считаются одним запросом (Database.get_dashboard_counts) и
+    кэшируются в Redis на DASHBOARD_CACHE_TTL секунд - общий кэш для всех
+    экземпляров бота, поэтому переходы по меню не нагружают базу даже на
+    больших таблицах. Одновременные промахи в одном процессе выполняют
+    один запрос. Redis - клиент хранилища FSM (setup_redis); без него
+    снимок считается при каждом открытии панели.
+    """
+
+    def __init__(self):
+        self.redis: Optional[Redis] = None
+        self._lock = asyncio.Lock()
+
+    def setup_redis(self, redis: Redis) -> None:
+        """Использовать общий клиент Redis (хранилища FSM)"""
+        self.redis = redis
+
+    async def _cached(self) -> Optional[DashboardSnapshot]:
+        if self.redis is None:
+            return None
+        try:
+            raw = await self.redis.get(DASHBOARD_KEY)
+            return DashboardSnapshot.from_json(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"⚠️ Dashboard cache lookup failed: {e}")
+            return None
+
+    async def _compute(self) -> DashboardSnapshot:
+        counts = await db.get_dashboard_counts()
+        if counts["status"] is None:
+            # Статистика ещё не создавалась (первый запуск)
+            stats = await db.update_bot_stats()
+            counts["status"], counts["last_restart"] = stats.status, stats.last_restart
+
+        snapshot = DashboardSnapshot(computed_at=datetime.now(), **counts)
+        if self.redis is None:
+            return snapshot
+        try:
+            await self.redis.set(DASHBOARD_KEY, snapshot.to_json(), ex=settings.dashboard_cache_ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to cache dashboard: {e}")
+        return snapshot
+
+    async def get_snapshot(self) -> DashboardSnapshot:
+        """Снимок из кэша или свежий, если кэш устарел"""
+        snapshot = await self._cached()
+        if snapshot is not None:
+            return snapshot
+
+        async with self._lock:
+            # Пока ждали блокировку, снимок мог посчитать другой запрос
+            snapshot = await self._cached()
+            if snapshot is not None:
+                return snapshot
+            return await self._compute()
+
+    async def invalidate(self) -> None:
+        """Сброс кэша, например после перезапуска бота"""
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(DASHBOARD_KEY)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to invalidate dashboard cache: {e}")
+
+
+# Создаем глобальный сервис админской панели
+dashboard_service = DashboardService()
@@ -0,0 +1,205 @@
+"""
+Потоковая загрузка и скачивание больших файлов без буферизации в памяти
+"""
+import asyncio
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from aiogram import Bot
+from aiogram.types import FSInputFile
+from loguru import logger
+
+from app.config import settings
+
+
+class ByteBudget:
+    """Общий лимит байт, прочитанных из сети, но ещё не записанных на диск"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, size: int) -> int:
+        # Чанк больше всего лимита всё равно должен пройти, иначе ожидание вечное
+        size = min(size, self.limit)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight + size <= self.limit)
+            self.in_flight += size
+        return size
+
+    async def release(self, size: int) -> None:
+        async with self._condition:
+            self.in_flight -= size
+            self._condition.notify_all()
+
+
+class FileService:
+    """
+    Загрузка и скачивание файлов через Bot API
+
+    В режиме Local API файлы передаются серверу путями file:// и читаются
+    с общего volume напрямую, без HTTP. В остальных случаях файлы загружаются
+    и скачиваются потоково чанками: количество одновременных скачиваний
+    и общий объём данных в полёте ограничены настройками.
+    """
+
+    def __init__(self):
+        self.chunk_size = settings.file_chunk_size_kb * 1024
+        self.files_dir = Path(settings.files_dir)
+        self.shared_dir = Path(settings.local_api_files_dir).resolve()
+
+        self._semaphore = asyncio.Semaphore(settings.file_download_concurrency)
+        self._budget = ByteBudget(settings.file_max_in_flight_mb * 1024 * 1024)
+
+        self.downloads = 0
+        self.local_hits = 0
+        self.downloaded_bytes = 0
+
+    @staticmethod
+    def is_local(bot: Bot) -> bool:
+        """Работает ли бот сейчас через Local API (с учётом переключения)"""
+        return bot.session.api.is_local
+
+    def _is_shared(self, path: Path) -> bool:
+        return path.is_relative_to(self.shared_dir)
+
+    def input_file(self, bot: Bot, path: Union[str, Path]) -> Union[str, FSInputFile]:
+        """
+        Файл для отправки методами send_*
+
+        Если бот работает через Local API и файл лежит на общем с сервером
+        volume, возвращается путь file:// - сервер читает файл сам.
+        Иначе файл загружается потоково, чанками по FILE_CHUNK_SIZE_KB.
+        """
+        path = Path(path).resolve()
+        if self.is_local(bot) and self._is_shared(path):
+            return path.as_uri()
+        return FSInputFile(path, chunk_size=self.chunk_size)
+
+    async def download(
+        self,
+        bot: Bot,
+        file_id: str,
+        destination: Optional[Union[str, Path]] = None
+    ) -> Path:
+        """
+        Скачивание файла по file_id
+
+        Args:
+            bot: Экземпляр бота
+            file_id: Идентификатор файла
+            destination: Путь сохранения; по умолчанию FILES_DIR/<file_unique_id>
+
+        Returns:
+            Путь к файлу. В режиме Local API без destination возвращается
+            путь к файлу сервера - без копирования
+        """
+        file = await bot.get_file(file_id)
+
+        if self.is_local(bot):
+            source = Path(file.file_path)
+            if not source.exists():
+                raise FileNotFoundError(
+                    f"{source} is not accessible, mount the Local Bot API volume "
+                    f"into the bot container at the same path"
+                )
+            self.local_hits += 1
+            if destination is None:
+                return source
+
+            target = Path(destination)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # copyfile использует sendfile - данные не проходят через Python
+            await asyncio.to_thread(shutil.copyfile, source, target)
+            return target
+
+        target = Path(destination) if destination else (
+            self.files_dir / f"{file.file_unique_id}{Path(file.file_path).suffix}"
+        )
+        url = bot.session.api.file_url(bot.token, file.file_path)
+
+        async with self._semaphore:
+            size = await self._stream_to_file(bot, url, target)
+
+        self.downloads += 1
+        self.downloaded_bytes += size
+        logger.debug(f"📥 Downloaded {file.file_path} ({size} bytes) to {target}")
+        return target
+
+    async def _stream_to_file(self, bot: Bot, url: str, target: Path) -> int:
+        """
+        Чтение из сети и запись на диск идут параллельно через очередь чанков
+
+        Пока чанк не записан, он учитывается в общем лимите данных в полёте,
+        поэтому медленный диск притормаживает чтение из сети, а не копит память.
+        """
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(f"{target.name}.part")
+        queue: asyncio.Queue = asyncio.Queue()
+        written = 0
+
+        async def release_queued() -> None:
+            """Освобождает лимит за чанки, которые writer уже не запишет"""
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item is not None:
+                    await self._budget.release(item[1])
+
+        async def writer() -> None:
+            nonlocal written
+            try:
+                with open(partial, "wb") as f:
+                    while True:
+                        item = await queue.get()
+                        if item is None:
+                            return
+                        chunk, reserved = item
+                        try:
+                            await asyncio.to_thread(f.write, chunk)
+                            written += len(chunk)
+                        finally:
+                            await self._budget.release(reserved)
+            except BaseException:
+                # Ошибка записи (например, ENOSPC): лимит общий для всех скачиваний,
+                # поэтому чанки в очереди не должны удерживать его
+                await release_queued()
+                raise
+
+        writer_task = asyncio.create_task(writer())
+        try:
+            async for chunk in bot.session.stream_content(
+                url=url,
+                timeout=int(settings.http_request_timeout),
+                chunk_size=self.chunk_size,
+                raise_for_status=True
+            ):
+                if writer_task.done():
+                    break
+                reserved = await self._budget.acquire(len(chunk))
+                await queue.put((chunk, reserved))
+            await queue.put(None)
+            await writer_task
+        except BaseException:
+            writer_task.cancel()
+            await release_queued()
+            partial.unlink(missing_ok=True)
+            raise
+
+        os.replace(partial, target)
+        return written
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика файлового сервиса"""
+        return {
+            "downloads": self.downloads,
+            "local_hits": self.local_hits,
+            "downloaded_bytes": self.downloaded_bytes,
+            "in_flight_bytes": self._budget.in_flight,
+        }
+
+
+# Создаем глобальный файловый сервис
+file_service = FileService()
@@ -0,0 +1,122 @@
+"""
+Фоновая проверка зависимостей бота: база данных, Redis, Bot API
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import Bot
+from loguru import logger
+from redis.asyncio import Redis
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import db
+from app.utils.metrics import DEPENDENCY_LATENCY, DEPENDENCY_UP
+
+
+class HealthProber:
+    """
+    Периодически измеряет задержку до базы данных, Redis и Bot API
+
+    Результаты кэшируются, поэтому /readyz и команда /status только читают
+    последний статус и ничего не проверяют сами. Зависимость
+    считается неготовой при ошибке или задержке больше HEALTH_MAX_LATENCY_MS -
+    так балансировщик быстро уводит трафик с деградировавшего экземпляра.
+    """
+
+    def __init__(self):
+        self.status: Dict[str, Dict[str, Any]] = {}
+        self.shutting_down = False
+
+        self._bot: Optional[Bot] = None
+        self._redis: Optional[Redis] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _probe_database(self) -> None:
+        async with db.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    async def _probe_redis(self) -> None:
+        await self._redis.ping()
+
+    async def _probe_bot_api(self) -> None:
+        await self._bot.get_me()
+
+    async def _probe(self, name: str, probe: Callable[[], Awaitable[None]]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"ok": False, "latency_ms": None, "error": None}
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), timeout=settings.health_probe_timeout)
+            latency = time.perf_counter() - start
+            result["latency_ms"] = int(latency * 1000)
+            result["ok"] = result["latency_ms"] <= settings.health_max_latency_ms
+            if not result["ok"]:
+                result["error"] = "Slow response"
+            DEPENDENCY_LATENCY.labels(name).set(latency)
+        except asyncio.TimeoutError:
+            result["error"] = "Timeout"
+        except Exception as e:
+            result["error"] = str(e)
+
+        result["checked_at"] = time.time()
+        DEPENDENCY_UP.labels(name).set(1 if result["ok"] else 0)
+        return result
+
+    async def check(self) -> Dict[str, Dict[str, Any]]:
+        """Одновременная проверка всех зависимостей"""
+        probes = {"database": self._probe_database}
+        if self._redis is not None:
+            probes["redis"] = self._probe_redis
+        if self._bot is not None:
+            probes["bot_api"] = self._probe_bot_api
+
+        results = await asyncio.gather(*(self._probe(name, probe) for name, probe in probes.items()))
+        previous = self.status
+        self.status = dict(zip(probes, results))
+
+        for name, result in self.status.items():
+            was_ok = previous.get(name, {}).get("ok", True)
+            if was_ok and not result["ok"]:
+                logger.warning(f"⚠️ Dependency {name} is not ready: {result['error']}")
+            elif not was_ok and result["ok"]:
+                logger.info(f"✅ Dependency {name} recovered ({result['latency_ms']} ms)")
+        return self.status
+
+    @property
+    def is_ready(self) -> bool:
+        """Экземпляр готов принимать трафик"""
+        if self.shutting_down or not self.status:
+            return False
+        oldest_check = min(result["checked_at"] for result in self.status.values())
+        if time.time() - oldest_check > settings.health_check_interval * 3:
+            # Проверки давно не выполнялись - статусу нельзя доверять
+            return False
+        return all(result["ok"] for result in self.status.values())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"❌ Health check failed: {e}")
+            await asyncio.sleep(settings.health_check_interval)
+
+    async def start(self, bot: Bot, redis: Optional[Redis] = None) -> None:
+        """Запуск фоновых проверок"""
+        self._bot = bot
+        self._redis = redis
+        self.shutting_down = False
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка: экземпляр сразу перестаёт быть готовым"""
+        self.shutting_down = True
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+# Создаем глобальный проверяющий зависимостей
+health_prober = HealthProber()
@@ -0,0 +1,147 @@
+"""
+Общий пул HTTP-соединений для всех исходящих запросов процесса
+"""
+import ssl
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+import aiohttp
+import certifi
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+from aiogram import __version__ as aiogram_version
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from loguru import logger
+
+from app.config import settings
+from app.utils.metrics import instrument_bot_session
+from app.utils.tracing import trace_bot_session, tracer
+
+
+class SharedAiohttpSession(AiohttpSession):
+    """
+    Сессия aiogram, использующая общий коннектор пула вместо собственного
+
+    Заголовки (User-Agent aiogram) совпадают с AiohttpSession, а TLS
+    проверяется по тем же сертификатам certifi. Прокси требует собственного
+    коннектора, поэтому сессия с прокси работает как обычная AiohttpSession.
+    """
+
+    def __init__(self, pool: "HttpPool", **kwargs: Any):
+        super().__init__(**kwargs)
+        self._pool = pool
+
+    async def create_session(self) -> aiohttp.ClientSession:
+        if self.proxy is not None:
+            return await super().create_session()
+
+        if self._session is None or self._session.closed:
+            self._session = self._pool.client_session(
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{aiogram_version}"}
+            )
+            self._should_reset_connector = False
+        return self._session
+
+
+class HttpPool:
+    """
+    Общий TCPConnector с настраиваемыми лимитами, keep-alive и DNS-кэшем
+
+    Все сессии бота (Local и Public API) и служебные HTTP-клиенты используют
+    один коннектор, поэтому прогретые TCP/TLS соединения переиспользуются
+    между ними. Статистика переиспользования собирается через TraceConfig.
+    """
+
+    def __init__(self):
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._trace_config = aiohttp.TraceConfig()
+        self._trace_config.on_request_end.append(self._on_request_end)
+        self._trace_config.on_request_exception.append(self._on_request_exception)
+        self._trace_config.on_connection_create_end.append(self._on_connection_create)
+        self._trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+
+        self.requests = 0
+        self.errors = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+
+    async def _on_request_end(self, session, context: SimpleNamespace, params) -> None:
+        self.requests += 1
+
+    async def _on_request_exception(self, session, context: SimpleNamespace, params) -> None:
+        self.errors += 1
+
+    async def _on_connection_create(self, session, context: SimpleNamespace, params) -> None:
+        self.new_connections += 1
+
+    async def _on_connection_reuse(self, session, context: SimpleNamespace, params) -> None:
+        self.reused_connections += 1
+
+    @property
+    def connector(self) -> aiohttp.TCPConnector:
+        """Общий коннектор (создаётся при первом использовании внутри event loop)"""
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=settings.http_pool_limit,
+                limit_per_host=settings.http_pool_limit_per_host,
+                keepalive_timeout=settings.http_keepalive_timeout,
+                ttl_dns_cache=settings.http_dns_cache_ttl,
+                use_dns_cache=True,
+                # Те же корневые сертификаты, что у коннектора AiohttpSession
+                ssl=ssl.create_default_context(cafile=certifi.where())
+            )
+        return self._connector
+
+    def client_session(
+        self,
+        timeout: Optional[aiohttp.ClientTimeout] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> aiohttp.ClientSession:
+        """HTTP-клиент поверх общего коннектора; закрытие клиента не закрывает пул"""
+        return aiohttp.ClientSession(
+            connector=self.connector,
+            connector_owner=False,
+            headers=headers,
+            timeout=timeout or aiohttp.ClientTimeout(
+                total=settings.http_request_timeout,
+                connect=settings.http_connect_timeout
+            ),
+            trace_configs=[self._trace_config]
+        )
+
+    def create_bot_session(self, api: TelegramAPIServer = PRODUCTION) -> SharedAiohttpSession:
+        """Сессия бота поверх общего коннектора"""
+        session = SharedAiohttpSession(self, api=api, timeout=settings.http_request_timeout)
+        if settings.metrics_enabled:
+            instrument_bot_session(session)
+        if tracer.enabled:
+            trace_bot_session(session)
+        return session
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика использования соединений"""
+        opened = self.new_connections + self.reused_connections
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_ratio": self.reused_connections / opened if opened else 0.0,
+            "limit": settings.http_pool_limit,
+            "limit_per_host": settings.http_pool_limit_per_host,
+        }
+
+    async def close(self) -> None:
+        """Закрытие общего коннектора"""
+        if self._connector is not None and not self._connector.closed:
+            stats = self.get_stats()
+            logger.info(
+                f"🔌 HTTP pool: {stats['requests']} requests, "
+                f"{stats['new_connections']} new / {stats['reused_connections']} reused connections"
+            )
+            await self._connector.close()
+
+
+# Создаем глобальный пул соединений
+http_pool = HttpPool()
@@ -0,0 +1,178 @@
+"""
+Кэш file_id загруженных файлов по хэшу содержимого
+"""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+from loguru import logger
+from redis.asyncio import Redis
+
+from app.config import settings
+from app.database import db
+from .files import file_service
+
+MEDIA_TYPES = ("photo", "video", "document", "audio", "animation", "voice", "video_note", "sticker")
+# Сколько хэшей файлов помнить в памяти процесса
+HASH_CACHE_SIZE = 1024
+
+
+class MediaCacheService:
+    """
+    Отправка локальных файлов без повторной загрузки одинакового содержимого
+
+    Перед загрузкой файл хэшируется (sha256) и ищется в Redis, затем в таблице
+    media_cache. Если файл уже загружался, отправляется его file_id - это один
+    короткий запрос вместо загрузки мегабайт. После первой загрузки file_id
+    из ответа Telegram сохраняется в оба хранилища.
+
+    Redis - клиент хранилища FSM (setup_redis), отдельный пул соединений не
+    создаётся. Без него file_id ищется только в базе данных.
+    """
+
+    def __init__(self, hash_cache_size: int = HASH_CACHE_SIZE):
+        self.redis: Optional[Redis] = None
+        self.hash_cache_size = hash_cache_size
+        # Хэши файлов по (путь, размер, mtime), чтобы не перечитывать большие файлы
+        self._hashes: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def setup_redis(self, redis: Redis) -> None:
+        """Использовать общий клиент Redis (хранилища FSM)"""
+        self.redis = redis
+
+    @staticmethod
+    def _key(content_hash: str, media_type: str) -> str:
+        return f"media_cache:{media_type}:{content_hash}"
+
+    def _hash_file(self, path: Path) -> str:
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(file_service.chunk_size):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    async def get_content_hash(self, path: Union[str, Path]) -> str:
+        """sha256 содержимого файла (чтение в отдельном потоке)"""
+        path = Path(path).resolve()
+        stat = path.stat()
+        cache_key = (str(path), stat.st_size, stat.st_mtime_ns)
+
+        content_hash = self._hashes.get(cache_key)
+        if content_hash is not None:
+            self._hashes.move_to_end(cache_key)
+            return content_hash
+
+        content_hash = await asyncio.to_thread(self._hash_file, path)
+        self._hashes[cache_key] = content_hash
+        if len(self._hashes) > self.hash_cache_size:
+            self._hashes.popitem(last=False)
+        return content_hash
+
+    async def get(self, content_hash: str, media_type: str) -> Optional[str]:
+        """file_id по хэшу: сначала Redis, затем база данных"""
+        key = self._key(content_hash, media_type)
+        if self.redis is not None:
+            try:
+                file_id = await self.redis.get(key)
+                if file_id:
+                    return file_id.decode()
+            except Exception as e:
+                logger.warning(f"⚠️ Media cache Redis lookup failed: {e}")
+
+        file_id = await db.get_media_file_id(content_hash, media_type)
+        if file_id and self.redis is not None:
+            # Прогреваем Redis для следующих отправок
+            try:
+                await self.redis.set(key, file_id, ex=settings.media_cache_ttl)
+            except Exception as e:
+                logger.warning(f"⚠️ Media cache Redis update failed: {e}")
+        return file_id
+
+    async def set(self, content_hash: str, media_type: str, file_id: str,
+                  file_size: Optional[int] = None) -> None:
+        """Сохранение file_id в базу данных и Redis"""
+        await db.save_media_file_id(content_hash, media_type, file_id, file_size)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(self._key(content_hash, media_type), file_id, ex=settings.media_cache_ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ Media cache Redis update failed: {e}")
+
+    async def invalidate(self, content_hash: str, media_type: str) -> None:
+        """Удаление недействительного file_id"""
+        await db.delete_media_file_id(content_hash, media_type)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(self._key(content_hash, media_type))
+        except Exception as e:
+            logger.warning(f"⚠️ Media cache Redis delete failed: {e}")
+
+    @staticmethod
+    def extract_file_id(message: Message, media_type: str) -> Optional[str]:
+        """file_id отправленного файла из ответа Telegram"""
+        media = getattr(message, media_type, None)
+        if media_type == "photo" and media:
+            # Самый большой размер фото
+            return media[-1].file_id
+        return media.file_id if media else None
+
+    async def send(
+        self,
+        bot: Bot,
+        chat_id: Union[int, str],
+        path: Union[str, Path],
+        media_type: str = "document",
+        **kwargs: Any
+    ) -> Message:
+        """
+        Отправка локального файла с повторным использованием file_id
+
+        Args:
+            bot: Экземпляр бота
+            chat_id: Получатель
+            path: Путь к файлу
+            media_type: photo, video, document, audio, animation, voice, video_note, sticker
+            **kwargs: Дополнительные параметры метода send_<media_type> (caption и т.д.)
+        """
+        if media_type not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported media type: {media_type}")
+
+        send_method = getattr(bot, f"send_{media_type}")
+        content_hash = await self.get_content_hash(path)
+
+        file_id = await self.get(content_hash, media_type)
+        if file_id:
+            try:
+                message = await send_method(chat_id, **{media_type: file_id}, **kwargs)
+                self.hits += 1
+                return message
+            except TelegramBadRequest as e:
+                # file_id мог стать недействительным - загружаем файл заново
+                logger.warning(f"⚠️ Cached file_id for {path} rejected: {e}")
+                await self.invalidate(content_hash, media_type)
+
+        self.misses += 1
+        message = await send_method(chat_id, **{media_type: file_service.input_file(bot, path)}, **kwargs)
+
+        file_id = self.extract_file_id(message, media_type)
+        if file_id:
+            await self.set(content_hash, media_type, file_id, Path(path).stat().st_size)
+        return message
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика попаданий в кэш"""
+        return {"hits": self.hits, "misses": self.misses, "hashed_files": len(self._hashes)}
+
+
+# Создаем глобальный кэш медиа
+media_cache = MediaCacheService()
@@ -0,0 +1,175 @@
+"""
+Профилирование работающего бота: CPU, задачи asyncio и память
+"""
+import asyncio
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, Optional
+
+from loguru import logger
+
+from app.config import settings
+
+
+class ProfilerBusyError(Exception):
+    """Профилирование уже выполняется"""
+
+
+class RuntimeProfiler:
+    """
+    Профилировщик для диагностики без перезапуска бота
+
+    - cProfile: точная статистика вызовов в потоке event loop за N секунд;
+    - сэмплирование: фоновый поток раз в PROFILER_SAMPLE_INTERVAL_MS снимает
+      стек потока event loop и собирает его в формате folded stacks
+      (flamegraph.pl, speedscope), почти не замедляя бота;
+    - дамп всех задач asyncio со стеками;
+    - tracemalloc: разница выделенной памяти с предыдущим снимком.
+
+    Одновременно выполняется только один замер CPU.
+    """
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def is_busy(self) -> bool:
+        return self._lock.locked()
+
+    @staticmethod
+    def _duration(seconds: Optional[int]) -> int:
+        seconds = seconds or settings.profiler_duration
+        return max(1, min(seconds, settings.profiler_max_duration))
+
+    async def profile_cpu(self, seconds: Optional[int] = None) -> bytes:
+        """Статистика cProfile за seconds секунд, отсортированная по суммарному времени"""
+        if self.is_busy:
+            raise ProfilerBusyError()
+
+        async with self._lock:
+            seconds = self._duration(seconds)
+            profile = cProfile.Profile()
+            logger.info(f"🩺 cProfile capture started for {seconds}s")
+            profile.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profile.disable()
+
+        output = io.StringIO()
+        output.write(f"cProfile, {seconds}s, event loop thread\n\n")
+        stats = pstats.Stats(profile, stream=output)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(100)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(50)
+        return output.getvalue().encode()
+
+    async def sample_stacks(self, seconds: Optional[int] = None) -> bytes:
+        """Стеки потока event loop в формате folded stacks для построения flamegraph"""
+        if self.is_busy:
+            raise ProfilerBusyError()
+
+        async with self._lock:
+            seconds = self._duration(seconds)
+            loop_thread_id = threading.get_ident()
+            interval = settings.profiler_sample_interval_ms / 1000
+            stacks: Counter = Counter()
+            stop = threading.Event()
+
+            def sample() -> None:
+                while not stop.wait(interval):
+                    frame = sys._current_frames().get(loop_thread_id)
+                    names = []
+                    while frame is not None:
+                        code = frame.f_code
+                        names.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                        frame = frame.f_back
+                    if names:
+                        stacks[";".join(reversed(names))] += 1
+
+            sampler = threading.Thread(target=sample, name="stack-sampler", daemon=True)
+            logger.info(f"🩺 Stack sampling started for {seconds}s")
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                stop.set()
+                await asyncio.to_thread(sampler.join)
+
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()).encode()
+
+    @staticmethod
+    def dump_tasks() -> bytes:
+        """Все задачи asyncio со стеками"""
+        tasks = sorted(asyncio.all_tasks(), key=lambda task: task.get_name())
+        output = io.StringIO()
+        output.write(f"{len(tasks)} asyncio tasks at {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+        coroutines: Counter = Counter()
+        for task in tasks:
+            coro = task.get_coro()
+            coroutines[getattr(coro, "__qualname__", repr(coro))] += 1
+
+        output.write("\nBy coroutine:\n")
+        for name, count in coroutines.most_common():
+            output.write(f"{count:6}  {name}\n")
+
+        for task in tasks:
+            output.write(f"\n--- {task.get_name()} ---\n")
+            task.print_stack(limit=20, file=output)
+        return output.getvalue().encode()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def memory_diff(self, limit: int = 50) -> Dict[str, object]:
+        """
+        Разница памяти с предыдущим снимком tracemalloc
+
+        Первый вызов включает tracemalloc и запоминает базовый снимок; каждый
+        следующий сравнивает текущее состояние с предыдущим снимком.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.profiler_tracemalloc_frames)
+            self._baseline = self._snapshot()
+            logger.info("🩺 tracemalloc started")
+            return {"started": True, "report": None}
+
+        snapshot = self._snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+
+        output = io.StringIO()
+        output.write(f"Traced memory: current {current / 1024 / 1024:.1f} MB, peak {peak / 1024 / 1024:.1f} MB\n\n")
+        output.write(f"Top {limit} differences since previous snapshot:\n")
+        for stat in snapshot.compare_to(self._baseline, "lineno")[:limit]:
+            output.write(f"{stat}\n")
+
+        output.write(f"\nTop {limit} allocations:\n")
+        for stat in snapshot.statistics("lineno")[:limit]:
+            output.write(f"{stat}\n")
+
+        self._baseline = snapshot
+        return {"started": False, "report": output.getvalue().encode()}
+
+    def stop_memory_tracing(self) -> bool:
+        """Выключение tracemalloc - он замедляет выделение памяти"""
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        self._baseline = None
+        logger.info("🩺 tracemalloc stopped")
+        return True
+
+
+# Создаем глобальный профилировщик
+profiler = RuntimeProfiler()
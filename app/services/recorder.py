@@ -0,0 +1,207 @@
+"""
+Запись входящих обновлений в сжатый JSONL для последующего воспроизведения
+"""
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from typing import Any, List, Optional, Tuple
+
+from aiogram.types import Update
+from loguru import logger
+
+from app.config import settings
+
+# Telegram выдаёт id пользователей и чатов не больше 52 значащих бит, поэтому
+# псевдонимы занимают [2**52, 2**53) и не совпадают с реальными id - их легко отличить
+# и удалить. Весь диапазон точен и для чисел double, а его ширина делает совпадение
+# псевдонимов разных пользователей практически невозможным
+PSEUDONYM_BASE = 2 ** 52
+PSEUDONYM_SPAN = 2 ** 52
+
+# Объекты, поле id которых - пользователь или чат
+IDENTITY_KEYS = {
+    "from", "chat", "user", "sender_chat", "forward_from", "forward_from_chat",
+    "new_chat_member", "old_chat_member", "left_chat_member", "via_bot", "new_chat_members",
+}
+# Персональные строки заменяются заглушкой той же длины
+PERSONAL_KEYS = {"first_name", "last_name", "username", "title", "phone_number", "bio", "vcard", "email"}
+# Пользовательский текст: команда сохраняется, остальное заменяется
+TEXT_KEYS = {"text", "caption", "query"}
+FILE_KEYS = {"file_id", "file_unique_id"}
+LOCATION_KEYS = {"latitude", "longitude"}
+
+
+def mask_text(value: str) -> str:
+    """
+    Заглушка той же длины в единицах UTF-16
+
+    Смещения entities задаются в UTF-16, поэтому символы вне BMP заменяются
+    символом вне BMP, а пробелы сохраняются.
+    """
+    return "".join(
+        char if char.isspace() else ("x" if ord(char) <= 0xFFFF else "\U0001F642")
+        for char in value
+    )
+
+
+class UpdateAnonymizer:
+    """Обезличивание обновления: стабильные псевдонимы id и маскирование личных данных"""
+
+    def __init__(self, salt: bytes):
+        self.salt = salt
+
+    def pseudonym(self, value: int) -> int:
+        digest = hmac.new(self.salt, str(value).encode(), hashlib.sha256).digest()
+        pseudonym = PSEUDONYM_BASE + int.from_bytes(digest[:8], "big") % PSEUDONYM_SPAN
+        # Отрицательные id групп и каналов остаются отрицательными
+        return -pseudonym if value < 0 else pseudonym
+
+    def _text(self, value: str) -> str:
+        if value.startswith("/"):
+            command, _, rest = value.partition(" ")
+            return f"{command} {mask_text(rest)}" if rest else command
+        return mask_text(value)
+
+    def anonymize(self, value: Any, key: Optional[str] = None) -> Any:
+        if isinstance(value, list):
+            return [self.anonymize(item, key) for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        result = {}
+        for field, item in value.items():
+            if field == "id" and key in IDENTITY_KEYS and isinstance(item, int):
+                result[field] = self.pseudonym(item)
+            elif field in {"user_id", "chat_id"} and isinstance(item, int):
+                result[field] = self.pseudonym(item)
+            elif field in PERSONAL_KEYS and isinstance(item, str):
+                result[field] = mask_text(item)
+            elif field in TEXT_KEYS and isinstance(item, str):
+                result[field] = self._text(item)
+            elif field in FILE_KEYS and isinstance(item, str):
+                result[field] = hashlib.sha256(self.salt + item.encode()).hexdigest()[:len(item)]
+            elif field in LOCATION_KEYS:
+                result[field] = 0.0
+            else:
+                result[field] = self.anonymize(item, field)
+        return result
+
+
+class UpdateRecorder:
+    """
+    Запись обезличенных обновлений в файлы .jsonl.gz
+
+    record() только кладёт обновление в очередь; сериализация, обезличивание
+    и сжатие выполняются фоновой задачей в отдельном потоке пачками. Каждая
+    строка файла: {"t": время получения, "admin": признак администратора,
+    "update": обновление}. Файл сменяется при достижении RECORD_ROTATE_MB.
+    При переполнении очереди обновления не записываются, а обработка не
+    замедляется.
+    """
+
+    def __init__(self):
+        self.directory = settings.record_dir
+        self.rotate_bytes = settings.record_rotate_mb * 1024 * 1024
+        # Без соли из настроек псевдонимы стабильны только в пределах процесса
+        salt = settings.record_salt or secrets.token_hex(16)
+        self.anonymizer = UpdateAnonymizer(salt.encode())
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._file: Optional[gzip.GzipFile] = None
+        self._raw = None
+
+        self.recorded = 0
+        self.dropped = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    def record(self, update: Update, is_admin: bool = False) -> None:
+        """Поставить обновление в очередь записи (не блокирует обработку)"""
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait((time.time(), is_admin, update))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def start(self) -> None:
+        """Запуск фоновой записи (вызывается внутри event loop)"""
+        if self._task is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._queue = asyncio.Queue(maxsize=settings.record_queue_size)
+        self._task = asyncio.create_task(self._write_loop())
+        logger.info(f"📼 Recording anonymised updates to {self.directory}")
+
+    def _open(self) -> None:
+        name = f"updates-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl.gz"
+        self._raw = open(os.path.join(self.directory, name), "wb")
+        self._file = gzip.GzipFile(fileobj=self._raw, mode="wb")
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._raw.close()
+            self._file = None
+            self._raw = None
+
+    def _write(self, batch: List[Tuple[float, bool, Update]]) -> None:
+        if self._file is None:
+            self._open()
+        for received_at, is_admin, update in batch:
+            record = {
+                "t": round(received_at, 3),
+                "admin": is_admin,
+                "update": self.anonymizer.anonymize(update.model_dump(mode="json", exclude_none=True)),
+            }
+            self._file.write(json.dumps(record, ensure_ascii=False).encode() + b"\n")
+        if self._raw.tell() >= self.rotate_bytes:
+            self._close_file()
+
+    async def _write_loop(self) -> None:
+        queue = self._queue
+        stopping = False
+        while not stopping:
+            batch = []
+            item = await queue.get()
+            # None - сигнал остановки от close()
+            while item is not None:
+                batch.append(item)
+                if queue.empty() or len(batch) >= 1000:
+                    break
+                item = queue.get_nowait()
+            stopping = item is None
+
+            if batch:
+                try:
+                    await asyncio.to_thread(self._write, batch)
+                    self.recorded += len(batch)
+                except Exception as e:
+                    self.dropped += len(batch)
+                    logger.warning(f"⚠️ Failed to record {len(batch)} updates: {e}")
+
+        await asyncio.to_thread(self._close_file)
+
+    async def close(self) -> None:
+        """Запись оставшихся обновлений и закрытие файла"""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        queue, self._queue = self._queue, None
+
+        # Сигнал остановки ставится после уже принятых обновлений
+        await queue.put(None)
+        await task
+        logger.info(f"📼 Recorded {self.recorded} updates ({self.dropped} dropped)")
+
+
+# Создаем глобальный рекордер обновлений
+update_recorder = UpdateRecorder()
@@ -1,3 +1,7 @@
 """
 Utils package
 """
+from .executor import UpdateExecutor
+from .storage import CachedStorage
+
+__all__ = ["UpdateExecutor", "CachedStorage"]
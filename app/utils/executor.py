@@ -0,0 +1,137 @@
+"""
+Ограниченная параллельная обработка обновлений с очередью на каждый чат
+"""
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Set
+
+from loguru import logger
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class UpdateExecutor:
+    """
+    Исполнитель обновлений
+
+    - не больше concurrency обновлений обрабатываются одновременно;
+    - обновления одного ключа (чата) выполняются строго по очереди (FIFO);
+    - всего принимается не больше max_pending обновлений, дальше submit ждёт,
+      что даёт обратное давление на источник (polling / очередь процесса);
+    - очередь одного чата ограничена chat_queue_limit, лишние обновления
+      отбрасываются, чтобы один пользователь не занял всю ёмкость.
+    """
+
+    def __init__(self, concurrency: int, max_pending: int, chat_queue_limit: int):
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.chat_queue_limit = chat_queue_limit
+
+        self._slots = asyncio.Semaphore(concurrency)
+        self._capacity = asyncio.Semaphore(max_pending)
+        self._queues: Dict[Hashable, Deque[Job]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._report_task: Optional[asyncio.Task] = None
+
+        self.running = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    async def submit(self, key: Hashable, job: Job) -> bool:
+        """
+        Ставит задачу в очередь ключа
+
+        Returns:
+            False если очередь ключа переполнена и задача отброшена
+        """
+        queue = self._queues.get(key)
+        if queue is not None and len(queue) >= self.chat_queue_limit:
+            self.dropped += 1
+            return False
+
+        await self._capacity.acquire()
+
+        # Очередь могла появиться или завершиться, пока ждали ёмкость
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            queue.append(job)
+            task = asyncio.create_task(self._drain(key, queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            queue.append(job)
+            self.max_depth = max(self.max_depth, len(queue))
+
+        return True
+
+    async def _drain(self, key: Hashable, queue: Deque[Job]) -> None:
+        """Последовательно выполняет задачи одного ключа"""
+        try:
+            while queue:
+                job = queue[0]
+                async with self._slots:
+                    self.running += 1
+                    try:
+                        await job()
+                    except Exception as e:
+                        self.failed += 1
+                        logger.error(f"❌ Error processing update for {key}: {e}")
+                    finally:
+                        self.running -= 1
+                        self.processed += 1
+                queue.popleft()
+                self._capacity.release()
+        finally:
+            self._queues.pop(key, None)
+
+    @property
+    def pending(self) -> int:
+        """Количество принятых, но ещё не обработанных обновлений"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def get_stats(self) -> Dict[str, int]:
+        """Метрики очередей"""
+        return {
+            "running": self.running,
+            "pending": self.pending,
+            "active_chats": len(self._queues),
+            "max_chat_depth": max((len(queue) for queue in self._queues.values()), default=0),
+            "max_depth_seen": self.max_depth,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    async def start_reporting(self) -> None:
+        """Запуск периодического логирования метрик"""
+        if self._report_task is None:
+            self._report_task = asyncio.create_task(self._report())
+
+    async def _report(self, interval: float = 60.0) -> None:
+        """Периодически пишет метрики очередей в лог"""
+        last_dropped = 0
+        while True:
+            await asyncio.sleep(interval)
+            stats = self.get_stats()
+            if stats["pending"] or stats["dropped"] != last_dropped:
+                last_dropped = stats["dropped"]
+                logger.info(
+                    f"📊 Updates: running={stats['running']} pending={stats['pending']} "
+                    f"chats={stats['active_chats']} max_depth={stats['max_chat_depth']} "
+                    f"dropped={stats['dropped']}"
+                )
+
+    async def close(self, timeout: Optional[float] = 30.0) -> None:
+        """Дожидается обработки уже принятых обновлений"""
+        if self._report_task:
+            self._report_task.cancel()
+            self._report_task = None
+        if not self._tasks:
+            return
+        logger.info(f"⏳ Waiting for {self.pending} pending updates...")
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
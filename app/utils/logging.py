@@ -0,0 +1,58 @@
+"""
+Настройка логирования: текстовый или JSON вывод через очередь
+"""
+import json
+import sys
+
+from loguru import logger
+
+from app.config import settings
+
+TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+    "<level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+    "<level>{message}</level>"
+)
+
+
+def json_sink(message) -> None:
+    """
+    Запись одной JSON-строки на запись лога
+
+    С enqueue=True sink выполняется в отдельном потоке loguru, поэтому
+    сериализация и запись в stdout не блокируют event loop.
+    """
+    record = message.record
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        # Поля из logger.bind(): тип обновления, пользователь, длительность и т.д.
+        **record["extra"],
+    }
+    if record["exception"] is not None:
+        # loguru дописывает traceback после сообщения ещё в вызывающем потоке
+        entry["exception"] = str(message)[len(record["message"]):].strip()
+    sys.stdout.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+    sys.stdout.flush()
+
+
+def setup_logging() -> None:
+    """Настройка логирования"""
+    logger.remove()
+
+    if settings.log_format.lower() == "json":
+        logger.add(json_sink, level=settings.log_level, format="{message}", enqueue=True)
+    else:
+        # enqueue: запись в stdout выполняет поток loguru, а не event loop
+        logger.add(
+            sys.stdout,
+            level=settings.log_level,
+            format=TEXT_FORMAT,
+            colorize=True,
+            enqueue=True
+        )
@@ -0,0 +1,142 @@
+"""
+Метрики Prometheus: обновления, обработчики, база данных, Bot API и рассылки
+"""
+import os
+import time
+from typing import Tuple
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Границы гистограмм (сек): от быстрых обращений к Redis до медленных загрузок файлов
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+UPDATES = Counter(
+    "bot_updates_total", "Processed updates", ["update_type"]
+)
+UPDATE_ERRORS = Counter(
+    "bot_update_errors_total", "Updates whose handlers raised an exception", ["update_type"]
+)
+UPDATE_LATENCY = Histogram(
+    "bot_update_duration_seconds", "Update handling time", ["update_type"], buckets=LATENCY_BUCKETS
+)
+UPDATES_DROPPED = Counter(
+    "bot_updates_dropped_total", "Updates dropped before handling", ["reason"]
+)
+
+LOG_RECORDS = Counter(
+    "bot_log_records_total", "Per-update log records by outcome", ["outcome"]
+)
+LOGGING_DURATION = Histogram(
+    "bot_logging_duration_seconds", "Time spent on the event loop writing a per-update log record",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01)
+)
+
+DB_QUERY_LATENCY = Histogram(
+    "bot_db_query_duration_seconds", "Database query time", ["operation"], buckets=LATENCY_BUCKETS
+)
+
+API_REQUEST_LATENCY = Histogram(
+    "bot_api_request_duration_seconds", "Bot API request time", ["method"], buckets=LATENCY_BUCKETS
+)
+API_ERRORS = Counter(
+    "bot_api_errors_total", "Failed Bot API requests", ["method", "error"]
+)
+
+DEPENDENCY_UP = Gauge(
+    "bot_dependency_up", "Dependency passed the last health probe", ["dependency"],
+    multiprocess_mode="liveall"
+)
+DEPENDENCY_LATENCY = Gauge(
+    "bot_dependency_latency_seconds", "Dependency round-trip time from the last health probe", ["dependency"],
+    multiprocess_mode="liveall"
+)
+
+BROADCAST_MESSAGES = Counter(
+    "bot_broadcast_messages_total", "Broadcast messages by result", ["result"]
+)
+BROADCAST_DURATION = Histogram(
+    "bot_broadcast_duration_seconds", "Broadcast duration",
+    buckets=(1, 5, 15, 30, 60, 300, 900, 1800, 3600)
+)
+BROADCASTS_RUNNING = Gauge(
+    "bot_broadcasts_running", "Broadcasts in progress", multiprocess_mode="livesum"
+)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Время и ошибки запросов к Bot API по методам"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        start = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            API_ERRORS.labels(name, type(e).__name__).inc()
+            raise
+        finally:
+            API_REQUEST_LATENCY.labels(name).observe(time.perf_counter() - start)
+
+
+def instrument_bot_session(session: BaseSession) -> BaseSession:
+    """Подключение метрик к сессии бота"""
+    session.middleware(ApiMetricsMiddleware())
+    return session
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Замер времени запросов через события SQLAlchemy"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        DB_QUERY_LATENCY.labels(operation).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context):
+        # Запрос с ошибкой не дойдёт до after_cursor_execute
+        stack = context.connection.info.get("query_start") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Метрики в текстовом формате Prometheus
+
+    При заданной PROMETHEUS_MULTIPROC_DIR собираются метрики всех процессов
+    (режим с несколькими процессами-обработчиками webhook).
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
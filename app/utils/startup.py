@@ -0,0 +1,52 @@
+"""
+Замер длительности этапов запуска бота
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Set, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class StartupTimer:
+    """Собирает длительность этапов запуска и пишет итоговый отчёт"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.phases: Dict[str, float] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    async def measure(self, name: str, awaitable: Awaitable[T]) -> T:
+        """Выполняет этап и запоминает его длительность"""
+        start = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            self.phases[name] = time.monotonic() - start
+
+    def run_in_background(self, name: str, awaitable: Awaitable[Any]) -> asyncio.Task:
+        """Откладывает необязательный этап в фон, не задерживая запуск"""
+
+        async def runner() -> None:
+            try:
+                await self.measure(name, awaitable)
+                logger.debug(f"⏱️ Background startup phase {name}: {self.phases[name]:.3f}s")
+            except Exception as e:
+                logger.error(f"❌ Background startup phase {name} failed: {e}")
+
+        task = asyncio.create_task(runner())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    def report(self) -> None:
+        """Пишет в лог длительность этапов и общее время запуска"""
+        total = time.monotonic() - self.started_at
+        phases = ", ".join(f"{name}={duration:.3f}s" for name, duration in self.phases.items())
+        logger.info(f"⏱️ Startup completed in {total:.3f}s ({phases})")
+
+
+# Создаем глобальный таймер запуска
+startup_timer = StartupTimer()
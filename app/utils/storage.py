@@ -0,0 +1,381 @@
+"""
+Двухуровневое хранилище FSM: локальный LRU-кэш поверх RedisStorage
+"""
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from loguru import logger
+
+from app.utils.tracing import tracer
+
+INVALIDATION_CHANNEL = "fsm:invalidate"
+# Блокировка очистки: за интервал её выполняет только один экземпляр бота
+SWEEP_LOCK_KEY = "fsm_sweep:lock"
+
+# Значение ещё не загружено из Redis (None - загружено, но состояния нет)
+_MISSING = object()
+
+
+class CachedStorage(BaseStorage):
+    """
+    Хранилище FSM с кэшем состояний и данных в памяти процесса
+
+    Чтение сначала идёт в LRU-кэш, поэтому частый случай "у пользователя нет
+    состояния" после первого запроса не обращается к Redis. Запись идёт сразу
+    в Redis (write-through) и публикует инвалидацию в канал Redis, по которой
+    остальные экземпляры бота удаляют ключ из своего кэша.
+
+    Пока подписка на канал не работает, кэш не используется: все запросы
+    идут напрямую в Redis, чтобы не читать устаревшие состояния.
+
+    Ключи в Redis получают TTL: общий (state_ttl / data_ttl RedisStorage)
+    или отдельный для группы состояний из group_ttls. Ключи без TTL,
+    оставшиеся от старых версий, периодически получают TTL в sweep().
+    """
+
+    def __init__(
+        self,
+        storage: RedisStorage,
+        max_size: int = 10000,
+        ttl: float = 300,
+        group_ttls: Optional[Dict[str, int]] = None,
+        sweep_interval: int = 0
+    ):
+        self.storage = storage
+        self.redis = storage.redis
+        self.max_size = max_size
+        self.ttl = ttl
+        self.group_ttls = group_ttls or {}
+        self.sweep_interval = sweep_interval
+
+        self.instance_id = uuid.uuid4().hex
+        # key -> [state, data, время загрузки]
+        self._cache: "OrderedDict[StorageKey, list]" = OrderedDict()
+        self._listener: Optional[asyncio.Task] = None
+        self._sweeper: Optional[asyncio.Task] = None
+        self._listening = False
+        # Растёт при каждой инвалидации: значение, прочитанное из Redis
+        # во время инвалидации, может быть устаревшим и не кэшируется
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_url(
+        cls,
+        url: str,
+        max_size: int = 10000,
+        ttl: float = 300,
+        group_ttls: Optional[Dict[str, int]] = None,
+        sweep_interval: int = 0,
+        **kwargs: Any
+    ) -> "CachedStorage":
+        """Создание по URL Redis, kwargs (state_ttl, data_ttl) передаются в RedisStorage.from_url"""
+        return cls(
+            RedisStorage.from_url(url, **kwargs),
+            max_size=max_size,
+            ttl=ttl,
+            group_ttls=group_ttls,
+            sweep_interval=sweep_interval
+        )
+
+    def start(self) -> None:
+        """Запуск подписки на инвалидации и очистки (вызывается внутри event loop)"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        if self.sweep_interval and (self._sweeper is None or self._sweeper.done()):
+            self._sweeper = asyncio.create_task(self._sweep_periodically())
+
+    async def _listen(self) -> None:
+        """Подписка на канал инвалидаций с переподключением"""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                self._listening = True
+                logger.debug("📡 FSM cache subscribed to invalidations")
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._on_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ FSM cache invalidation channel lost: {e}")
+            finally:
+                # Пока подписки нет, инвалидации могли потеряться
+                self._listening = False
+                self._cache.clear()
+                await pubsub.aclose()
+            await asyncio.sleep(1)
+
+    def _on_invalidation(self, payload: bytes) -> None:
+        try:
+            message = json.loads(payload)
+            if message["instance"] == self.instance_id:
+                return
+            key = StorageKey(**message["key"])
+            self._generation += 1
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"⚠️ Invalid FSM invalidation message: {e}")
+            return
+
+        if self._cache.pop(key, None) is not None:
+            self.invalidations += 1
+
+    async def _publish(self, key: StorageKey) -> None:
+        message = json.dumps({"instance": self.instance_id, "key": asdict(key)})
+        await self.redis.publish(INVALIDATION_CHANNEL, message)
+
+    def _entry(self, key: StorageKey) -> Optional[list]:
+        """Запись кэша, если кэш можно использовать и она не устарела"""
+        if not self._listening:
+            return None
+
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[2] > self.ttl:
+            del self._cache[key]
+            return None
+
+        self._cache.move_to_end(key)
+        return entry
+
+    def _remember(
+        self,
+        key: StorageKey,
+        state: Any = _MISSING,
+        data: Any = _MISSING,
+        generation: Optional[int] = None
+    ) -> None:
+        if not self._listening or (generation is not None and generation != self._generation):
+            return
+
+        entry = self._cache.get(key)
+        if entry is None:
+            entry = [_MISSING, _MISSING, time.monotonic()]
+            self._cache[key] = entry
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+
+        if state is not _MISSING:
+            entry[0] = state
+        if data is not _MISSING:
+            entry[1] = data
+
+    def _group_ttl(self, state: Optional[str]) -> Optional[int]:
+        """TTL группы состояния AdminStates:broadcast_message -> group_ttls["AdminStates"]"""
+        if not state:
+            return None
+        return self.group_ttls.get(state.split(":", 1)[0])
+
+    async def _expire(self, key: StorageKey, ttl: int, parts: Tuple[str, ...]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for part in parts:
+                pipe.expire(self.storage.key_builder.build(key, part), ttl)
+            await pipe.execute()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state_name = state.state if isinstance(state, State) else state
+        await self.storage.set_state(key, state)
+
+        # Данные относятся к сценарию, поэтому живут столько же, сколько его состояние
+        ttl = self._group_ttl(state_name)
+        if ttl:
+            await self._expire(key, ttl, ("state", "data"))
+
+        self._remember(key, state=state_name)
+        await self._publish(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        entry = self._entry(key)
+        if entry is not None and entry[0] is not _MISSING:
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        generation = self._generation
+        with tracer.span("fsm.get_state"):
+            state = await self.storage.get_state(key)
+        self._remember(key, state=state, generation=generation)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self.storage.set_data(key, data)
+
+        # RedisStorage.set_data ставит общий data_ttl: TTL группы восстанавливаем
+        # по состоянию, которое при промахе кэша читаем из Redis
+        if self.group_ttls and data:
+            ttl = self._group_ttl(await self.get_state(key))
+            if ttl:
+                await self._expire(key, ttl, ("data",))
+
+        self._remember(key, data=data.copy())
+        await self._publish(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        entry = self._entry(key)
+        if entry is not None and entry[1] is not _MISSING:
+            self.hits += 1
+            return entry[1].copy()
+
+        self.misses += 1
+        generation = self._generation
+        with tracer.span("fsm.get_data"):
+            data = await self.storage.get_data(key)
+        self._remember(key, data=data.copy(), generation=generation)
+        return data
+
+    def _part(self, redis_key: bytes) -> str:
+        """Тип ключа (state, data, lock) - последний сегмент ключа"""
+        return redis_key.decode().rsplit(self.storage.key_builder.separator, 1)[-1]
+
+    def _default_ttl(self, part: str) -> Optional[int]:
+        ttl = self.storage.data_ttl if part == "data" else self.storage.state_ttl
+        return int(ttl.total_seconds()) if hasattr(ttl, "total_seconds") else ttl
+
+    async def _sweep_batch(self, keys: List[bytes]) -> int:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for redis_key in keys:
+                pipe.ttl(redis_key)
+            ttls = await pipe.execute()
+
+        # -1: ключ без срока жизни
+        legacy = [redis_key for redis_key, ttl in zip(keys, ttls) if ttl == -1]
+        states = [redis_key for redis_key in legacy if self._part(redis_key) == "state"]
+        if states:
+            values = await self.redis.mget(states)
+            state_ttls = {
+                redis_key: self._group_ttl(value.decode() if value else None)
+                for redis_key, value in zip(states, values)
+            }
+        else:
+            state_ttls = {}
+
+        fixed = 0
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for redis_key in legacy:
+                ttl = state_ttls.get(redis_key) or self._default_ttl(self._part(redis_key))
+                if ttl:
+                    pipe.expire(redis_key, ttl)
+                    fixed += 1
+            await pipe.execute()
+        return fixed
+
+    async def sweep(self, batch_size: int = 500) -> Dict[str, int]:
+        """Проставляет TTL ключам FSM без срока жизни, оставшимся от старых версий"""
+        match = f"{self.storage.key_builder.prefix}{self.storage.key_builder.separator}*"
+        checked = 0
+        fixed = 0
+        batch: List[bytes] = []
+
+        async for redis_key in self.redis.scan_iter(match=match, count=batch_size):
+            batch.append(redis_key)
+            if len(batch) >= batch_size:
+                fixed += await self._sweep_batch(batch)
+                checked += len(batch)
+                batch = []
+        if batch:
+            fixed += await self._sweep_batch(batch)
+            checked += len(batch)
+
+        return {"checked": checked, "fixed": fixed}
+
+    async def _sweep_periodically(self) -> None:
+        """Очистка раз в sweep_interval; блокировка в Redis исключает дублирование"""
+        while True:
+            try:
+                if await self.redis.set(SWEEP_LOCK_KEY, self.instance_id, nx=True, ex=self.sweep_interval):
+                    result = await self.sweep()
+                    logger.info(f"🧹 FSM sweep: {result['checked']} keys checked, {result['fixed']} got TTL")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ FSM sweep failed: {e}")
+            await asyncio.sleep(self.sweep_interval)
+
+    async def get_memory_report(self, sample_size: int = 1000) -> Dict[str, Any]:
+        """
+        Количество ключей FSM и память по типам ключей и группам состояний
+
+        Ключи считаются все, память и группы состояний - по выборке
+        из sample_size ключей с экстраполяцией на все ключи типа.
+        """
+        match = f"{self.storage.key_builder.prefix}{self.storage.key_builder.separator}*"
+        parts: Dict[str, Dict[str, int]] = {}
+        sample: List[Tuple[str, bytes]] = []
+
+        async for redis_key in self.redis.scan_iter(match=match, count=1000):
+            part = self._part(redis_key)
+            parts.setdefault(part, {"keys": 0, "memory_bytes": 0})["keys"] += 1
+            if len(sample) < sample_size:
+                sample.append((part, redis_key))
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for part, redis_key in sample:
+                pipe.memory_usage(redis_key)
+                # Для состояний нужно значение (группа); для остальных ключей - любой
+                # ответ, чтобы результаты шли парами
+                if part == "state":
+                    pipe.get(redis_key)
+                else:
+                    pipe.exists(redis_key)
+            results = await pipe.execute()
+
+        sampled: Dict[str, List[int]] = {}
+        state_groups: Dict[str, int] = {}
+        for index, (part, _) in enumerate(sample):
+            memory, value = results[index * 2], results[index * 2 + 1]
+            sampled.setdefault(part, []).append(memory or 0)
+            if part == "state" and value:
+                group = value.decode().split(":", 1)[0]
+                state_groups[group] = state_groups.get(group, 0) + 1
+
+        for part, stats in parts.items():
+            sizes = sampled.get(part)
+            if sizes:
+                stats["memory_bytes"] = int(sum(sizes) / len(sizes) * stats["keys"])
+
+        memory_info = await self.redis.info("memory")
+        return {
+            "parts": parts,
+            "state_groups": state_groups,
+            "sampled": len(sample),
+            "used_memory": memory_info.get("used_memory", 0),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кэша"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "invalidations": self.invalidations,
+            "listening": self._listening,
+        }
+
+    async def close(self) -> None:
+        for task in (self._listener, self._sweeper):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listener = None
+        self._sweeper = None
+        await self.storage.close()
@@ -0,0 +1,353 @@
+"""
+Лёгкая трассировка обработки обновлений: span на обновление и дочерние span
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from loguru import logger
+from redis.asyncio import Redis
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+
+# Больше span в одной трассировке не сохраняется, чтобы не копить память
+MAX_SPANS_PER_TRACE = 1000
+
+
+class Span:
+    """Отрезок работы внутри трассировки"""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1_000_000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """Все span одного обновления"""
+
+    __slots__ = ("trace_id", "spans", "has_error")
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.has_error = False
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    Трассировщик с хвостовой выборкой
+
+    Span создаются только внутри трассировки, начатой trace(); вне её span()
+    ничего не делает, поэтому выключенная трассировка почти ничего не стоит.
+    Решение о сохранении принимается после завершения корневого span:
+    сохраняются медленные (дольше slow_ms) трассировки, трассировки с ошибками
+    и доля sample_rate остальных. Сохранённые трассировки экспортируются
+    в фоне пачками - в файл JSON Lines или в OTLP/HTTP коллектор.
+    """
+
+    def __init__(self):
+        self.exporter = settings.tracing_exporter.lower()
+        self.slow_ms = settings.tracing_slow_ms
+        self.sample_rate = settings.tracing_sample_rate
+        self.file_path = settings.tracing_file
+        self.otlp_endpoint = settings.tracing_otlp_endpoint
+        self.service_name = settings.tracing_service_name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.kept = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter != "none"
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Корневой span новой трассировки"""
+        if not self.enabled:
+            yield None
+            return
+
+        root = Span(Trace(), name, None, attributes)
+        try:
+            with self._activate(root):
+                yield root
+        finally:
+            self._finish(root.trace, root)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Дочерний span текущей трассировки (вне трассировки - ничего не делает)"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        with self._activate(span):
+            yield span
+
+    def record(
+        self,
+        name: str,
+        start_ns: int,
+        end_ns: int,
+        error: Optional[str] = None,
+        **attributes: Any
+    ) -> None:
+        """Уже завершённый span (например, из синхронных событий SQLAlchemy)"""
+        parent = _current_span.get()
+        if parent is None or len(parent.trace.spans) >= MAX_SPANS_PER_TRACE:
+            return
+
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        span.start_ns = start_ns
+        span.end_ns = end_ns
+        if error:
+            span.error = error
+            parent.trace.has_error = True
+        parent.trace.spans.append(span)
+
+    @contextmanager
+    def _activate(self, span: Span) -> Iterator[None]:
+        token = _current_span.set(span)
+        try:
+            yield
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            span.trace.has_error = True
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            if len(span.trace.spans) < MAX_SPANS_PER_TRACE:
+                span.trace.spans.append(span)
+
+    def _finish(self, trace: Trace, root: Span) -> None:
+        """Хвостовая выборка после завершения корневого span"""
+        keep = (
+            trace.has_error
+            or root.duration_ms >= self.slow_ms
+            or (self.sample_rate > 0 and random.random() < self.sample_rate)
+        )
+        if not keep or self._queue is None:
+            self.dropped += 1
+            return
+
+        try:
+            self._queue.put_nowait(trace)
+            self.kept += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def start(self) -> None:
+        """Запуск фонового экспорта (вызывается внутри event loop)"""
+        if not self.enabled or self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=1000)
+        self._task = asyncio.create_task(self._export_loop())
+        logger.info(f"🔍 Tracing enabled: exporter={self.exporter}, slow>{self.slow_ms}ms")
+
+    async def _export_loop(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # Собираем пачку до 100 трассировок или 5 секунд ожидания
+            deadline = time.monotonic() + 5
+            while len(batch) < 100:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._export(batch)
+
+    async def _export(self, batch: List[Trace]) -> None:
+        try:
+            if self.exporter == "file":
+                await asyncio.to_thread(self._write_file, batch)
+            elif self.exporter == "otlp":
+                await self._send_otlp(batch)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to export {len(batch)} traces: {e}")
+
+    def _write_file(self, batch: List[Trace]) -> None:
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        with open(self.file_path, "a", encoding="utf-8") as f:
+            for trace in batch:
+                record = {"trace_id": trace.trace_id, "spans": [span.to_dict() for span in trace.spans]}
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    @staticmethod
+    def _otlp_value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def _otlp_span(self, trace: Trace, span: Span) -> Dict[str, Any]:
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [
+                {"key": key, "value": self._otlp_value(value)} for key, value in span.attributes.items()
+            ],
+            # 2 - ошибка, 0 - статус не задан
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        return otlp_span
+
+    async def _send_otlp(self, batch: List[Trace]) -> None:
+        # Импорт внутри: http_pool зависит от настроек сервисов, а трассировщик - нет
+        from app.services.http_pool import http_pool
+
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}}
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "app"},
+                    "spans": [self._otlp_span(trace, span) for trace in batch for span in trace.spans],
+                }],
+            }]
+        }
+        async with http_pool.client_session() as session:
+            async with session.post(self.otlp_endpoint, json=payload) as response:
+                response.raise_for_status()
+
+    async def close(self) -> None:
+        """Экспорт оставшихся трассировок и остановка"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if batch:
+            await self._export(batch)
+
+
+# Создаем глобальный трассировщик
+tracer = Tracer()
+
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    """Span на каждый запрос к Bot API"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        with tracer.span(f"api.{method.__api_method__}"):
+            return await make_request(bot, method)
+
+
+def trace_bot_session(session: BaseSession) -> BaseSession:
+    """Подключение трассировки к сессии бота"""
+    session.middleware(TracingRequestMiddleware())
+    return session
+
+
+def trace_engine(engine: AsyncEngine) -> None:
+    """
+    Span на каждый SQL запрос через события SQLAlchemy
+
+    Синхронные обработчики событий выполняются в greenlet, который
+    наследует контекст вызывающей задачи, поэтому текущий span доступен.
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("trace_start", []).append(time.time_ns())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["trace_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        tracer.record(f"db.{operation}", started, time.time_ns(), statement=statement[:200])
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context):
+        stack = context.connection.info.get("trace_start") if context.connection is not None else None
+        if stack:
+            tracer.record(
+                "db.error", stack.pop(), time.time_ns(),
+                error=f"{type(context.original_exception).__name__}: {context.original_exception}",
+                statement=(context.statement or "")[:200]
+            )
+
+
+def trace_redis(redis: Redis) -> Redis:
+    """
+    Span на каждую команду Redis
+
+    Оборачивает execute_command конкретного клиента; конвейеры (pipeline)
+    используют собственный путь выполнения и видны как span вызывающего кода.
+    """
+    execute_command = redis.execute_command
+
+    async def traced_execute_command(*args: Any, **options: Any) -> Any:
+        with tracer.span(f"redis.{args[0]}" if args else "redis"):
+            return await execute_command(*args, **options)
+
+    redis.execute_command = traced_execute_command
+    return redis
@@ -0,0 +1,94 @@
+"""
+Получение обновлений через webhook (aiohttp сервер)
+"""
+import asyncio
+import signal
+from contextlib import suppress
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from loguru import logger
+
+from app.config import settings
+
+
+async def on_webhook_startup(bot: Bot, dispatcher: Dispatcher) -> None:
+    """Регистрация webhook в Telegram"""
+    await bot.set_webhook(
+        url=settings.webhook_url,
+        secret_token=settings.webhook_secret or None,
+        max_connections=settings.webhook_max_connections,
+        allowed_updates=dispatcher.resolve_used_update_types()
+    )
+    logger.info(f"🔗 Webhook set: {settings.webhook_url}")
+    logger.info(f"📶 Max connections: {settings.webhook_max_connections}")
+
+
+def create_webhook_app(bot: Bot, dp: Dispatcher) -> web.Application:
+    """Создание aiohttp приложения с обработчиком обновлений"""
+    app = web.Application()
+
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=settings.webhook_secret or None
+    ).register(app, path=settings.webhook_path)
+
+    # Привязываем startup/shutdown диспетчера к жизненному циклу приложения
+    setup_application(app, dp, bot=bot)
+
+    return app
+
+
+async def wait_for_stop_signal() -> None:
+    """
+    Ожидание SIGTERM (docker stop) или SIGINT (Ctrl+C)
+
+    aiogram ставит обработчики сигналов только в start_polling, поэтому в
+    режиме webhook без них процесс завершился бы без on_shutdown: без снятия
+    готовности, записи буферов трассировки и рекордера и остановки процессов.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    signals = (signal.SIGTERM, signal.SIGINT)
+    for sig in signals:
+        # На Windows обработчики сигналов в event loop не поддерживаются
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+        logger.info("🛑 Stop signal received")
+    finally:
+        for sig in signals:
+            with suppress(NotImplementedError):
+                loop.remove_signal_handler(sig)
+
+
+def check_webhook_settings() -> None:
+    """Проверка настроек webhook перед запуском"""
+    if not settings.webhook_base_url:
+        raise RuntimeError("WEBHOOK_BASE_URL is required in webhook mode")
+    if not settings.webhook_secret:
+        logger.warning("⚠️ WEBHOOK_SECRET is not set, webhook requests are not verified")
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    """Запуск aiohttp сервера для приёма обновлений"""
+    check_webhook_settings()
+
+    dp.startup.register(on_webhook_startup)
+
+    app = create_webhook_app(bot, dp)
+    runner = web.AppRunner(app)
+    await runner.setup()
+
+    site = web.TCPSite(runner, host=settings.webapp_host, port=settings.webapp_port)
+    await site.start()
+    logger.info(f"🌐 Webhook server listening on {settings.webapp_host}:{settings.webapp_port}")
+
+    try:
+        # Работаем до SIGTERM / SIGINT, затем штатно останавливаем приложение
+        await wait_for_stop_signal()
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,221 @@
+"""
+Многопроцессная обработка webhook-обновлений
+
+Главный процесс принимает webhook и раздаёт обновления процессам-обработчикам
+по from_user.id: обновления одного пользователя всегда попадают в один процесс
+и обрабатываются по порядку, а разные пользователи обрабатываются параллельно
+на всех ядрах.
+"""
+import asyncio
+import json
+import multiprocessing
+import secrets
+import signal
+from contextlib import suppress
+from multiprocessing.process import BaseProcess
+from queue import Full
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from loguru import logger
+
+from app.config import settings
+from app.utils.executor import UpdateExecutor
+from app.utils.logging import setup_logging
+from app.utils.metrics import UPDATES_DROPPED
+from app.webhook import check_webhook_settings, on_webhook_startup, wait_for_stop_signal
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# spawn вместо fork: дочерний процесс не наследует event loop и пул соединений
+_mp = multiprocessing.get_context("spawn")
+
+
+def get_update_user_id(update: Dict[str, Any]) -> int:
+    """Извлекает ID пользователя (или чата) из сырого обновления"""
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        user = event.get("from") or event.get("user")
+        if isinstance(user, dict):
+            return user.get("id", 0)
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if isinstance(chat, dict):
+            return chat.get("id", 0)
+    return 0
+
+
+async def _process_updates(queue: Any) -> None:
+    """Цикл обработки обновлений в процессе-обработчике"""
+    # Импорт внутри процесса: app.main импортирует этот модуль
+    from app.main import on_worker_shutdown, on_worker_startup, setup_bot
+
+    bot, dp = await setup_bot()
+    dp.startup.register(on_worker_startup)
+    dp.shutdown.register(on_worker_shutdown)
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    loop = asyncio.get_running_loop()
+
+    # Обновления одного пользователя выполняются по порядку, разных - параллельно.
+    # Пока исполнитель заполнен, процесс не забирает новые обновления из очереди
+    executor = UpdateExecutor(
+        concurrency=settings.webhook_worker_concurrency,
+        max_pending=settings.webhook_worker_concurrency,
+        chat_queue_limit=settings.update_chat_queue_limit
+    )
+
+    async def process_update(update: Dict[str, Any]) -> None:
+        # Ответ webhook уже отправлен главным процессом: метод Bot API,
+        # возвращённый обработчиком, выполняем запросом, как при polling
+        response = await dp.feed_raw_update(bot, update)
+        if isinstance(response, TelegramMethod):
+            await dp.silent_call_request(bot=bot, result=response)
+
+    try:
+        while True:
+            update = await loop.run_in_executor(None, queue.get)
+            if update is None:
+                break
+
+            user_id = get_update_user_id(update)
+            accepted = await executor.submit(
+                user_id, lambda update=update: process_update(update)
+            )
+            if not accepted:
+                logger.warning(f"⚠️ Update queue of user {user_id} is full, update dropped")
+                UPDATES_DROPPED.labels("queue_full").inc()
+
+        # Дожидаемся уже принятых обновлений
+        await executor.close()
+    finally:
+        # Закрывает хранилище FSM и сервисы процесса
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+
+
+def worker_main(index: int, queue: Any) -> None:
+    """Точка входа процесса-обработчика"""
+    setup_logging()
+    # Ctrl+C получает вся группа процессов: обработчик останавливается только
+    # по сигналу главного процесса, дообработав принятые обновления
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.info(f"👷 Worker #{index} started")
+    with suppress(KeyboardInterrupt):
+        asyncio.run(_process_updates(queue))
+    logger.info(f"👷 Worker #{index} stopped")
+
+
+class WorkerPool:
+    """Набор процессов-обработчиков с отдельной очередью для каждого"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.queues = [_mp.Queue(maxsize=settings.webhook_queue_size) for _ in range(size)]
+        self.processes: List[Optional[BaseProcess]] = [None] * size
+
+    def start_worker(self, index: int) -> None:
+        process = _mp.Process(
+            target=worker_main,
+            args=(index, self.queues[index]),
+            name=f"bot-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self) -> None:
+        for index in range(self.size):
+            self.start_worker(index)
+
+    def dispatch(self, update: Dict[str, Any]) -> bool:
+        """Кладёт обновление в очередь процесса; False если очередь переполнена"""
+        index = get_update_user_id(update) % self.size
+        try:
+            self.queues[index].put_nowait(update)
+            return True
+        except Full:
+            return False
+
+    async def supervise(self, interval: float = 5.0) -> None:
+        """Перезапускает упавшие процессы"""
+        while True:
+            await asyncio.sleep(interval)
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive():
+                    logger.warning(f"⚠️ Worker #{index} exited with code {process.exitcode}, restarting")
+                    self.start_worker(index)
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Останавливает процессы, дав им обработать принятые обновления"""
+        for queue in self.queues:
+            with suppress(Full):
+                queue.put_nowait(None)
+
+        loop = asyncio.get_running_loop()
+        for process in self.processes:
+            if process is None:
+                continue
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+
+        # Необработанные обновления теряются - Telegram уже получил ответ 200
+        for queue in self.queues:
+            queue.cancel_join_thread()
+
+
+def create_dispatch_app(pool: WorkerPool) -> web.Application:
+    """aiohttp приложение, раздающее обновления процессам-обработчикам"""
+    secret = settings.webhook_secret
+
+    async def handle(request: web.Request) -> web.Response:
+        if secret and not secrets.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            return web.Response(status=401, text="Unauthorized")
+
+        try:
+            update = await request.json(loads=json.loads)
+        except ValueError:
+            return web.Response(status=400, text="Bad Request")
+
+        if not pool.dispatch(update):
+            # Telegram повторит доставку позже
+            logger.warning("⚠️ Worker queue is full, asking Telegram to retry")
+            return web.Response(status=503, text="Busy")
+
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(settings.webhook_path, handle)
+    return app
+
+
+async def run_webhook_workers(bot: Bot, dp: Dispatcher) -> None:
+    """Запуск webhook сервера с пулом процессов-обработчиков"""
+    check_webhook_settings()
+
+    # Миграции и регистрация webhook выполняются один раз, в главном процессе
+    dp.startup.register(on_webhook_startup)
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+
+    pool = WorkerPool(settings.webhook_workers)
+    pool.start()
+    supervisor = asyncio.create_task(pool.supervise())
+
+    runner = web.AppRunner(create_dispatch_app(pool))
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.webapp_host, port=settings.webapp_port)
+    await site.start()
+    logger.info(
+        f"🌐 Webhook server listening on {settings.webapp_host}:{settings.webapp_port} "
+        f"with {settings.webhook_workers} workers"
+    )
+
+    try:
+        # Работаем до SIGTERM / SIGINT, затем останавливаем процессы-обработчики
+        await wait_for_stop_signal()
+    finally:
+        supervisor.cancel()
+        await runner.cleanup()
+        await pool.stop()
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
@@ -0,0 +1,223 @@
+"""
+Общие части бенчмарков: настоящий диспетчер с фейковой сессией бота,
+замер собственного времени middleware и перцентили задержек
+"""
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from aiogram import BaseMiddleware, Bot, Dispatcher  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.methods import TelegramMethod  # noqa: E402
+from aiogram.methods.base import TelegramType  # noqa: E402
+from aiogram.types import Chat, Message, TelegramObject, User  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.services.recorder import PSEUDONYM_BASE, PSEUDONYM_SPAN  # noqa: E402
+
+# Синтетические пользователи бенчмарка живут сразу после диапазона псевдонимов
+# записей: Telegram такие id не выдаёт, и после прогона удаляются только они
+SYNTHETIC_USER_BASE = PSEUDONYM_BASE + PSEUDONYM_SPAN
+SYNTHETIC_USER_END = SYNTHETIC_USER_BASE + 1_000_000_000
+
+
+class FakeSession(BaseSession):
+    """
+    Сессия бота без сети: мгновенно возвращает правдоподобный ответ
+
+    Middleware исходной сессии (метрики, трассировка) сохраняются, поэтому
+    их накладные расходы входят в замер.
+    """
+
+    def __init__(self, source: BaseSession):
+        super().__init__(api=source.api)
+        self.middleware = source.middleware
+        self.requests: Counter = Counter()
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: Optional[int] = None
+    ) -> TelegramType:
+        self.requests[method.__api_method__] += 1
+        returning = method.__returning__
+        if returning is Message:
+            chat_id = getattr(method, "chat_id", None)
+            return Message(
+                message_id=1,
+                date=datetime.now(),
+                chat=Chat(id=chat_id if isinstance(chat_id, int) else 0, type="private"),
+                text=getattr(method, "text", None)
+            )
+        if returning is User:
+            return User(id=bot.id, is_bot=True, first_name="Benchmark")
+        return True
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[Dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+async def build_dispatcher(throttle: bool = False) -> Tuple[Bot, Dispatcher, FakeSession]:
+    """
+    Настоящие Bot и Dispatcher из app.main.setup_bot поверх фейковой сессии
+
+    Используются локальные Postgres и Redis из .env. Защита от флуда по
+    умолчанию выключена: синтетические пользователи быстро упираются в лимиты.
+    """
+    from app.database import db
+    from app.main import setup_bot
+
+    settings.throttle_enabled = throttle
+    # Прогон бенчмарка не должен попадать в записи трафика
+    settings.record_updates = False
+    bot, dp = await setup_bot()
+    await db.create_tables()
+
+    source = bot.session
+    session = FakeSession(source)
+    bot.session = session
+    await source.close()
+    return bot, dp, session
+
+
+def first_update_id() -> int:
+    """
+    Начальный update_id прогона
+
+    Дедупликация помнит update_id DEDUP_TTL секунд: при нумерации с 1 повторный
+    запуск в пределах этого времени отбросил бы все обновления как дубликаты.
+    Случайное смещение для каждого прогона оставляет проверку в замере.
+    """
+    return random.randrange(1, 2 ** 62)
+
+
+async def cleanup(dp: Dispatcher, start: int = SYNTHETIC_USER_BASE, end: int = SYNTHETIC_USER_END) -> None:
+    """Удаление пользователей прогона (id из [start, end)) и закрытие соединений"""
+    from app.database import db
+    from app.services import http_pool
+
+    async with db.session_maker() as session:
+        await session.execute(
+            text("DELETE FROM users WHERE id >= :start AND id < :end"),
+            {"start": start, "end": end}
+        )
+        await session.commit()
+    await dp.storage.close()
+    await http_pool.close()
+    await db.engine.dispose()
+
+
+class TimedMiddleware(BaseMiddleware):
+    """Обёртка, считающая собственное время middleware без вложенных middleware и обработчика"""
+
+    def __init__(self, name: str, middleware: Callable[..., Awaitable[Any]], stats: "MiddlewareStats"):
+        self.name = name
+        self.middleware = middleware
+        self.stats = stats
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        children = [0.0]
+
+        async def timed_handler(event: TelegramObject, data: Dict[str, Any]) -> Any:
+            start = time.perf_counter()
+            try:
+                return await handler(event, data)
+            finally:
+                children[0] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            return await self.middleware(timed_handler, event, data)
+        finally:
+            self.stats.add(self.name, time.perf_counter() - start - children[0])
+
+
+class MiddlewareStats:
+    """Собственное время каждого middleware"""
+
+    def __init__(self):
+        self.total: Dict[str, float] = defaultdict(float)
+        self.calls: Counter = Counter()
+
+    def add(self, name: str, seconds: float) -> None:
+        self.total[name] += seconds
+        self.calls[name] += 1
+
+    def reset(self) -> None:
+        self.total.clear()
+        self.calls.clear()
+
+
+def instrument_middlewares(
+    dp: Dispatcher,
+    observers: Sequence[str] = ("update", "message", "callback_query")
+) -> MiddlewareStats:
+    """Оборачивает все middleware диспетчера, включая встроенные middleware aiogram (FSM, контекст)"""
+    stats = MiddlewareStats()
+    for observer_name in observers:
+        observer = getattr(dp, observer_name)
+        for kind, manager in (("outer", observer.outer_middleware), ("inner", observer.middleware)):
+            middlewares = list(manager)
+            for middleware in middlewares:
+                manager.unregister(middleware)
+            for middleware in middlewares:
+                name = f"{observer_name}.{kind}.{type(middleware).__name__}"
+                manager.register(TimedMiddleware(name, middleware, stats))
+    return stats
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Перцентиль по отсортированной выборке"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+
+def format_latencies(name: str, latencies: Sequence[float]) -> str:
+    """Строка отчёта: количество и перцентили задержки (мс)"""
+    values = sorted(latencies)
+    return (
+        f"{name:<24} {len(values):>9}  "
+        f"p50 {percentile(values, 0.5) * 1000:7.2f}  "
+        f"p95 {percentile(values, 0.95) * 1000:7.2f}  "
+        f"p99 {percentile(values, 0.99) * 1000:7.2f}  "
+        f"max {(values[-1] if values else 0) * 1000:8.2f} ms"
+    )
+
+
+def print_middleware_report(stats: MiddlewareStats, updates: int) -> None:
+    """Таблица собственного времени middleware: на вызов и в среднем на обновление"""
+    print("\n🧩 Middleware (собственное время, без вложенных middleware и обработчиков):")
+    total_middleware = 0.0
+    for name, seconds in sorted(stats.total.items(), key=lambda item: -item[1]):
+        total_middleware += seconds
+        per_call = seconds / stats.calls[name] * 1_000_000
+        per_update = seconds / max(updates, 1) * 1_000_000
+        print(f"  {name:<52} {per_call:9.1f} µs/вызов  {per_update:9.1f} µs/обновление")
+    print(f"  {'итого':<52} {'':>19}  {total_middleware / max(updates, 1) * 1_000_000:9.1f} µs/обновление")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк методов Database на разных размерах таблицы users
+Usage: python scripts/benchmark_db.py [--scales 10000,1000000,10000000] [--iterations N]
+                                      [--scan-limit N] [--no-plans] [--cleanup]
+
+Для каждого масштаба база дополняется синтетическими пользователями и их
+действиями (scripts/seed_users.py), затем замеряются add_user (новый и
+существующий пользователь), get_user, get_users_count, get_active_users_count,
+get_active_users (выборка получателей рассылки) и update_bot_stats, а для их
+запросов печатаются планы EXPLAIN (ANALYZE, BUFFERS).
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from seed_users import SYNTHETIC_USER_BASE, SYNTHETIC_USER_END, connect, reset, seed, synthetic_count
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+
+from app.database import db
+from app.database.models import User
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def measure(name: str, call: Callable[[], Awaitable[object]], iterations: int) -> Dict[str, float]:
+    """Время вызова метода: p50, p95 и максимум (мс)"""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    result = {"p50": percentile(timings, 0.5), "p95": percentile(timings, 0.95), "max": timings[-1]}
+    print(
+        f"  {name:<28} x{iterations:<5} "
+        f"p50 {result['p50']:9.2f}  p95 {result['p95']:9.2f}  max {result['max']:9.2f} ms"
+    )
+    return result
+
+
+def compile_sql(statement) -> str:
+    """SQL запроса SQLAlchemy с подставленными значениями"""
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+async def explain(title: str, sql: str) -> None:
+    """План выполнения запроса с фактическим временем и буферами"""
+    async with db.engine.connect() as connection:
+        # ANALYZE выполняет запрос - изменения откатываются вместе с транзакцией
+        async with connection.begin() as transaction:
+            result = await connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))
+            plan = "\n".join(f"    {row[0]}" for row in result)
+            await transaction.rollback()
+    print(f"\n  🔎 {title}\n    {sql}\n{plan}")
+
+
+async def run_scale(scale: int, args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    total_users = await db.get_users_count()
+    print(f"\n📏 Scale {scale}: {total_users} rows in users")
+
+    existing = lambda: SYNTHETIC_USER_BASE + random.randrange(scale)  # noqa: E731
+    new_start = SYNTHETIC_USER_BASE + scale * 10
+    new_ids = iter(range(new_start, new_start + args.iterations))
+
+    results = {}
+    results["add_user (new)"] = await measure(
+        "add_user (new)", lambda: db.add_user(next(new_ids), "bench", "Bench", None), args.iterations
+    )
+    results["add_user (existing)"] = await measure(
+        "add_user (existing)", lambda: db.add_user(existing(), "bench", "Bench", None), args.iterations
+    )
+    results["get_user"] = await measure("get_user", lambda: db.get_user(existing()), args.iterations)
+    results["get_users_count"] = await measure("get_users_count", db.get_users_count, args.count_iterations)
+    results["get_active_users_count"] = await measure(
+        "get_active_users_count", db.get_active_users_count, args.count_iterations
+    )
+    results["update_bot_stats"] = await measure("update_bot_stats", db.update_bot_stats, args.count_iterations)
+
+    if total_users <= args.scan_limit:
+        results["get_active_users"] = await measure("get_active_users", db.get_active_users, 3)
+    else:
+        # Метод загружает всех получателей в память - на больших таблицах показываем только план
+        print(f"  {'get_active_users':<28} пропущен: больше {args.scan_limit} строк, см. план ниже")
+
+    # Тестовые пользователи add_user (new) удаляются, чтобы не искажать следующий масштаб
+    async with db.session_maker() as session:
+        await session.execute(
+            text("DELETE FROM users WHERE id >= :start AND id < :end"),
+            {"start": new_start, "end": new_start + args.iterations}
+        )
+        await session.commit()
+
+    if args.plans:
+        user_id = existing()
+        await explain("get_user", compile_sql(select(User).where(User.id == user_id)))
+        await explain("get_users_count", compile_sql(select(func.count(User.id))))
+        await explain(
+            "get_active_users_count", compile_sql(select(func.count(User.id)).where(User.is_active == True))  # noqa: E712
+        )
+        await explain("get_active_users", compile_sql(select(User).where(User.is_active == True)))  # noqa: E712
+        await explain(
+            "add_user (existing)",
+            f"UPDATE users SET username = 'bench', is_active = true, updated_at = now() WHERE id = {user_id}"
+        )
+    return results
+
+
+def print_summary(summary: Dict[int, Dict[str, Dict[str, float]]]) -> None:
+    """p50 каждого метода по масштабам - видно, какой запрос растёт вместе с таблицей"""
+    scales = sorted(summary)
+    methods = list(summary[scales[0]])
+    print("\n📊 p50, ms")
+    print(f"  {'method':<28}" + "".join(f"{scale:>14}" for scale in scales))
+    for method in methods:
+        row = "".join(
+            f"{summary[scale][method]['p50']:14.2f}" if method in summary[scale] else f"{'-':>14}"
+            for scale in scales
+        )
+        print(f"  {method:<28}{row}")
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    await db.create_tables()
+    conn = await connect()
+    summary = {}
+    try:
+        for scale in args.scales:
+            if await synthetic_count(conn) > scale:
+                print(f"⚠️ Already more than {scale} synthetic users, run with --cleanup first")
+                continue
+            print(f"\n🌱 Seeding up to {scale} synthetic users...")
+            await seed(conn, scale, actions_per_user=args.actions_per_user)
+            summary[scale] = await run_scale(scale, args)
+
+        if summary:
+            print_summary(summary)
+    finally:
+        if args.cleanup:
+            print("\n🧹 Removing synthetic users...")
+            await reset(conn)
+        await conn.close()
+        await db.engine.dispose()
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description="Бенчмарк методов Database на разных размерах таблицы users")
+    parser.add_argument(
+        "--scales", default="10000,1000000,10000000",
+        type=lambda value: [int(scale) for scale in value.split(",")],
+        help="количества синтетических пользователей через запятую"
+    )
+    parser.add_argument("--iterations", type=int, default=200, help="вызовов быстрых методов")
+    parser.add_argument("--count-iterations", type=int, default=10, help="вызовов подсчётов и статистики")
+    parser.add_argument("--actions-per-user", type=float, default=2.0, help="среднее количество действий")
+    parser.add_argument("--scan-limit", type=int, default=1_000_000, help="максимум строк для get_active_users")
+    parser.add_argument("--no-plans", dest="plans", action="store_false", help="не печатать планы запросов")
+    parser.add_argument("--cleanup", action="store_true", help="удалить синтетических пользователей в конце")
+    args = parser.parse_args()
+    # Новые пользователи add_user (new) создаются после scale * 10 - в пределах синтетического диапазона
+    if max(args.scales) * 10 + args.iterations > SYNTHETIC_USER_END - SYNTHETIC_USER_BASE:
+        parser.error("scale is too large for the synthetic id range")
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пропускной способности диспетчера на синтетических обновлениях
+Usage: python scripts/benchmark_dispatcher.py [--updates N] [--users N] [--concurrency N]
+                                              [--warmup N] [--allocations] [--throttle]
+
+Собирает настоящий Dispatcher через app.main.setup_bot (все middleware, роутеры,
+RedisStorage) с локальными Postgres и Redis из .env, подменяет сессию бота
+фейковой без сети и прогоняет обновления через feed_update: команды, текст,
+callback и сценарий FSM рассылки у администраторов. Отчёт: обновлений в секунду,
+перцентили задержки по сценариям, собственное время каждого middleware,
+запросы к Bot API и выделения памяти.
+
+Синтетические пользователи удаляются из базы после прогона.
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+from bench_common import (
+    SYNTHETIC_USER_BASE,
+    build_dispatcher,
+    cleanup,
+    first_update_id,
+    format_latencies,
+    instrument_middlewares,
+    print_middleware_report,
+)
+
+from aiogram.types import Update
+
+from app.config import settings
+
+# Доли сценариев в нагрузке; сценарий fsm - четыре обновления подряд от одного администратора
+SCENARIOS = {
+    "start": 10,
+    "help": 25,
+    "status": 10,
+    "text": 30,
+    "callback": 15,
+    "fsm": 10,
+}
+
+# Каждый сотый синтетический пользователь - администратор (для сценария FSM)
+ADMIN_EVERY = 100
+
+
+class UpdateFactory:
+    """Синтетические обновления с уникальными update_id"""
+
+    def __init__(self, users: int):
+        self.users = users
+        self.update_ids = itertools.count(first_update_id())
+        self.message_ids = itertools.count(1)
+
+    def _user(self, user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id % 1000}", "username": f"bench{user_id}"}
+
+    def _message(self, user_id: int, text: str) -> dict:
+        message = {
+            "message_id": next(self.message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": "Bench"},
+            "from": self._user(user_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return message
+
+    def message(self, user_id: int, text: str) -> Update:
+        return Update.model_validate(
+            {"update_id": next(self.update_ids), "message": self._message(user_id, text)}
+        )
+
+    def callback(self, user_id: int, data: str) -> Update:
+        return Update.model_validate({
+            "update_id": next(self.update_ids),
+            "callback_query": {
+                "id": str(next(self.update_ids)),
+                "from": self._user(user_id),
+                "chat_instance": str(user_id),
+                "message": self._message(user_id, "menu"),
+                "data": data,
+            },
+        })
+
+    def random_user(self) -> int:
+        return SYNTHETIC_USER_BASE + random.randrange(self.users)
+
+    def random_admin(self) -> int:
+        return SYNTHETIC_USER_BASE + random.randrange(0, self.users, ADMIN_EVERY)
+
+    def scenario(self, name: str) -> List[Update]:
+        """Обновления одного сценария - обрабатываются последовательно"""
+        if name == "fsm":
+            admin = self.random_admin()
+            return [
+                self.message(admin, "/admin"),
+                self.callback(admin, "admin_broadcast"),
+                self.message(admin, "Текст рассылки для бенчмарка"),
+                self.callback(admin, "broadcast_cancel"),
+            ]
+        user = self.random_user()
+        if name == "callback":
+            return [self.callback(user, "api_check_status")]
+        if name == "text":
+            return [self.message(user, "просто текст")]
+        return [self.message(user, f"/{name}")]
+
+    def jobs(self, updates: int) -> Iterator[Tuple[str, List[Update]]]:
+        """Сценарии в случайном порядке, пока не наберётся updates обновлений"""
+        names = list(SCENARIOS)
+        weights = list(SCENARIOS.values())
+        produced = 0
+        while produced < updates:
+            name = random.choices(names, weights)[0]
+            batch = self.scenario(name)
+            produced += len(batch)
+            yield name, batch
+
+
+async def run(
+    dp, bot, factory: UpdateFactory, updates: int, concurrency: int
+) -> Tuple[Dict[str, array], int, float]:
+    """Прогон обновлений; возвращает задержки по сценариям, число обновлений и время"""
+    latencies: Dict[str, array] = defaultdict(lambda: array("d"))
+    jobs = factory.jobs(updates)
+    processed = 0
+
+    async def worker() -> None:
+        nonlocal processed
+        for name, batch in jobs:
+            for update in batch:
+                start = time.perf_counter()
+                await dp.feed_update(bot, update)
+                latencies[name].append(time.perf_counter() - start)
+                processed += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, processed, time.perf_counter() - start
+
+
+async def benchmark(args: argparse.Namespace) -> None:
+    bot, dp, session = await build_dispatcher(throttle=args.throttle)
+
+    factory = UpdateFactory(args.users)
+    # Синтетические администраторы; множество вместо списка - проверка не влияет на замер
+    settings.admin_user_ids = set(settings.admin_user_ids) | {
+        SYNTHETIC_USER_BASE + user for user in range(0, args.users, ADMIN_EVERY)
+    }
+
+    try:
+        print(f"🔥 Warmup: {args.warmup} updates")
+        await run(dp, bot, factory, args.warmup, args.concurrency)
+
+        stats = instrument_middlewares(dp)
+        session.requests.clear()
+        gc.collect()
+        gc_before = [generation["collections"] for generation in gc.get_stats()]
+        blocks_before = sys.getallocatedblocks()
+        if args.allocations:
+            tracemalloc.start(5)
+            snapshot_before = tracemalloc.take_snapshot()
+
+        print(f"🚀 Benchmark: {args.updates} updates, {args.users} users, concurrency {args.concurrency}")
+        latencies, processed, elapsed = await run(dp, bot, factory, args.updates, args.concurrency)
+
+        if args.allocations:
+            snapshot_after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        gc_after = [generation["collections"] for generation in gc.get_stats()]
+        blocks_after = sys.getallocatedblocks()
+
+        print(f"\n📊 {processed} updates in {elapsed:.2f}s: {processed / elapsed:.0f} upd/s")
+        print(f"🕐 {datetime.now():%Y-%m-%d %H:%M:%S}, Python {sys.version.split()[0]}\n")
+        print(format_latencies("all", [value for values in latencies.values() for value in values]))
+        for name in SCENARIOS:
+            if name in latencies:
+                print(format_latencies(name, latencies[name]))
+
+        print_middleware_report(stats, processed)
+
+        print("\n📡 Bot API requests:")
+        for method, count in session.requests.most_common():
+            print(f"  {method:<30} {count:>9}  ({count / processed:.2f} на обновление)")
+
+        print("\n🧠 Memory:")
+        collections = [after - before for before, after in zip(gc_before, gc_after)]
+        blocks = blocks_after - blocks_before
+        print(
+            f"  Сборок мусора по поколениям: {collections} "
+            f"({sum(collections) / processed * 1000:.1f} на 1000 обновлений)"
+        )
+        print(f"  Прирост живых блоков памяти: {blocks} ({blocks / processed:.2f} на обновление)")
+        if args.allocations:
+            print("  Места с наибольшим приростом выделенных блоков:")
+            for stat in snapshot_after.compare_to(snapshot_before, "lineno")[:15]:
+                print(f"    {stat}")
+    finally:
+        await cleanup(dp)
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description="Бенчмарк диспетчера на синтетических обновлениях")
+    parser.add_argument("--updates", type=int, default=100_000, help="количество обновлений в замере")
+    parser.add_argument("--users", type=int, default=10_000, help="количество синтетических пользователей")
+    parser.add_argument("--concurrency", type=int, default=50, help="одновременно обрабатываемых сценариев")
+    parser.add_argument("--warmup", type=int, default=2_000, help="обновлений на прогрев (не входят в замер)")
+    parser.add_argument("--allocations", action="store_true", help="места выделения памяти (tracemalloc, медленнее)")
+    parser.add_argument("--throttle", action="store_true", help="не выключать защиту от флуда")
+    args = parser.parse_args()
+
+    asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
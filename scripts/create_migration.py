@@ -30,6 +30,9 @@ from app.database.migrations.base import Migration
 class {class_name}(Migration):
     """{description}"""
     
+    # Установите False для CREATE INDEX CONCURRENTLY и других онлайн-операций
+    transactional = True
+    
     def get_version(self) -> str:
         return "{timestamp}"
     
@@ -38,7 +41,8 @@ class {class_name}(Migration):
     
     async def check_can_apply(self, connection: AsyncConnection) -> bool:
         """Проверяем, нужно ли применять миграцию"""
-        # TODO: Добавить проверки существования столбцов/таблиц
+        # TODO: Добавить проверки существования столбцов/таблиц, например:
+        # return not await self.column_exists(connection, "users", "new_column")
         return True
     
     async def upgrade(self, connection: AsyncConnection) -> None:
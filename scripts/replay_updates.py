@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Воспроизведение записанного трафика через диспетчер
+Usage: python scripts/replay_updates.py FILES... [--speed X] [--limit N] [--concurrency N]
+                                        [--save result.json] [--compare baseline.json]
+
+Читает файлы .jsonl.gz, записанные при RECORD_UPDATES=true, и подаёт
+обновления в настоящий диспетчер (как в scripts/benchmark_dispatcher.py:
+локальные Postgres и Redis, сессия бота без сети). --speed 1 сохраняет
+исходные интервалы между обновлениями, --speed 10 ускоряет их в 10 раз,
+--speed 0 подаёт обновления без пауз. Обновления одного пользователя
+обрабатываются по порядку, как в боевом режиме.
+
+Отчёт: задержки по типам обновлений и командам, отставание от расписания
+и собственное время middleware. --save сохраняет сводку в JSON, --compare
+сравнивает прогон с сохранённой сводкой другой сборки.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import time
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, Optional
+
+from bench_common import (
+    build_dispatcher,
+    cleanup,
+    first_update_id,
+    format_latencies,
+    instrument_middlewares,
+    percentile,
+    print_middleware_report,
+)
+
+from aiogram.types import Update
+
+from app.config import settings
+from app.services.recorder import PSEUDONYM_BASE, PSEUDONYM_SPAN
+
+
+def read_records(paths: Iterable[str]) -> Iterator[dict]:
+    """Записи из сжатых JSONL файлов по порядку"""
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def update_kind(update: Update) -> str:
+    """Ключ группировки: команда, callback или тип обновления"""
+    if update.message and update.message.text and update.message.text.startswith("/"):
+        return update.message.text.split()[0].split("@")[0]
+    if update.callback_query:
+        data = update.callback_query.data or ""
+        # Параметры после двоеточия не группируются отдельно
+        return f"callback:{data.split(':')[0]}"
+    return update.event_type
+
+
+def is_pseudonym(value: int) -> bool:
+    """id из диапазона псевдонимов (0 - обновление без пользователя)"""
+    return value == 0 or PSEUDONYM_BASE <= abs(value) < PSEUDONYM_BASE + PSEUDONYM_SPAN
+
+
+def user_key(update: Update) -> int:
+    """Пользователь обновления для соблюдения порядка"""
+    event = update.event
+    user = getattr(event, "from_user", None)
+    return user.id if user else 0
+
+
+async def replay(args: argparse.Namespace) -> Dict[str, dict]:
+    bot, dp, session = await build_dispatcher(throttle=args.throttle)
+    stats = instrument_middlewares(dp)
+
+    latencies: Dict[str, array] = defaultdict(lambda: array("d"))
+    lag = array("d")
+    errors = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+    # Последняя задача каждого пользователя: следующая ждёт её завершения
+    last_task: Dict[int, asyncio.Task] = {}
+    pending = set()
+
+    async def process(update: Update, key: int, previous: Optional[asyncio.Task]) -> None:
+        nonlocal errors
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+            except Exception:
+                errors += 1
+            latencies[update_kind(update)].append(time.perf_counter() - start)
+        if last_task.get(key) is asyncio.current_task():
+            del last_task[key]
+
+    replayed = 0
+    skipped = 0
+    update_id = first_update_id()
+    first_recorded: Optional[float] = None
+    started = time.perf_counter()
+    try:
+        for record in read_records(args.files):
+            if args.limit and replayed >= args.limit:
+                break
+
+            # Исходные update_id и номера прошлых прогонов ещё помнит дедупликация -
+            # нумеруем заново со случайного смещения
+            record["update"]["update_id"] = update_id + replayed
+            update = Update.model_validate(record["update"], context={"bot": bot})
+            key = user_key(update)
+            if not is_pseudonym(key):
+                # Запись старого формата: id совпадают с реальными пользователями
+                skipped += 1
+                continue
+            if record.get("admin"):
+                settings.admin_user_ids.add(key)
+
+            if args.speed > 0:
+                first_recorded = first_recorded if first_recorded is not None else record["t"]
+                due = (record["t"] - first_recorded) / args.speed
+                delay = due - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    lag.append(-delay)
+
+            task = asyncio.create_task(process(update, key, last_task.get(key)))
+            last_task[key] = task
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            replayed += 1
+
+            # Без пауз не копим миллионы задач: ждём, пока очередь разойдётся
+            if len(pending) >= args.concurrency * 10:
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+        if pending:
+            await asyncio.wait(pending)
+        elapsed = time.perf_counter() - started
+
+        print(f"\n📼 Replayed {replayed} updates in {elapsed:.2f}s: {replayed / elapsed:.0f} upd/s, errors: {errors}")
+        if skipped:
+            print(f"⚠️ Skipped {skipped} updates with ids outside the pseudonym range (old recordings)")
+        if lag:
+            values = sorted(lag)
+            print(
+                f"⏱ Отставание от расписания: p50 {percentile(values, 0.5) * 1000:.1f} ms, "
+                f"p99 {percentile(values, 0.99) * 1000:.1f} ms"
+            )
+        print()
+        print(format_latencies("all", [value for values in latencies.values() for value in values]))
+        for kind, values in sorted(latencies.items(), key=lambda item: -len(item[1])):
+            print(format_latencies(kind, values))
+
+        print_middleware_report(stats, replayed)
+    finally:
+        # Воспроизведение создаёт только пользователей с псевдонимами
+        await cleanup(dp, PSEUDONYM_BASE, PSEUDONYM_BASE + PSEUDONYM_SPAN)
+
+    return summarize(latencies)
+
+
+def summarize(latencies: Dict[str, array]) -> Dict[str, dict]:
+    """Сводка перцентилей (мс) для сохранения и сравнения"""
+    summary = {}
+    groups = dict(latencies)
+    groups["all"] = array("d", (value for values in latencies.values() for value in values))
+    for kind, values in groups.items():
+        ordered = sorted(values)
+        summary[kind] = {
+            "count": len(ordered),
+            "p50": percentile(ordered, 0.5) * 1000,
+            "p95": percentile(ordered, 0.95) * 1000,
+            "p99": percentile(ordered, 0.99) * 1000,
+        }
+    return summary
+
+
+def print_comparison(summary: Dict[str, dict], baseline: Dict[str, dict]) -> None:
+    """Изменение перцентилей относительно сохранённого прогона"""
+    print("\n⚖️ Сравнение с базовым прогоном (p50 / p95 / p99, мс):")
+    for kind, current in sorted(summary.items(), key=lambda item: -item[1]["count"]):
+        previous = baseline.get(kind)
+        if not previous:
+            continue
+        changes = []
+        for q in ("p50", "p95", "p99"):
+            delta = (current[q] - previous[q]) / previous[q] if previous[q] else 0.0
+            changes.append(f"{previous[q]:.2f} → {current[q]:.2f} ({delta:+.0%})")
+        print(f"  {kind:<24} " + "  ".join(changes))
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description="Воспроизведение записанных обновлений")
+    parser.add_argument("files", nargs="+", help="файлы .jsonl.gz из RECORD_DIR")
+    parser.add_argument("--speed", type=float, default=0, help="ускорение относительно записи (0 - без пауз)")
+    parser.add_argument("--limit", type=int, default=0, help="воспроизвести не больше N обновлений")
+    parser.add_argument("--concurrency", type=int, default=100, help="одновременно обрабатываемых обновлений")
+    parser.add_argument("--throttle", action="store_true", help="не выключать защиту от флуда")
+    parser.add_argument("--save", help="сохранить сводку прогона в JSON")
+    parser.add_argument("--compare", help="сравнить с ранее сохранённой сводкой")
+    args = parser.parse_args()
+
+    # Множество вместо списка: в него добавляются псевдонимы администраторов из записи
+    settings.admin_user_ids = set(settings.admin_user_ids)
+    summary = asyncio.run(replay(args))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n💾 Summary saved to {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(summary, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Наполнение базы синтетическими пользователями и действиями через COPY
+Usage: python scripts/seed_users.py [--users N] [--blocked-ratio X] [--actions-per-user X]
+                                    [--days N] [--reset]
+
+Загружает пользователей в таблицу users и их действия в user_actions через
+бинарный COPY asyncpg - миллионы строк за минуты. Синтетические пользователи
+получают id от 2**54 - выше диапазона, который выдаёт Telegram, и отдельно
+от псевдонимов записей и пользователей бенчмарка диспетчера, поэтому --reset
+удаляет только их, а прогоны бенчмарков не затрагивают засеянные данные. Повторный запуск дописывает пользователей после уже созданных.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import asyncpg
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.config import settings  # noqa: E402
+
+# Telegram выдаёт id не больше 52 бит, поэтому реальные пользователи сюда не попадают.
+# Псевдонимы записей занимают [2**52, 2**53), пользователи бенчмарка диспетчера -
+# от 2**53 (app/services/recorder.py, scripts/bench_common.py)
+SYNTHETIC_USER_BASE = 2 ** 54
+SYNTHETIC_USER_END = SYNTHETIC_USER_BASE + 1_000_000_000
+CHUNK_SIZE = 50_000
+
+FIRST_NAMES = ["Алексей", "Мария", "Иван", "Анна", "Дмитрий", "Елена", "Сергей", "Ольга", "John", "Emma"]
+LAST_NAMES = ["Иванов", "Смирнова", "Кузнецов", "Попова", "Соколов", "Лебедева", "Smith", None, None, None]
+# Типы действий и их доли: команды и callback встречаются чаще остального
+ACTION_TYPES = {"start": 5, "help": 10, "status": 5, "message": 50, "callback": 30}
+
+USER_COLUMNS = ["id", "username", "first_name", "last_name", "is_active", "created_at", "updated_at"]
+ACTION_COLUMNS = ["user_id", "action_type", "action_data", "created_at"]
+
+
+def user_rows(start: int, count: int, blocked_ratio: float, days: int, now: datetime) -> Iterator[tuple]:
+    """
+    Строки пользователей
+
+    Аудитория растёт, поэтому недавних регистраций больше; примерно у 30%
+    пользователей нет username, у blocked_ratio бот заблокирован (is_active = false).
+    """
+    for index in range(start, start + count):
+        user_id = SYNTHETIC_USER_BASE + index
+        created_at = now - timedelta(seconds=days * 86400 * random.random() ** 2)
+        updated_at = created_at + (now - created_at) * random.random()
+        yield (
+            user_id,
+            f"user{index}" if random.random() > 0.3 else None,
+            random.choice(FIRST_NAMES),
+            random.choice(LAST_NAMES),
+            random.random() >= blocked_ratio,
+            created_at,
+            updated_at,
+        )
+
+
+def action_rows(users: List[tuple], actions_per_user: float, now: datetime) -> Iterator[tuple]:
+    """Действия пользователей между регистрацией и текущим моментом"""
+    types = list(ACTION_TYPES)
+    weights = list(ACTION_TYPES.values())
+    for user_id, _, _, _, _, created_at, _ in users:
+        # Экспоненциальное распределение: большинство почти неактивны, немногие - очень активны
+        for _ in range(int(random.expovariate(1 / actions_per_user)) if actions_per_user else 0):
+            action_type = random.choices(types, weights)[0]
+            yield (
+                user_id,
+                action_type,
+                json.dumps({"source": "seed"}),
+                created_at + (now - created_at) * random.random(),
+            )
+
+
+async def synthetic_count(conn: asyncpg.Connection) -> int:
+    """Количество уже созданных синтетических пользователей (по максимальному id)"""
+    max_id = await conn.fetchval(
+        "SELECT max(id) FROM users WHERE id >= $1 AND id < $2", SYNTHETIC_USER_BASE, SYNTHETIC_USER_END
+    )
+    return max_id - SYNTHETIC_USER_BASE + 1 if max_id else 0
+
+
+async def reset(conn: asyncpg.Connection) -> None:
+    """Удаление синтетических пользователей и их действий"""
+    await conn.execute(
+        "DELETE FROM user_actions WHERE user_id >= $1 AND user_id < $2", SYNTHETIC_USER_BASE, SYNTHETIC_USER_END
+    )
+    await conn.execute("DELETE FROM users WHERE id >= $1 AND id < $2", SYNTHETIC_USER_BASE, SYNTHETIC_USER_END)
+
+
+async def seed(
+    conn: asyncpg.Connection,
+    users: int,
+    blocked_ratio: float = 0.15,
+    actions_per_user: float = 2.0,
+    days: int = 365,
+) -> Tuple[int, int]:
+    """Дописывает пользователей до общего количества users; возвращает созданные строки"""
+    if users > SYNTHETIC_USER_END - SYNTHETIC_USER_BASE:
+        raise ValueError(f"At most {SYNTHETIC_USER_END - SYNTHETIC_USER_BASE} synthetic users are supported")
+    start = await synthetic_count(conn)
+    now = datetime.now(timezone.utc)
+    created_users = created_actions = 0
+    began = time.monotonic()
+
+    for chunk_start in range(start, users, CHUNK_SIZE):
+        rows = list(user_rows(chunk_start, min(CHUNK_SIZE, users - chunk_start), blocked_ratio, days, now))
+        await conn.copy_records_to_table("users", records=rows, columns=USER_COLUMNS)
+        actions = list(action_rows(rows, actions_per_user, now))
+        if actions:
+            await conn.copy_records_to_table("user_actions", records=actions, columns=ACTION_COLUMNS)
+
+        created_users += len(rows)
+        created_actions += len(actions)
+        rate = created_users / (time.monotonic() - began)
+        print(f"  📥 {start + created_users}/{users} users ({rate:.0f} rows/s), {created_actions} actions", end="\r")
+
+    if created_users:
+        print()
+        await conn.execute("ANALYZE users")
+        await conn.execute("ANALYZE user_actions")
+    return created_users, created_actions
+
+
+async def connect() -> asyncpg.Connection:
+    return await asyncpg.connect(settings.database_url)
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    conn = await connect()
+    try:
+        if args.reset:
+            print("🧹 Removing synthetic users...")
+            await reset(conn)
+        if args.users:
+            print(f"🌱 Seeding up to {args.users} synthetic users...")
+            began = time.monotonic()
+            users, actions = await seed(conn, args.users, args.blocked_ratio, args.actions_per_user, args.days)
+            print(f"✅ Created {users} users and {actions} actions in {time.monotonic() - began:.1f}s")
+    finally:
+        await conn.close()
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description="Синтетические пользователи и действия для нагрузочных тестов")
+    parser.add_argument("--users", type=int, default=1_000_000, help="общее количество синтетических пользователей")
+    parser.add_argument("--blocked-ratio", type=float, default=0.15, help="доля заблокировавших бота")
+    parser.add_argument("--actions-per-user", type=float, default=2.0, help="среднее количество действий")
+    parser.add_argument("--days", type=int, default=365, help="период регистраций (дней)")
+    parser.add_argument("--reset", action="store_true", help="сначала удалить синтетических пользователей")
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Отправка синтетических обновлений в локальный webhook бота
+Usage: python scripts/send_webhook_update.py [count] [text]
+
+Проверяет, что webhook сервер принимает обновления и проверяет секретный токен:
+запрос с неверным токеном должен получить 401.
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+
+# Добавляем корневую директорию проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.config import settings  # noqa: E402
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def build_update(update_id: int, user_id: int, text: str) -> dict:
+    """Формирует синтетическое обновление с текстовым сообщением"""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": "Test"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Test", "username": "webhook_test"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+            if text.startswith("/") else None,
+        },
+    }
+
+
+async def send_updates(count: int, text: str) -> int:
+    """Отправляет обновления и возвращает количество ошибок"""
+    url = f"http://localhost:{settings.webapp_port}{settings.webhook_path}"
+    headers = {SECRET_HEADER: settings.webhook_secret} if settings.webhook_secret else {}
+    errors = 0
+
+    async with aiohttp.ClientSession() as session:
+        # Запрос с неверным секретом должен быть отклонён
+        if settings.webhook_secret:
+            async with session.post(
+                url, json=build_update(0, 1, text), headers={SECRET_HEADER: "wrong"}
+            ) as response:
+                if response.status != 401:
+                    print(f"❌ Wrong secret accepted: HTTP {response.status}")
+                    errors += 1
+                else:
+                    print("✅ Wrong secret rejected")
+
+        start = time.monotonic()
+        for i in range(1, count + 1):
+            update = build_update(int(time.time() * 1000) + i, 100000 + i, text)
+            async with session.post(url, json=update, headers=headers) as response:
+                if response.status != 200:
+                    print(f"❌ Update {i}: HTTP {response.status}")
+                    errors += 1
+
+        elapsed = time.monotonic() - start
+        print(f"📤 Sent {count} updates to {url} in {elapsed:.2f}s ({count / elapsed:.0f} upd/s)")
+
+    return errors
+
+
+def main():
+    """Главная функция"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    text = sys.argv[2] if len(sys.argv) > 2 else "/help"
+
+    errors = asyncio.run(send_updates(count, text))
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()